@@ -1,7 +1,18 @@
 # -----------------------------------------------------------------------------
-# System Imports
+#
+#                                 CODE BEGINS
+#
 # -----------------------------------------------------------------------------
 
-from importlib import metadata
+# The package version is looked up when first used, rather than on import,
+# since the metadata lookup scans the installed packages; see PEP 562.
 
-__version__ = metadata.version(__package__)
+
+def __getattr__(name: str):
+    if name == "__version__":
+        from importlib import metadata
+
+        globals()[name] = version = metadata.version(__package__)
+        return version
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
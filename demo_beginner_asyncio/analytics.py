@@ -0,0 +1,330 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the fleet-wide transceiver analytics: counts of the
+#    transceiver records grouped by any of the dimensions
+#
+#       device      - the device hostname
+#       site        - the device site, see `default_site_of`
+#       media_type  - the transceiver media type, for example "10GBASE-SR"
+#       speed       - the speed of the media type, for example "10G"
+#       oper_state  - "up" or "down"
+#
+#    with the percentage of each group, optionally for only the records of a
+#    given dimension value, and limited to the top-N groups.
+#
+#    The aggregation works on the code columns of the XcvrTable, a small
+#    integer per record for each dimension; the records are never built as
+#    Python objects.  The codes of the grouped dimensions are combined into a
+#    single group key per record, and the keys are counted in one pass.  When
+#    the optional `numpy` package is installed the columns are used as numpy
+#    arrays, without copying, and counted with bincount; otherwise they are
+#    counted with a Counter.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import re
+from array import array
+from itertools import compress
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple, Sequence, Optional, Callable, Any
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from rich.console import Console
+from rich.table import Table
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .netdefs import XcvrTable
+from .scheduler import default_site_of
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["DIMENSIONS", "GroupCount", "GroupBy", "XcvrAnalytics", "speed_of"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+DIMENSIONS = ("device", "site", "media_type", "speed", "oper_state")
+
+# the group keys are counted with bincount when the number of possible keys
+# is at most this many, else by sorting the keys.
+
+BINCOUNT_MAX_KEYS = 1 << 22
+
+# the media types start with the speed, in Gb/s ("100GBASE-SR4") or in Mb/s
+# ("1000BASE-T").
+
+_SPEED_RE = re.compile(r"^(\d+)(G?)BASE", re.IGNORECASE)
+
+
+def speed_of(media_type: str) -> str:
+    """returns the speed of the media type, for example "100G", else "unknown" """
+    if not (match := _SPEED_RE.match(media_type)):
+        return "unknown"
+
+    speed, gbps = match.groups()
+    if gbps or int(speed) < 1000:
+        return f"{speed}{'G' if gbps else 'M'}"
+    return f"{int(speed) // 1000}G"
+
+
+@dataclass()
+class GroupCount:
+    """The count of the records of one group"""
+
+    keys: Tuple[str, ...]  # the value of each grouped dimension
+    count: int
+    pct: float  # of the records counted
+
+
+class XcvrAnalytics:
+    """
+    The XcvrAnalytics counts the records of an XcvrTable grouped by any of
+    the DIMENSIONS.
+
+    Examples
+    --------
+        analytics = XcvrAnalytics(xcvrs)
+        for group in analytics.group_by(["site", "speed"], top=10):
+            print(group.keys, group.count, group.pct)
+
+        analytics.group_by(["media_type"], where=dict(oper_state="down"))
+    """
+
+    def __init__(
+        self, xcvrs: XcvrTable, site_of: Optional[Callable[[str], str]] = None
+    ):
+        """
+        Parameters
+        ----------
+        xcvrs: XcvrTable
+            The transceiver records.
+
+        site_of: Callable, optional
+            The function used to map a device hostname to its site name; by
+            default `default_site_of`.
+        """
+        self.xcvrs = xcvrs
+        self.site_of = site_of or default_site_of
+        self._columns: Dict[str, Tuple[List[str], Any]] = dict()
+
+    def column(self, dim: str) -> Tuple[List[str], Any]:
+        """
+        Returns the column of the dimension: the list of its distinct values,
+        and the code of the value of each record, an index into that list.
+        The codes are a numpy array when numpy is installed.
+        """
+        if (column := self._columns.get(dim)) is not None:
+            return column
+
+        xcvrs = self.xcvrs
+
+        if dim == "device":
+            column = (xcvrs.devices, _codes(xcvrs.device))
+        elif dim == "media_type":
+            column = (xcvrs.media_types, _codes(xcvrs.media_type))
+        elif dim == "oper_state":
+            column = (["down", "up"], _codes(xcvrs.oper_up))
+        elif dim == "site":
+            labels, mapping = _relabel(xcvrs.devices, self.site_of)
+            column = (labels, _take(mapping, self.column("device")[1]))
+        elif dim == "speed":
+            labels, mapping = _relabel(xcvrs.media_types, speed_of)
+            column = (labels, _take(mapping, self.column("media_type")[1]))
+        else:
+            raise ValueError(f"Unknown dimension '{dim}', expected one of {DIMENSIONS}")
+
+        self._columns[dim] = column
+        return column
+
+    def group_by(
+        self,
+        dims: Sequence[str],
+        where: Optional[Dict[str, str]] = None,
+        top: Optional[int] = None,
+    ) -> List[GroupCount]:
+        """
+        Returns the count of each group of the records, largest first.
+
+        Parameters
+        ----------
+        dims: Sequence[str]
+            The dimensions grouped by, from DIMENSIONS.
+
+        where: Dict[str, str], optional
+            When given, only the records with these dimension values are
+            counted, for example dict(oper_state="down").
+
+        top: int, optional
+            When given, only this many of the largest groups are returned.
+
+        Raises
+        ------
+        ValueError - an unknown dimension.
+        """
+        if not dims:
+            raise ValueError(f"Expected one or more of {DIMENSIONS} to group by")
+
+        columns = [self.column(dim) for dim in dims]
+        select = [(self.column(dim), value) for dim, value in (where or {}).items()]
+
+        counter = _count_np if np is not None else _count_py
+        counts, total = counter(columns, select, top)
+
+        return [
+            GroupCount(
+                keys=tuple(
+                    labels[code] for (labels, _), code in zip(columns, key_codes)
+                ),
+                count=count,
+                pct=100.0 * count / (total or 1),
+            )
+            for key_codes, count in counts
+        ]
+
+
+@dataclass()
+class GroupBy:
+    """A group-by report, as given on the command line"""
+
+    dims: Sequence[str]
+    where: Dict[str, str] = field(default_factory=dict)
+    top: Optional[int] = 20
+
+    def report(self, xcvrs: XcvrTable):
+        """print the table of the group counts of the transceiver records"""
+        analytics = XcvrAnalytics(xcvrs)
+        groups = analytics.group_by(self.dims, where=self.where, top=self.top)
+
+        title = f"Transceivers by {', '.join(self.dims)}"
+        if self.where:
+            title += f" where {', '.join(f'{k}={v}' for k, v in self.where.items())}"
+        if self.top is not None:
+            title += f", top {self.top}"
+
+        table = Table(*self.dims, "Count", "Pct", title=title, title_justify="left")
+        for group in groups:
+            table.add_row(*group.keys, str(group.count), f"{group.pct:.1f}%")
+
+        Console().print("\n", table)
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 PRIVATE CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# the group counts, largest first, as a list of (code of each grouped
+# dimension, count); and the number of records counted.
+
+KeyCounts = Tuple[List[Tuple[Tuple[int, ...], int]], int]
+
+
+def _codes(column):
+    """returns the code column, as a numpy array view when numpy is installed"""
+    if np is None:
+        return column
+    if isinstance(column, array):
+        return np.frombuffer(column, dtype=np.dtype(column.typecode))
+    return np.frombuffer(column, dtype=np.uint8)
+
+
+def _relabel(labels: List[str], func: Callable[[str], str]) -> Tuple[List[str], list]:
+    """
+    Returns the distinct values of the function of each label, and the code
+    of the new value of each label; for example the sites of the devices.
+    """
+    new_codes: Dict[str, int] = dict()
+    mapping = [new_codes.setdefault(func(label), len(new_codes)) for label in labels]
+    return list(new_codes), mapping
+
+
+def _take(mapping: list, codes):
+    """returns the mapped code of each code"""
+    if np is None:
+        return array("I", map(mapping.__getitem__, codes))
+    return np.asarray(mapping, dtype=np.uint32)[codes]
+
+
+def _count_np(columns: list, select: list, top: Optional[int]) -> KeyCounts:
+    """counts the group keys using numpy, see XcvrAnalytics.group_by"""
+    mask = None
+    for (labels, codes), value in select:
+        if value not in labels:
+            return [], 0
+        matches = codes == labels.index(value)
+        mask = matches if mask is None else mask & matches
+
+    # the group key combines the codes of the dimensions, as the digits of a
+    # number with the base of each digit the number of dimension values.
+
+    num_keys = 1
+    keys = np.zeros(len(columns[0][1]), dtype=np.int64)
+    for labels, codes in columns:
+        keys = keys * len(labels) + codes
+        num_keys *= len(labels)
+
+    if mask is not None:
+        keys = keys[mask]
+
+    if not len(keys):
+        return [], 0
+
+    if num_keys <= BINCOUNT_MAX_KEYS:
+        counts = np.bincount(keys, minlength=num_keys)
+        uniq = np.flatnonzero(counts)
+        counts = counts[uniq]
+    else:
+        uniq, counts = np.unique(keys, return_counts=True)
+
+    # only the top groups are converted to Python values.
+
+    order = np.argsort(-counts, kind="stable")[:top]
+    uniq, counts = uniq[order], counts[order]
+
+    # split the group keys back into the code of each dimension
+
+    key_codes = list()
+    for labels, _ in reversed(columns):
+        key_codes.append(uniq % len(labels))
+        uniq = uniq // len(labels)
+
+    key_codes = zip(*(codes.tolist() for codes in reversed(key_codes)))
+    return list(zip(key_codes, counts.tolist())), len(keys)
+
+
+def _count_py(columns: list, select: list, top: Optional[int]) -> KeyCounts:
+    """counts the group keys without numpy, see XcvrAnalytics.group_by"""
+    rows = zip(*(codes for _, codes in columns))
+
+    if select:
+        if any(value not in labels for (labels, _), value in select):
+            return [], 0
+
+        wanted = tuple(labels.index(value) for (labels, _), value in select)
+        selected = zip(*(codes for (_, codes), _ in select))
+        rows = compress(rows, (sel_codes == wanted for sel_codes in selected))
+
+    counts = Counter(rows)
+    return counts.most_common(top), sum(counts.values())
@@ -1,23 +1,32 @@
 # -----------------------------------------------------------------------------
 # System Imports
 # -----------------------------------------------------------------------------
+import os
+import asyncio
 import contextlib
-from typing import Optional, List
+from timeit import default_timer as timer
+from typing import Optional, List, Tuple, Dict, Union, Any
 
 # -----------------------------------------------------------------------------
 # Public Imports
 # -----------------------------------------------------------------------------
 
-from httpx import AsyncHTTPTransport
+from httpx import AsyncHTTPTransport, BasicAuth, Limits, Timeout
 
 from aioeapi import Device as _Device
+from aioeapi import EapiCommandError
 from macaddr import MacAddress
 
 # -----------------------------------------------------------------------------
 # Private Imports
 # -----------------------------------------------------------------------------
 
-from .netdefs import VENDORS_IN_NETWORK, NETUSER_BASICAUTH, XcvrStatus
+from .netdefs import VENDORS_IN_NETWORK, XcvrStatus, netuser_basicauth
+from .netdefs import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from .jsoncodec import JsonCodec, get_codec, command_text
+from .tracing import tracer
+from .resolver import host_resolver
+from .cli_cache import cli_cache
 
 # -----------------------------------------------------------------------------
 # Exports
@@ -59,14 +68,184 @@ class Device(_Device):
     network use-case demonstrations.
     """
 
+    # Arista eAPI uses basic-auth authentication.  Assigned once, when the
+    # first instance is constructed, and used by all instances.
+    auth: Optional[BasicAuth] = None
+
+    # HTTP connection settings.  The keep-alive expiry is much longer than the
+    # httpx default (5s) so that a Device held open by the DevicePool reuses
+    # its TCP+TLS connection across commands.  HTTP/2 requires the optional
+    # `h2` package.
+
+    keepalive_expiry = 300.0
+    max_connections = 4
+    http2 = False
+
+    # The seconds to wait for a connection to the device, and then for each
+    # read of the response.  A command that takes longer than the read timeout
+    # to produce its output fails with a ReadTimeout.
+
+    connect_timeout = DEFAULT_CONNECT_TIMEOUT
+    read_timeout = DEFAULT_READ_TIMEOUT
+
+    # The number of seconds that the LLDP neighbor edge-port classification of
+    # the device interfaces is reused by `is_edge_port`.
+
+    lldp_cache_ttl = 300.0
+
+    # When set, all devices are reached over this Unix socket using plain
+    # HTTP, rather than by hostname; used with the eAPI simulator.
+
+    eapi_uds: Optional[str] = os.environ.get("DEMO_EAPI_UDS")
+
+    # The JSON codec used to encode the eAPI requests and decode the
+    # responses, see jsoncodec.get_codec.
+
+    json_codec: JsonCodec = get_codec()
+
     def __init__(self, *vargs, **kwargs):
-        super().__init__(
-            *vargs, transport=SafeAsyncHTTPTransport(verify=False), **kwargs
+        if Device.auth is None and "auth" not in kwargs:
+            Device.auth = netuser_basicauth()
+
+        if self.eapi_uds:
+            kwargs.setdefault("proto", "http")
+
+        # connect to the address resolved up front, when there is one, so that
+        # the connection does not wait on a DNS lookup.  Not when using the
+        # simulator, which identifies the device by the hostname.
+
+        elif address := host_resolver.address(kwargs.get("host", "")):
+            if ":" in address:
+                address = f"[{address}]"
+            port = kwargs.get("port") or 443
+            kwargs.setdefault("base_url", f"https://{address}:{port}")
+
+        kwargs.setdefault(
+            "transport",
+            SafeAsyncHTTPTransport(
+                verify=False,
+                uds=self.eapi_uds,
+                http2=self.http2,
+                limits=Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+            ),
         )
+        kwargs.setdefault(
+            "timeout", Timeout(self.read_timeout, connect=self.connect_timeout)
+        )
+        super().__init__(*vargs, **kwargs)
+        self._lldp_edge_ports: Optional[Dict[str, bool]] = None
+        self._lldp_edge_ports_ts = 0.0
+        self._lldp_lock: Optional[asyncio.Lock] = None
+
+    async def cli(
+        self,
+        command: Optional[str] = None,
+        commands: Optional[List[str]] = None,
+        ofmt: Optional[str] = None,
+        suppress_error: Optional[bool] = False,
+        **kwargs,
+    ):
+        """
+        Execute one or more CLI commands, as the aioeapi Device, reusing the
+        recent output of each command from the `cli_cache`.  Only the
+        commands without a cached output are sent to the device, so a query
+        of only cached commands does not reach the device at all.  Text
+        output, and the other runCmds parameters, are not cached.
+
+        Returns
+        -------
+        One or List of output responses, as the aioeapi Device.
+        """
+        if not any((command, commands)) or ofmt == "text" or kwargs:
+            return await super().cli(
+                command=command,
+                commands=commands,
+                ofmt=ofmt,
+                suppress_error=suppress_error,
+                **kwargs,
+            )
+
+        cmds = [command_text(cmd) for cmd in ([command] if command else commands)]
+        outputs: List[Any] = [cli_cache.get(self.host, cmd) for cmd in cmds]
+
+        if todo := [cmd for cmd, output in zip(cmds, outputs) if output is None]:
+            res = await super().cli(commands=todo, suppress_error=suppress_error)
+            if res is None:  # a suppressed command error
+                return None
+
+            fetched = dict(zip(todo, res))
+            for cmd, output in fetched.items():
+                cli_cache.put(self.host, cmd, output)
 
-    # Arista eAPI uses basic-auth authentication.  Assigning this value once is
-    # used by all instances upon construction.
-    auth = NETUSER_BASICAUTH
+            outputs = [
+                fetched[cmd] if output is None else output
+                for cmd, output in zip(cmds, outputs)
+            ]
+
+        return outputs[0] if command else outputs
+
+    async def jsonrpc_exec(self, jsonrpc: dict) -> List[Union[dict, str]]:
+        """
+        Execute the JSON-RPC runCmds request, as the aioeapi Device, using the
+        `json_codec` to encode the request and decode the response.  For JSON
+        output the codec is given the commands, so that a selective codec only
+        builds the fields of the outputs used by the demo commands.
+
+        Returns
+        -------
+        List - the output of each command.
+
+        Raises
+        ------
+        EapiCommandError
+            A command failed; see the aioeapi Device.
+        """
+        commands = jsonrpc["params"]["cmds"]
+        text = jsonrpc["params"]["format"] == "text"
+
+        request = self.build_request(
+            "POST",
+            "/command-api",
+            content=self.json_codec.dumps(jsonrpc),
+            headers={"Content-Type": "application/json"},
+        )
+        if tracer.enabled:
+            request.extensions["trace"] = tracer.http_trace(self.host)
+
+        with tracer.span("request", self.host):
+            res = await self.send(request)
+
+        res.raise_for_status()
+
+        with tracer.span("decode", self.host):
+            body = self.json_codec.decode_response(
+                res.content, commands=None if text else commands
+            )
+
+        def get_output(cmd_res):
+            return cmd_res["output"] if text else cmd_res
+
+        if "error" not in body:
+            return [get_output(cmd_res) for cmd_res in body["result"]]
+
+        # the error data holds the output of each command up to, and
+        # including, the failed command, which has the errors rather than
+        # an output.
+
+        err_data = body["error"]
+        cmd_data = err_data["data"]
+        err_at = len(cmd_data) - 1
+
+        raise EapiCommandError(
+            passed=[get_output(cmd_res) for cmd_res in cmd_data[:err_at]],
+            failed=command_text(commands[err_at]),
+            errmsg=err_data["message"],
+            not_exec=commands[err_at + 1 :],
+        )
 
     async def is_edge_port(self, interface: str) -> bool:
         """
@@ -98,17 +277,64 @@ class Device(_Device):
         if not interface.startswith("Eth"):
             return False
 
-        # Check LLDP status
-        res = await self.cli(f"show lldp neighbors {interface} detail")
-
         # if there is no LLDP neighbor, then it is by default an edge port.
-        if not (nei_data := res["lldpNeighbors"][interface]["lldpNeighborInfo"]):
-            return True
 
-        # if there is LLDP data, then let's ensure it is not another network device
+        return (await self.lldp_edge_ports()).get(interface, True)
+
+    async def lldp_edge_ports(self) -> Dict[str, bool]:
+        """
+        This function returns the edge-port classification of each interface
+        that has an LLDP neighbor.  The LLDP neighbors of all interfaces are
+        collected with one command, and the classification is reused for
+        `lldp_cache_ttl` seconds.
+
+        Returns
+        -------
+        Dict[str, bool]
+            key is the interface name, value is True when the interface is an
+            edge-port.  Interfaces without an LLDP neighbor are not included.
+        """
+
+        # the lock ensures that concurrent callers share one collection.
+
+        if self._lldp_lock is None:
+            self._lldp_lock = asyncio.Lock()
+
+        async with self._lldp_lock:
+            if (
+                self._lldp_edge_ports is None
+                or timer() - self._lldp_edge_ports_ts > self.lldp_cache_ttl
+            ):
+                res = await self.cli("show lldp neighbors detail")
+                self._lldp_edge_ports = self.parse_lldp_edge_ports(res)
+                self._lldp_edge_ports_ts = timer()
+
+        return self._lldp_edge_ports
+
+    @classmethod
+    def parse_lldp_edge_ports(cls, lldp_neighbors: dict) -> Dict[str, bool]:
+        """
+        This function returns the edge-port classification of each interface
+        that has an LLDP neighbor, as `lldp_edge_ports`, from the output of
+        "show lldp neighbors detail".
+        """
+        return {
+            if_name: cls._is_edge_neighbor(if_data["lldpNeighborInfo"])
+            for if_name, if_data in lldp_neighbors["lldpNeighbors"].items()
+            if if_data["lldpNeighborInfo"]
+        }
+
+    @staticmethod
+    def _is_edge_neighbor(nei_data: List[dict]) -> bool:
+        """
+        Returns True if the LLDP neighbor is not another network device.
+        """
+
         # for demo purposes, checking the sysDesc value for name of known vendors
         # Only going to look at the first entry in this table (demo purposes) if
         # LLDP neighbor is a network vendor, then it is not an edge-port.
+        # The vendor names are matched regardless of case, as EOS describes
+        # itself as "Arista Networks EOS ...".
 
         nei_rec = nei_data[0]
 
@@ -116,7 +342,7 @@ class Device(_Device):
             nei_rec.get("systemDescription")
             or nei_rec.get("neighborInterfaceInfo", {}).get("systemDescription")
             or ""
-        )
+        ).lower()
 
         if any(vendor in sys_desc for vendor in VENDORS_IN_NETWORK):
             return False
@@ -126,6 +352,18 @@ class Device(_Device):
 
         return True
 
+    async def boot_marker(self) -> str:
+        """
+        This function returns the boot timestamp of the device, as a string.
+        A change of the value means the device rebooted, for example for an
+        upgrade, since it was last checked; so the output is always collected
+        from the device, not the `cli_cache`.
+        """
+        with cli_cache.refreshing():
+            res = await self.cli("show version")
+
+        return str(res["bootupTimestamp"])
+
     async def find_macaddr(self, macaddr: MacAddress) -> Optional[str]:
         """
         This function returns the interface name if the given MAC address
@@ -156,6 +394,29 @@ class Device(_Device):
 
         return table_entries[0]["interface"]
 
+    async def mac_address_table(self) -> List[Tuple[str, str]]:
+        """
+        This function returns the unicast MAC address table of the device.  A
+        MAC address learned on multiple VLANs will have an entry per VLAN.
+
+        Returns
+        -------
+        List[Tuple[str, str]]
+            The MAC address, in xx:yy:zz:aa:bb:cc format, and the interface
+            name of each table entry.
+        """
+        res = await self.cli(command="show mac address-table")
+
+        return [
+            (entry["macAddress"], entry["interface"])
+            for entry in res["unicastTable"]["tableEntries"]
+        ]
+
+    # the commands used by `inventory_xcvrs`, in the order expected by
+    # `parse_xcvrs`.
+
+    XCVRS_COMMANDS = ("show interfaces transceiver hardware", "show interfaces status")
+
     async def inventory_xcvrs(self) -> List[XcvrStatus]:
         """
         This function returns a list containing each interface equipped with a transceiver.
@@ -166,11 +427,30 @@ class Device(_Device):
         -------
         List - could be empty.
         """
-        results = list()
+        outputs = await self.cli(commands=list(self.XCVRS_COMMANDS))
 
-        ifs_xcvr, ifs_status = await self.cli(
-            commands=["show interfaces transceiver hardware", "show interfaces status"]
-        )
+        with tracer.span("parse", self.host):
+            return self.parse_xcvrs(*outputs)
+
+    @staticmethod
+    def parse_xcvrs(ifs_xcvr: dict, ifs_status: dict) -> List[XcvrStatus]:
+        """
+        This function returns the XcvrStatus of each interface equipped with a
+        transceiver, from the output of the XCVRS_COMMANDS.
+
+        Parameters
+        ----------
+        ifs_xcvr: dict
+            The "show interfaces transceiver hardware" output
+
+        ifs_status: dict
+            The "show interfaces status" output
+
+        Returns
+        -------
+        List - could be empty.
+        """
+        results = list()
 
         ifs_xcvr = ifs_xcvr["interfaces"]
         ifs_status = ifs_status["interfaceStatuses"]
@@ -203,3 +483,64 @@ class Device(_Device):
             )
 
         return results
+
+    # the commands used by `transceiver_dom`, in the order expected by
+    # `parse_dom`; and the output field of each of the netdefs.DOM_METRICS.
+
+    DOM_COMMANDS = ("show interfaces transceiver", "show interfaces status")
+    DOM_FIELDS = ("rxPower", "txPower", "temperature")
+
+    async def transceiver_dom(self) -> Dict[str, Tuple[float, ...]]:
+        """
+        This function returns the DOM readings of each transceiver of the
+        device, see `parse_dom`.
+        """
+        outputs = await self.cli(commands=list(self.DOM_COMMANDS))
+
+        with tracer.span("parse", self.host):
+            return self.parse_dom(*outputs)
+
+    @staticmethod
+    def parse_dom(ifs_dom: dict, ifs_status: dict) -> Dict[str, Tuple[float, ...]]:
+        """
+        This function returns the DOM readings of each transceiver, from the
+        output of the DOM_COMMANDS.
+
+        Parameters
+        ----------
+        ifs_dom: dict
+            The "show interfaces transceiver" output
+
+        ifs_status: dict
+            The "show interfaces status" output
+
+        Returns
+        -------
+        Dict[str, Tuple[float, ...]]
+            key is the interface name, value is the reading of each of the
+            DOM_METRICS.  A reading the transceiver does not report is NaN;
+            as is the receive power of an interface that is not up, since no
+            light is expected.
+        """
+        nan = float("nan")
+        ifs_status = ifs_status["interfaceStatuses"]
+        results = dict()
+
+        for ifx_name, ifx_data in ifs_dom["interfaces"].items():
+            readings = [
+                float(value) if (value := ifx_data.get(key)) is not None else nan
+                for key in Device.DOM_FIELDS
+            ]
+
+            # the lanes of a multi-lane transceiver, for example Ethernet50/2,
+            # take the status of the port, Ethernet50/1.
+
+            if_status = ifs_status.get(ifx_name) or ifs_status.get(
+                ifx_name.rsplit("/", 1)[0] + "/1", {}
+            )
+            if if_status.get("lineProtocolStatus") != "up":
+                readings[0] = nan
+
+            results[ifx_name] = tuple(readings)
+
+        return results
@@ -0,0 +1,448 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the benchmark harness.  The demo commands are run
+#    against the eAPI simulator, each command at each of the given concurrency
+#    limits, and measured for:
+#
+#       devices/sec     - the inventory size divided by the elapsed time
+#       p50, p99        - the per-device latency, from when the device is given
+#                         a concurrency slot until its work is done
+#       peak RSS        - of the command process, and its worker processes
+#       peak sockets    - the most sockets open at once, by the same
+#       failed          - the devices that failed, after any retries
+#       hedged          - the duplicate requests started for slow devices
+#
+#    The simulator runs in its own process so that its work is not measured,
+#    and each case runs in a new process so that the memory and sockets of one
+#    case do not carry over to the next.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import os
+import resource
+import threading
+import contextlib
+import multiprocessing
+from pathlib import Path
+from dataclasses import dataclass, field
+from timeit import default_timer as timer
+from typing import List, Optional, Iterable, Tuple
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from macaddr import MacAddress
+from rich.console import Console
+from rich.table import Table
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .arista_eos import Device
+from .cli_cache import cli_cache
+from .progressbar import Progress
+from .scheduler import DeviceScheduler, RetryPolicy, format_error
+from .device_pool import run_with_pool
+from . import event_loop
+from .simulator import SimulatorConfig, SimDevice, run_server
+from .sinks import RecordSink
+from . import find_macaddr
+from . import inventory_transceivers
+from . import inventory_versions
+from . import mp_xcvrs
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["BENCH_COMMANDS", "BENCH_FIELDS", "BenchResult", "main", "run_bench"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+BENCH_COMMANDS = ("versions", "xcvrs", "find-host", "mp-xcvrs")
+
+BENCH_FIELDS = [
+    "command",
+    "max_concurrency",
+    "devices",
+    "elapsed",
+    "devices_per_sec",
+    "p50_ms",
+    "p99_ms",
+    "peak_rss_mb",
+    "peak_sockets",
+    "failed",
+    "hedged",
+    "error",
+]
+
+# the seconds between each sample of the memory and open sockets
+
+SAMPLE_INTERVAL = 0.05
+
+
+@dataclass()
+class BenchResult:
+    """The measurements of one command at one concurrency limit"""
+
+    command: str
+    max_concurrency: int
+    devices: int
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    peak_rss: int = 0  # KiB
+    peak_sockets: int = 0
+    failed: Optional[int] = None
+    hedged: int = 0
+    error: Optional[str] = None
+
+    @property
+    def devices_per_sec(self) -> float:
+        return self.devices / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """returns the per-device latency percentile, in seconds"""
+        if not self.latencies:
+            return None
+
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def record(self) -> dict:
+        """returns the result as a record of the BENCH_FIELDS"""
+        p50, p99 = self.percentile(50), self.percentile(99)
+        return dict(
+            command=self.command,
+            max_concurrency=self.max_concurrency,
+            devices=self.devices,
+            elapsed=round(self.elapsed, 3),
+            devices_per_sec=round(self.devices_per_sec, 1),
+            p50_ms=p50 and round(p50 * 1000, 1),
+            p99_ms=p99 and round(p99 * 1000, 1),
+            peak_rss_mb=round(self.peak_rss / 1024, 1),
+            peak_sockets=self.peak_sockets,
+            failed=self.failed,
+            hedged=self.hedged,
+            error=self.error,
+        )
+
+
+def main(
+    config: SimulatorConfig,
+    commands: Iterable[str],
+    concurrency: Iterable[int],
+    socket_path: Path,
+    retry: Optional[RetryPolicy] = None,
+    sink: Optional[RecordSink] = None,
+):
+    """
+    Run the benchmark and report the results.
+
+    Parameters
+    ----------
+    config: SimulatorConfig
+        The simulated network the commands are run against.
+
+    commands: Iterable[str]
+        The commands to measure, from BENCH_COMMANDS.
+
+    concurrency: Iterable[int]
+        The max-concurrency values to measure each command at.
+
+    socket_path: Path
+        The Unix socket used by the simulator.
+
+    retry: RetryPolicy, optional
+        The retry policy of the commands.
+
+    sink: RecordSink, optional
+        When provided, each result is written to the sink, see BENCH_FIELDS.
+    """
+    results = list()
+    cases = [(cmd, conc) for cmd in commands for conc in concurrency]
+
+    # a line per case rather than a progress bar, since the live display
+    # would be inherited by the case processes.
+
+    for result in run_bench(config, cases, socket_path, retry=retry):
+        results.append(result)
+        print(
+            f"{result.command} @ {result.max_concurrency}: "
+            f"{result.devices_per_sec:.1f} devices/sec"
+        )
+        if sink:
+            sink.write([result.record()])
+
+    _report(config, retry or RetryPolicy(), results)
+
+
+def run_bench(
+    config: SimulatorConfig,
+    cases: List[Tuple[str, int]],
+    socket_path: Path,
+    retry: Optional[RetryPolicy] = None,
+) -> Iterable[BenchResult]:
+    """
+    Start the simulator and run each of the benchmark cases, yielding the
+    result of each as it completes.
+
+    Parameters
+    ----------
+    config: SimulatorConfig
+        The simulated network the commands are run against.
+
+    cases: List[Tuple[str, int]]
+        The (command, max-concurrency) of each case.
+
+    socket_path: Path
+        The Unix socket used by the simulator.
+
+    retry: RetryPolicy, optional
+        The retry policy of the commands.
+    """
+    ctx = multiprocessing.get_context()
+    ready = ctx.Event()
+    sim_proc = ctx.Process(
+        target=run_server, args=(config, socket_path, ready), daemon=True
+    )
+    sim_proc.start()
+
+    try:
+        if not ready.wait(timeout=30):
+            raise RuntimeError("The eAPI simulator did not start")
+
+        inventory = config.hostnames()
+
+        # find-host looks for a host in the middle of the inventory, so that
+        # about half of the devices are searched.
+
+        target = inventory[len(inventory) // 2]
+        macaddr = SimDevice(config, target, len(inventory) // 2).edge_macaddr()
+
+        for command, max_concurrency in cases:
+            result_q = ctx.Queue()
+            case_proc = ctx.Process(
+                target=_run_case,
+                args=(result_q, command, inventory, max_concurrency, socket_path),
+                kwargs=dict(macaddr=macaddr, retry=retry),
+            )
+            case_proc.start()
+            result = result_q.get()
+            case_proc.join()
+            yield result
+
+    finally:
+        sim_proc.terminate()
+        sim_proc.join()
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 PRIVATE CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class _TimingScheduler(DeviceScheduler):
+    """A DeviceScheduler that records the latency of each successful attempt"""
+
+    def __init__(self, *vargs, **kwargs):
+        super().__init__(*vargs, **kwargs)
+        self.latencies: List[float] = list()
+
+    def observe(self, elapsed: float):
+        super().observe(elapsed)
+        self.latencies.append(elapsed)
+
+
+class _UsageSampler(threading.Thread):
+    """
+    Samples the resident memory and the number of open sockets of this
+    process and its child processes, keeping the peak of each.  Uses the
+    Linux /proc filesystem; on other systems only the memory of this process
+    is measured, from getrusage.
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak_rss = 0
+        self.peak_sockets = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            self.sample()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.sample()
+        self.peak_rss = max(
+            self.peak_rss, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        )
+
+    def sample(self):
+        rss = sockets = 0
+        for pid in _process_tree(os.getpid()):
+            rss += _proc_rss(pid)
+            sockets += _proc_sockets(pid)
+
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_sockets = max(self.peak_sockets, sockets)
+
+
+def _process_tree(pid: int) -> List[int]:
+    """returns the pid, and the pids of its descendant processes"""
+    pids = [pid]
+    for each_pid in pids:
+        for children in Path(f"/proc/{each_pid}/task").glob("*/children"):
+            with contextlib.suppress(OSError):
+                pids.extend(int(child) for child in children.read_text().split())
+    return pids
+
+
+def _proc_rss(pid: int) -> int:
+    """returns the resident memory of the process, KiB"""
+    with contextlib.suppress(OSError):
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _proc_sockets(pid: int) -> int:
+    """returns the number of sockets open by the process"""
+    count = 0
+    with contextlib.suppress(OSError):
+        for fd in os.scandir(f"/proc/{pid}/fd"):
+            with contextlib.suppress(OSError):
+                count += os.readlink(fd.path).startswith("socket:")
+    return count
+
+
+def _run_case(
+    result_q: multiprocessing.Queue,
+    command: str,
+    inventory: List[str],
+    max_concurrency: int,
+    socket_path: Path,
+    macaddr: Optional[str] = None,
+    retry: Optional[RetryPolicy] = None,
+):
+    """
+    The benchmark case process main.  Runs the command against the
+    simulator, with the command output and warnings discarded, and sends the BenchResult
+    on the result queue.
+    """
+    Device.eapi_uds = str(socket_path)
+    os.environ["DEMO_EAPI_UDS"] = str(socket_path)
+
+    # every request of the case goes to the simulator, rather than reusing a
+    # cached output.
+
+    cli_cache.enabled = False
+
+    result = BenchResult(
+        command=command, max_concurrency=max_concurrency, devices=len(inventory)
+    )
+    scheduler = _TimingScheduler(max_concurrency=max_concurrency, retry=retry)
+
+    def run_command() -> Optional[list]:
+        """runs the command, returning the devices that failed when reported"""
+        if command == "versions":
+            return run_with_pool(
+                inventory_versions.inventory_versions(
+                    inventory, scheduler=scheduler, show_progress=False
+                )
+            )[1]
+
+        if command == "xcvrs":
+            return run_with_pool(
+                inventory_transceivers._inventory_network(
+                    inventory, Progress(disable=True), scheduler=scheduler
+                )
+            )[1]
+
+        if command == "find-host":
+            return run_with_pool(
+                find_macaddr._search_network(
+                    inventory,
+                    MacAddress(macaddr),
+                    Progress(disable=True),
+                    scheduler=scheduler,
+                )
+            )[1]
+
+        mp_xcvrs.main(inventory, max_concurrency=max_concurrency, retry=retry)
+
+        return None
+
+    sampler = _UsageSampler()
+    sampler.start()
+    start_ts = timer()
+
+    try:
+        devnull = open(os.devnull, "w")
+        with devnull, contextlib.redirect_stdout(devnull):
+            with contextlib.redirect_stderr(devnull):
+                if (failed := run_command()) is not None:
+                    result.failed = len(failed)
+    except Exception as exc:
+        result.error = format_error(exc)
+
+    result.elapsed = timer() - start_ts
+    sampler.stop()
+
+    result.latencies, result.hedged = scheduler.latencies, scheduler.hedged
+    result.peak_rss, result.peak_sockets = sampler.peak_rss, sampler.peak_sockets
+    result_q.put(result)
+
+
+def _report(config: SimulatorConfig, retry: RetryPolicy, results: List[BenchResult]):
+    table = Table(
+        "Command",
+        "Conc.",
+        "Devices",
+        "Secs",
+        "Dev/s",
+        "p50 ms",
+        "p99 ms",
+        "RSS MB",
+        "Sockets",
+        "Failed",
+        "Hedged",
+        title=(
+            f"{config.devices} devices, latency {config.latency_ms}ms "
+            f"(sigma {config.latency_sigma}), failure rate {config.failure_rate}, "
+            f"stall rate {config.stall_rate}, retries {retry.retries}, "
+            f"hedge pct {retry.hedge_pct}, {event_loop.loop_name()} loop"
+        ),
+    )
+
+    for result in results:
+        rec = result.record()
+        table.add_row(
+            *(
+                "-" if rec[name] is None else str(rec[name])
+                for name in BENCH_FIELDS
+                if name != "error"
+            )
+        )
+
+    Console().print(table)
+
+    for result in results:
+        if result.error:
+            print(
+                f"FAILED: {result.command} @ {result.max_concurrency}: {result.error}"
+            )
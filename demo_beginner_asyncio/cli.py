@@ -2,10 +2,11 @@
 # System Imports
 # -----------------------------------------------------------------------------
 
-import asyncio
-from typing import List
+from typing import List, Optional, TYPE_CHECKING
+from importlib import import_module
 import os
 import sys
+import contextlib
 from pathlib import Path
 
 # -----------------------------------------------------------------------------
@@ -13,18 +14,27 @@ from pathlib import Path
 # -----------------------------------------------------------------------------
 
 import click
-from rich.console import Console
-from macaddr import MacAddress
 
 # -----------------------------------------------------------------------------
 # Private Imports
 # -----------------------------------------------------------------------------
 
-from . import __version__
-from . import find_macaddr
-from . import inventory_transceivers
-from . import mp_xcvrs
-from . import inventory_versions
+# Only the modules needed to build the commands and their options are
+# imported here.  The modules of each command, and the packages they use
+# (rich, httpx, aioeapi, macaddr), are imported when the command runs, so
+# that `demo --help`, and a command answered by the daemon, start quickly;
+# see the "startup" task.
+
+from . import sinks
+from . import store as result_store
+from . import event_loop
+from . import daemon_client
+from .netdefs import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DOM_METRICS
+
+if TYPE_CHECKING:
+    from .analytics import GroupBy
+    from .scheduler import DeviceScheduler
+    from .simulator import SimulatorConfig
 
 # -----------------------------------------------------------------------------
 #
@@ -33,47 +43,876 @@ from . import inventory_versions
 # -----------------------------------------------------------------------------
 
 
-def _cbk_opt_inventory(ctx: click.Context, param, value):
-    """callback for inventory option to read into list of strings"""
+class _LazyChoice(click.Choice):
+    """
+    The Choice of the names in a module attribute, for example the reports
+    of planner.REPORTS.  The module is imported when the choices are first
+    used, by the command, rather than when the CLI is loaded.
+    """
+
+    def __init__(self, module: str, attr: str):
+        self._source = (module, attr)
+        self._choices: Optional[List[str]] = None
+        self.case_sensitive = True
+
+    @property
+    def choices(self) -> List[str]:
+        if self._choices is None:
+            module, attr = self._source
+            self._choices = list(getattr(import_module(module, __package__), attr))
+        return self._choices
+
+
+def _read_inventory(ctx: click.Context) -> List[str]:
+    """
+    Read the inventory option file into the list of distinct hostnames, of the
+    selected sites and roles.  The file is read when the command runs, rather
+    than by an option callback, so that commands answered by the daemon do
+    not need the default inventory file; the file is read once.
+    """
+    from . import inventory_file
+
+    if (inventory := ctx.meta.get("inventory_hosts")) is not None:
+        return inventory
+
+    value = ctx.params["inventory"]
     try:
-        return Path(value).read_text().splitlines()
+        inventory = inventory_file.load_inventory(
+            Path(value),
+            sites=ctx.meta.get("inventory_sites", ()),
+            roles=ctx.meta.get("inventory_roles", ()),
+        )
     except Exception as exc:
         ctx.fail(f"Unable to load inventory file '{value}': {str(exc)}")
 
+    ctx.meta["inventory_hosts"] = inventory
+    return inventory
+
+
+def _load_inventory(ctx: click.Context) -> List[str]:
+    """
+    Read the inventory option file, see _read_inventory, and resolve the
+    hostnames up front.
+    """
+    from .arista_eos import Device
+    from .resolver import host_resolver
+
+    inventory = _read_inventory(ctx)
+
+    # the simulator devices are all reached over its socket, see
+    # Device.eapi_uds, so there is nothing to resolve.
+
+    if ctx.meta.get("inventory_resolve", True) and not Device.eapi_uds:
+        if unresolved := event_loop.run(host_resolver.resolve_all(inventory)):
+            print(f"{unresolved} of {len(inventory)} devices did not resolve")
+
+    return inventory
+
+
+def _cbk_meta(ctx: click.Context, param: click.Parameter, value):
+    """keep the option value in the context meta, see _load_inventory"""
+    ctx.meta[f"inventory_{param.name}"] = value
+
+
+def opt_inventory(func):
+    """the inventory file option, and the options that select its devices"""
+    options = [
+        click.option("-i", "--inventory", default="inventory.text"),
+        click.option(
+            "--site",
+            "sites",
+            multiple=True,
+            expose_value=False,
+            callback=_cbk_meta,
+            help="Only the devices of this site, repeat for more",
+        ),
+        click.option(
+            "--role",
+            "roles",
+            multiple=True,
+            expose_value=False,
+            callback=_cbk_meta,
+            help="Only the devices of this role, for example leaf, repeat for more",
+        ),
+        click.option(
+            "--resolve/--no-resolve",
+            default=True,
+            expose_value=False,
+            callback=_cbk_meta,
+            help="Resolve the device hostnames before connecting  [default: resolve]",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+opt_max_concurrency = click.option(
+    "--max-concurrency",
+    type=click.IntRange(min=1),
+    help="Max devices worked on at once [default: from open-files limit]",
+)
+
+opt_max_per_site = click.option(
+    "--max-per-site",
+    type=click.IntRange(min=1),
+    help="Max devices worked on at once within any one site",
+)
+
+opt_deadline = click.option(
+    "--deadline",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Seconds by which the run completes; devices not done are reported as failed",
+)
+
+
+def opt_retry(func):
+    """the options of the device timeouts, retries and hedging"""
+    options = [
+        click.option(
+            "--retries",
+            type=click.IntRange(min=0),
+            default=2,
+            show_default=True,
+            help="Times a device timeout or network error is retried",
+        ),
+        click.option(
+            "--hedge-pct",
+            type=click.FloatRange(min=1, max=100),
+            help="Duplicate a device request that takes longer than this latency percentile",
+        ),
+        click.option(
+            "--connect-timeout",
+            type=click.FloatRange(min=0, min_open=True),
+            default=DEFAULT_CONNECT_TIMEOUT,
+            show_default=True,
+            help="Seconds to connect to a device",
+        ),
+        click.option(
+            "--read-timeout",
+            type=click.FloatRange(min=0, min_open=True),
+            default=DEFAULT_READ_TIMEOUT,
+            show_default=True,
+            help="Seconds to wait for a device response",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def _make_scheduler(
+    max_concurrency: Optional[int],
+    max_per_site: Optional[int],
+    retries: int,
+    hedge_pct: Optional[float],
+    connect_timeout: float,
+    read_timeout: float,
+) -> "DeviceScheduler":
+    """returns the scheduler from the concurrency, and opt_retry, option values"""
+    from .arista_eos import Device
+    from .scheduler import DeviceScheduler, RetryPolicy
+
+    Device.connect_timeout = connect_timeout
+    Device.read_timeout = read_timeout
+
+    return DeviceScheduler(
+        max_concurrency=max_concurrency,
+        max_per_site=max_per_site,
+        retry=RetryPolicy(retries=retries, hedge_pct=hedge_pct),
+    )
+
+
+opt_socket = click.option(
+    "--socket",
+    "socket_path",
+    envvar="DEMO_SOCKET",
+    type=click.Path(dir_okay=False),
+    default=str(daemon_client.DEFAULT_SOCKET),
+    show_default=True,
+    help="Unix socket of the 'demo serve' daemon",
+)
+
+opt_daemon = click.option(
+    "--daemon/--no-daemon",
+    "use_daemon",
+    default=True,
+    help="Use the 'demo serve' daemon, when running",
+)
+
+opt_output = click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False),
+    help="Write each record to this file as devices complete",
+)
+
+opt_output_format = click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(list(sinks.SINK_FORMATS)),
+    help="Output file format [default: from the file suffix, else ndjson]",
+)
+
+opt_incremental = click.option(
+    "--incremental",
+    is_flag=True,
+    help="Re-poll only the changed devices, and report the changes, using the result store",
+)
+
+opt_store = click.option(
+    "--store",
+    "store_file",
+    type=click.Path(dir_okay=False),
+    default=str(result_store.DEFAULT_STORE),
+    show_default=True,
+    help="Result store file used by --incremental",
+)
+
+opt_trace = click.option(
+    "--trace",
+    "trace_file",
+    type=click.Path(dir_okay=False),
+    help="Write a Chrome trace of the per-device phase timings, and print a summary",
+)
+
+
+def _tracing(trace_file: Optional[str]):
+    """returns the context that traces the run when a trace file is given"""
+    if not trace_file:
+        return contextlib.nullcontext()
+
+    from . import tracing
+
+    return tracing.trace_to(Path(trace_file))
+
+
+def _cbk_cache_meta(ctx: click.Context, param: click.Parameter, value):
+    """keep the option value in the context meta, see _cli_caching"""
+    ctx.meta[f"cli_{param.name}"] = value
+
+
+def opt_cache(func):
+    """the options of the device command cache, see cli_cache"""
+    options = [
+        click.option(
+            "--cache/--no-cache",
+            default=True,
+            expose_value=False,
+            callback=_cbk_cache_meta,
+            help="Reuse the recent output of the device commands  [default: cache]",
+        ),
+        click.option(
+            "--cache-file",
+            envvar="DEMO_CLI_CACHE",
+            type=click.Path(dir_okay=False),
+            expose_value=False,
+            callback=_cbk_cache_meta,
+            help="Keep the device command outputs in this file, for reuse across runs",
+        ),
+        click.option(
+            "--cache-ttl",
+            multiple=True,
+            metavar="COMMAND=SECONDS",
+            expose_value=False,
+            callback=_cbk_cache_meta,
+            help="Seconds the output of this command is reused, 0 for never; repeat for more",
+        ),
+        click.option(
+            "--cache-size",
+            type=click.IntRange(min=1),
+            default=10_000,
+            show_default=True,
+            expose_value=False,
+            callback=_cbk_cache_meta,
+            help="Max device command outputs held in memory",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def _cli_caching(ctx: click.Context, refresh: bool = False) -> contextlib.ExitStack:
+    """
+    returns the context that configures the device command cache from the
+    opt_cache option values; with --refresh the cached outputs are not used,
+    but are replaced by the outputs of the run.
+    """
+    from .cli_cache import cli_cache
+
+    cli_cache.enabled = ctx.meta.get("cli_cache", True)
+    cli_cache.max_entries = ctx.meta.get("cli_cache_size", cli_cache.max_entries)
+
+    for value in ctx.meta.get("cli_cache_ttl", ()):
+        command, _, seconds = value.rpartition("=")
+        try:
+            cli_cache.ttls[" ".join(command.split())] = float(seconds)
+        except ValueError:
+            ctx.fail(f"--cache-ttl expects COMMAND=SECONDS, got '{value}'")
+
+    stack = contextlib.ExitStack()
+    if cli_cache.enabled and (cache_file := ctx.meta.get("cli_cache_file")):
+        cli_cache.open(Path(cache_file))
+        stack.callback(cli_cache.close)
+
+    stack.enter_context(cli_cache.refreshing(refresh))
+    return stack
+
+
+def opt_group_by(func):
+    """the options of the group-by report of the transceivers, see analytics"""
+    options = [
+        click.option(
+            "--group-by",
+            type=_LazyChoice(".analytics", "DIMENSIONS"),
+            multiple=True,
+            help="Report the transceivers grouped by this, repeat for more",
+        ),
+        click.option(
+            "--where",
+            multiple=True,
+            metavar="DIM=VALUE",
+            help="Group only the transceivers with this value, e.g. oper_state=down",
+        ),
+        click.option(
+            "--top",
+            type=click.IntRange(min=1),
+            default=20,
+            show_default=True,
+            help="Number of the largest groups reported",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def _make_group_by(
+    ctx: click.Context, group_by: List[str], where: List[str], top: int
+) -> Optional["GroupBy"]:
+    """returns the group-by report from the opt_group_by option values"""
+    from .analytics import GroupBy, DIMENSIONS
+
+    if not group_by:
+        if where:
+            ctx.fail("--where requires --group-by")
+        return None
+
+    where_dims = dict()
+    for cond in where:
+        dim, _, value = cond.partition("=")
+        if dim not in DIMENSIONS or not value:
+            ctx.fail(f"--where expects DIM=VALUE, with DIM one of {DIMENSIONS}")
+        where_dims[dim] = value
+
+    return GroupBy(dims=group_by, where=where_dims, top=top)
+
+
+opt_watch = click.option(
+    "--watch",
+    type=click.FloatRange(min=0, min_open=True),
+    metavar="INTERVAL",
+    help="Poll every INTERVAL seconds, until interrupted, and output only the changes",
+)
+
+
+def _run_watch(
+    ctx: click.Context,
+    command: str,
+    interval: float,
+    scheduler: "DeviceScheduler",
+    output: Optional[str] = None,
+    output_format: Optional[str] = None,
+):
+    """runs the command in watch mode, see watch.main"""
+    from . import watch as watch_mode
+    from .device_pool import run_with_pool
+
+    if ctx.params.get("incremental") or ctx.params.get("deadline"):
+        ctx.fail("--watch cannot be used with --incremental or --deadline")
+
+    if ctx.params.get("group_by"):
+        ctx.fail("--watch cannot be used with --group-by")
+
+    inventory = _load_inventory(ctx)
+
+    with contextlib.ExitStack() as stack:
+        sink = output and stack.enter_context(
+            sinks.open_sink(output, fields=watch_mode.WATCH_FIELDS, fmt=output_format)
+        )
+        with contextlib.suppress(KeyboardInterrupt):
+            run_with_pool(
+                watch_mode.main(
+                    inventory,
+                    command=command,
+                    interval=interval,
+                    scheduler=scheduler,
+                    sink=sink or None,
+                )
+            )
+
+
+opt_refresh = click.option(
+    "--refresh",
+    is_flag=True,
+    help="Do not reuse recent results of the daemon, or cached device command outputs",
+)
+
+
+def _default_sim_socket() -> str:
+    """the --sim-socket default, looked up when the option is used"""
+    from .simulator import DEFAULT_SOCKET
+
+    return str(DEFAULT_SOCKET)
+
+
+def opt_simulator(func):
+    """the options of the simulated network, see simulator.SimulatorConfig"""
+    options = [
+        click.option(
+            "--devices",
+            type=click.IntRange(min=1),
+            default=1000,
+            show_default=True,
+            help="Number of simulated devices",
+        ),
+        click.option(
+            "--latency-ms",
+            type=click.FloatRange(min=0),
+            default=50.0,
+            show_default=True,
+            help="Median response latency",
+        ),
+        click.option(
+            "--latency-sigma",
+            type=click.FloatRange(min=0),
+            default=0.5,
+            show_default=True,
+            help="Log-normal shape of the response latency, 0 for fixed",
+        ),
+        click.option(
+            "--failure-rate",
+            type=click.FloatRange(min=0, max=1),
+            default=0.0,
+            show_default=True,
+            help="Fraction of requests that fail with HTTP 503",
+        ),
+        click.option(
+            "--stall-rate",
+            type=click.FloatRange(min=0, max=1),
+            default=0.0,
+            show_default=True,
+            help="Fraction of requests that are not answered",
+        ),
+        click.option("--seed", type=int, default=0, show_default=True),
+        click.option(
+            "--sim-socket",
+            type=click.Path(dir_okay=False),
+            default=_default_sim_socket,
+            show_default="demo-eapi-<uid>.sock in the temp directory",
+            help="Unix socket of the eAPI simulator",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def _simulator_config(**params) -> "SimulatorConfig":
+    """returns the simulator config from the opt_simulator option values"""
+    from .simulator import SimulatorConfig
+
+    return SimulatorConfig(
+        devices=params["devices"],
+        latency_ms=params["latency_ms"],
+        latency_sigma=params["latency_sigma"],
+        failure_rate=params["failure_rate"],
+        stall_rate=params["stall_rate"],
+        seed=params["seed"],
+    )
+
+
+def _daemon_request(
+    ctx: click.Context,
+    command: str,
+    use_daemon: bool,
+    socket_path: str,
+    refresh: bool,
+    **params,
+) -> Optional[dict]:
+    """returns the daemon reply, or None when the daemon is not used/running"""
+
+    # the daemon answers for its whole inventory, so a selection of the
+    # devices is run in this process.
+
+    selected = ctx.meta.get("inventory_sites") or ctx.meta.get("inventory_roles")
+    if not use_daemon or selected:
+        return None
+
+    # the daemon refuses a request for an inventory other than its own.  When
+    # the default inventory file is not present the daemon inventory is used.
+
+    digest = None
+    source = ctx.get_parameter_source("inventory")
+    if (
+        source != click.core.ParameterSource.DEFAULT
+        or Path(ctx.params["inventory"]).exists()
+    ):
+        digest = daemon_client.inventory_digest(_read_inventory(ctx))
+
+    try:
+        return daemon_client.request(
+            command,
+            socket_path=Path(socket_path),
+            refresh=refresh,
+            inventory=digest,
+            **params,
+        )
+    except daemon_client.InventoryMismatch:
+        print("The daemon serves a different inventory, running in this process")
+        return None
+    except daemon_client.DaemonError as exc:
+        ctx.fail(f"daemon: {exc}")
+
 
 @click.group()
-@click.version_option(version=__version__)
-def cli():
+@click.version_option(package_name=__package__)
+@click.option(
+    "--loop",
+    type=click.Choice(event_loop.LOOP_CHOICES),
+    envvar="DEMO_EVENT_LOOP",
+    default="auto",
+    show_default=True,
+    help="Event loop, auto is uvloop when installed",
+)
+@click.option(
+    "--executor-workers",
+    type=click.IntRange(min=1),
+    envvar="DEMO_EXECUTOR_WORKERS",
+    help="Threads for blocking calls, such as DNS lookups",
+)
+@click.pass_context
+def cli(ctx: click.Context, loop: str, executor_workers: Optional[int]):
     """Beginner-Concurency Demo CLI"""
-    pass
+    try:
+        event_loop.configure(loop, executor_workers)
+    except ValueError as exc:
+        ctx.fail(str(exc))
 
 
 @cli.command(name="xcvrs")
+@opt_inventory
+@opt_max_concurrency
+@opt_max_per_site
+@opt_retry
+@opt_cache
+@opt_deadline
+@opt_daemon
+@opt_socket
+@opt_refresh
+@opt_output
+@opt_output_format
+@opt_incremental
+@opt_store
+@opt_trace
+@opt_watch
+@opt_group_by
 @click.option(
-    "-i", "--inventory", default="inventory.text", callback=_cbk_opt_inventory
+    "--max-age",
+    type=click.FloatRange(min=0),
+    default=result_store.DEFAULT_MAX_AGE,
+    show_default=True,
+    help="Seconds after which --incremental re-polls a device that did not reboot",
 )
-def cli_inventory_xcvrs(inventory):
+@click.pass_context
+def cli_inventory_xcvrs(
+    ctx: click.Context,
+    inventory: str,
+    max_concurrency: Optional[int],
+    max_per_site: Optional[int],
+    use_daemon: bool,
+    socket_path: str,
+    refresh: bool,
+    output: Optional[str],
+    output_format: Optional[str],
+    deadline: Optional[float],
+    incremental: bool,
+    store_file: str,
+    trace_file: Optional[str],
+    watch: Optional[float],
+    group_by: List[str],
+    where: List[str],
+    top: int,
+    max_age: float,
+    **retry_opts,
+):
     """Inventory transceivers demo"""
-    asyncio.run(inventory_transceivers.main(inventory=inventory))
+
+    if watch:
+        scheduler = _make_scheduler(max_concurrency, max_per_site, **retry_opts)
+        _run_watch(ctx, "xcvrs", watch, scheduler, output, output_format)
+        return
+
+    if incremental and output:
+        ctx.fail("--incremental cannot be used with --output")
+
+    group_by = _make_group_by(ctx, group_by, where, top)
+
+    # the daemon returns only the report, so an output file, an incremental
+    # run, a traced run, or a group-by report, is always done by running in
+    # this process.
+
+    if not (output or incremental or trace_file or group_by) and (
+        reply := _daemon_request(ctx, "xcvrs", use_daemon, socket_path, refresh)
+    ):
+        from . import inventory_transceivers
+
+        inventory_transceivers._report(*daemon_client.decode_xcvrs(reply["result"]))
+        return
+
+    inventory = _load_inventory(ctx)
+    scheduler = _make_scheduler(max_concurrency, max_per_site, **retry_opts)
+
+    with _tracing(trace_file), _cli_caching(ctx, refresh):
+        _run_inventory_xcvrs(
+            inventory,
+            scheduler,
+            output=output,
+            output_format=output_format,
+            deadline=deadline,
+            incremental=incremental,
+            store_file=store_file,
+            max_age=max_age,
+            group_by=group_by,
+        )
+
+
+def _run_inventory_xcvrs(
+    inventory: List[str],
+    scheduler: "DeviceScheduler",
+    output: Optional[str],
+    output_format: Optional[str],
+    deadline: Optional[float],
+    incremental: bool,
+    store_file: str,
+    max_age: float,
+    group_by: Optional["GroupBy"],
+):
+    """runs the xcvrs command in this process, see cli_inventory_xcvrs"""
+    from . import inventory_transceivers
+    from .device_pool import run_with_pool
+
+    if incremental:
+        with result_store.ResultStore(store_file) as store:
+            run_with_pool(
+                inventory_transceivers.main_incremental(
+                    inventory=inventory,
+                    store=store,
+                    scheduler=scheduler,
+                    max_age=max_age,
+                    deadline=deadline,
+                    group_by=group_by,
+                )
+            )
+        return
+
+    if not output:
+        run_with_pool(
+            inventory_transceivers.main(
+                inventory=inventory,
+                scheduler=scheduler,
+                deadline=deadline,
+                group_by=group_by,
+            )
+        )
+        return
+
+    with sinks.open_sink(
+        output, fields=inventory_transceivers.XCVR_FIELDS, fmt=output_format
+    ) as sink:
+        run_with_pool(
+            inventory_transceivers.main(
+                inventory=inventory,
+                scheduler=scheduler,
+                sink=sink,
+                deadline=deadline,
+                group_by=group_by,
+            )
+        )
+
+    print(f"{sink.count} records written to {output}")
 
 
 @cli.command(name="versions")
-@click.option(
-    "-i", "--inventory", default="inventory.text", callback=_cbk_opt_inventory
-)
-def cli_inventory_versions(inventory):
+@opt_inventory
+@opt_max_concurrency
+@opt_max_per_site
+@opt_retry
+@opt_cache
+@opt_deadline
+@opt_daemon
+@opt_socket
+@opt_refresh
+@opt_incremental
+@opt_store
+@opt_trace
+@opt_watch
+@click.pass_context
+def cli_inventory_versions(
+    ctx: click.Context,
+    inventory: str,
+    max_concurrency: Optional[int],
+    max_per_site: Optional[int],
+    use_daemon: bool,
+    socket_path: str,
+    refresh: bool,
+    deadline: Optional[float],
+    incremental: bool,
+    store_file: str,
+    trace_file: Optional[str],
+    watch: Optional[float],
+    **retry_opts,
+):
     """Inventory OS versions demo"""
-    asyncio.run(inventory_versions.main(inventory=inventory))
+    if watch:
+        scheduler = _make_scheduler(max_concurrency, max_per_site, **retry_opts)
+        _run_watch(ctx, "versions", watch, scheduler)
+        return
+
+    if not (incremental or trace_file) and (
+        reply := _daemon_request(ctx, "versions", use_daemon, socket_path, refresh)
+    ):
+        from . import inventory_versions
+
+        inventory_versions._report(*daemon_client.decode_versions(reply["result"]))
+        return
+
+    from . import inventory_versions
+    from .device_pool import run_with_pool
+
+    inventory = _load_inventory(ctx)
+    scheduler = _make_scheduler(max_concurrency, max_per_site, **retry_opts)
+
+    with contextlib.ExitStack() as stack:
+        store = incremental and stack.enter_context(
+            result_store.ResultStore(store_file)
+        )
+        stack.enter_context(_tracing(trace_file))
+        stack.enter_context(_cli_caching(ctx, refresh))
+        run_with_pool(
+            inventory_versions.main(
+                inventory=inventory,
+                scheduler=scheduler,
+                deadline=deadline,
+                store=store or None,
+            )
+        )
+
+
+@cli.command(name="report")
+@click.argument(
+    "report_names", nargs=-1, required=True, type=_LazyChoice(".planner", "REPORTS")
+)
+@click.option("-m", "--macaddr", help="mac-address, of the find-host report")
+@opt_inventory
+@opt_max_concurrency
+@opt_max_per_site
+@opt_retry
+@opt_cache
+@opt_deadline
+@opt_trace
+@click.pass_context
+def cli_report(
+    ctx: click.Context,
+    report_names: List[str],
+    macaddr: Optional[str],
+    inventory: str,
+    max_concurrency: Optional[int],
+    max_per_site: Optional[int],
+    deadline: Optional[float],
+    trace_file: Optional[str],
+    **retry_opts,
+):
+    """Run the reports together, with one request per device"""
+    from macaddr import MacAddress
+    from . import planner
+    from .device_pool import run_with_pool
+
+    if "find-host" in report_names and not macaddr:
+        ctx.fail("The find-host report requires the --macaddr option")
+
+    try:
+        macaddr = macaddr and MacAddress(macaddr)
+    except ValueError:
+        ctx.fail(f"Not a valid MAC address: {macaddr}")
+
+    inventory = _load_inventory(ctx)
+    scheduler = _make_scheduler(max_concurrency, max_per_site, **retry_opts)
+
+    with _tracing(trace_file), _cli_caching(ctx):
+        run_with_pool(
+            planner.main(
+                inventory=inventory,
+                report_names=report_names,
+                scheduler=scheduler,
+                deadline=deadline,
+                macaddr=macaddr,
+            )
+        )
 
 
 @cli.command(name="find-host")
+@opt_inventory
+@click.option("-m", "--macaddr", help="mac-address", required=True)
 @click.option(
-    "-i", "--inventory", default="inventory.text", callback=_cbk_opt_inventory
+    "--index",
+    "index_file",
+    type=click.Path(dir_okay=False),
+    help="MAC index file, from build-index, checked before searching",
 )
-@click.option("-m", "--macaddr", help="mac-address", required=True)
+@click.option(
+    "--index-max-age",
+    type=click.FloatRange(min=0),
+    default=3600.0,
+    show_default=True,
+    help="Seconds after which the MAC index is not used",
+)
+@click.option(
+    "--site-hints",
+    "site_hints_file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="File of MAC OUIs and IP subnets, and their sites, searched first",
+)
+@click.option("--ip", "ipaddr", help="IP address of the host, for --site-hints")
+@opt_max_concurrency
+@opt_max_per_site
+@opt_retry
+@opt_cache
+@opt_daemon
+@opt_socket
+@opt_refresh
 @click.pass_context
-def cli_find_macaddr(ctx: click.Context, inventory: List[str], macaddr: str):
+def cli_find_macaddr(
+    ctx: click.Context,
+    inventory: str,
+    macaddr: str,
+    index_file: Optional[str],
+    index_max_age: float,
+    site_hints_file: Optional[str],
+    ipaddr: Optional[str],
+    max_concurrency: Optional[int],
+    max_per_site: Optional[int],
+    use_daemon: bool,
+    socket_path: str,
+    refresh: bool,
+    **retry_opts,
+):
     """Find switch-port where host with mac-addresss"""
+    from macaddr import MacAddress
+    from . import find_macaddr
+    from . import macindex
+    from .device_pool import run_with_pool
 
     try:
         macaddr = MacAddress(macaddr)
@@ -81,16 +920,420 @@ def cli_find_macaddr(ctx: click.Context, inventory: List[str], macaddr: str):
         ctx.fail(f"Not a valid MAC address: {macaddr}")
 
     print(f"Locating switch-port for host with MAC-Address {macaddr}")
-    asyncio.run(find_macaddr.main(inventory=inventory, macaddr=macaddr))
 
+    hints = find_macaddr.SearchHints()
+    if site_hints_file:
+        try:
+            site_hints = find_macaddr.SiteHints.load(Path(site_hints_file))
+            hints.sites = site_hints.sites(macaddr, ipaddr)
+        except ValueError as exc:
+            ctx.fail(str(exc))
 
-@cli.command(name="mp-xcvrs")
+    params = dict(macaddr=str(macaddr))
+    if hints.sites:
+        params.update(sites=sorted(hints.sites))
+
+    if reply := _daemon_request(
+        ctx, "find-host", use_daemon, socket_path, refresh, **params
+    ):
+        find_macaddr._report(macaddr, *daemon_client.decode_find_host(reply["result"]))
+        return
+
+    # an index that is too old is not used to answer, but the indexed
+    # location is where the search starts.
+
+    index = None
+    if index_file and Path(index_file).exists():
+        try:
+            index = macindex.MacIndex.load(index_file)
+        except ValueError as exc:
+            ctx.fail(str(exc))
+
+        if entry := index.lookup(macaddr):
+            hints.last_device = entry.device
+
+        if index.age > index_max_age:
+            print(f"MAC index is {int(index.age)}s old, searching the network")
+            index = None
+
+    inventory = _load_inventory(ctx)
+    scheduler = _make_scheduler(max_concurrency, max_per_site, **retry_opts)
+
+    with _cli_caching(ctx, refresh):
+        run_with_pool(
+            find_macaddr.main(
+                inventory=inventory,
+                macaddr=macaddr,
+                scheduler=scheduler,
+                index=index,
+                hints=hints,
+            )
+        )
+
+
+@cli.command(name="find-hosts")
+@opt_inventory
+@click.option(
+    "-f",
+    "--from-file",
+    "macaddrs_file",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="File with a mac-address per line",
+)
+@opt_max_concurrency
+@opt_max_per_site
+@opt_retry
+@opt_cache
+@click.pass_context
+def cli_find_macaddrs(
+    ctx: click.Context,
+    inventory: str,
+    macaddrs_file: str,
+    max_concurrency: Optional[int],
+    max_per_site: Optional[int],
+    **retry_opts,
+):
+    """Find switch-ports of many hosts in one pass of the network"""
+    from . import find_macaddr
+    from .device_pool import run_with_pool
+
+    macaddrs, skipped = find_macaddr.read_macaddrs(Path(macaddrs_file))
+    if skipped:
+        print(f"Skipped {skipped} lines without a mac-address")
+
+    print(f"Locating switch-ports for {len(macaddrs)} hosts")
+    inventory = _load_inventory(ctx)
+    scheduler = _make_scheduler(max_concurrency, max_per_site, **retry_opts)
+
+    with _cli_caching(ctx):
+        run_with_pool(
+            find_macaddr.main_batch(
+                inventory=inventory, macaddrs=macaddrs, scheduler=scheduler
+            )
+        )
+
+
+@cli.command(name="build-index")
+@opt_inventory
 @click.option(
-    "-i", "--inventory", default="inventory.text", callback=_cbk_opt_inventory
+    "-o",
+    "--output",
+    "index_file",
+    type=click.Path(dir_okay=False),
+    default="macindex.bin",
+    show_default=True,
+    help="MAC index file",
 )
-def cli_mp_xcvrs(inventory: List[str]):
+@opt_max_concurrency
+@opt_max_per_site
+@opt_retry
+@opt_cache
+@click.pass_context
+def cli_build_index(
+    ctx: click.Context,
+    inventory: str,
+    index_file: str,
+    max_concurrency: Optional[int],
+    max_per_site: Optional[int],
+    **retry_opts,
+):
+    """Build the MAC address index used by find-host"""
+    from . import macindex
+    from .device_pool import run_with_pool
+
+    inventory = _load_inventory(ctx)
+    scheduler = _make_scheduler(max_concurrency, max_per_site, **retry_opts)
+
+    with _cli_caching(ctx):
+        run_with_pool(
+            macindex.main(
+                inventory=inventory, index_file=index_file, scheduler=scheduler
+            )
+        )
+
+
+@cli.command(name="mp-xcvrs")
+@opt_inventory
+@opt_max_concurrency
+@opt_max_per_site
+@opt_retry
+@opt_output
+@opt_output_format
+@opt_trace
+@opt_group_by
+@click.pass_context
+def cli_mp_xcvrs(
+    ctx: click.Context,
+    inventory: str,
+    max_concurrency: Optional[int],
+    max_per_site: Optional[int],
+    output: Optional[str],
+    output_format: Optional[str],
+    trace_file: Optional[str],
+    group_by: List[str],
+    where: List[str],
+    top: int,
+    **retry_opts,
+):
     """Inventory transcievers using multiprocessors"""
-    mp_xcvrs.main(inventory)
+    group_by = _make_group_by(ctx, group_by, where, top)
+    from . import mp_xcvrs
+    from . import inventory_transceivers
+
+    inventory = _load_inventory(ctx)
+
+    # the worker processes create their own schedulers, with this retry
+    # policy; the device timeouts are set here, and inherited by the workers.
+
+    retry = _make_scheduler(max_concurrency, max_per_site, **retry_opts).retry
+
+    with contextlib.ExitStack() as stack:
+        sink = output and stack.enter_context(
+            sinks.open_sink(
+                output, fields=inventory_transceivers.XCVR_FIELDS, fmt=output_format
+            )
+        )
+        stack.enter_context(_tracing(trace_file))
+        mp_xcvrs.main(
+            inventory,
+            max_concurrency=max_concurrency,
+            max_per_site=max_per_site,
+            retry=retry,
+            sink=sink or None,
+            group_by=group_by,
+        )
+
+    if sink:
+        print(f"{sink.count} records written to {output}")
+
+
+def _parse_thresholds(ctx: click.Context, thresholds: List[str]) -> dict:
+    """returns the (low, high) of each metric from the --threshold option values"""
+    results = dict()
+    for value in thresholds:
+        metric, _, limits = value.partition("=")
+        try:
+            low, high = map(float, limits.split(":"))
+        except ValueError:
+            low = high = None
+
+        if metric not in DOM_METRICS or low is None or low >= high:
+            ctx.fail(
+                f"--threshold expects METRIC=LOW:HIGH, with METRIC one of {DOM_METRICS}"
+            )
+        results[metric] = (low, high)
+
+    return results
+
+
+@cli.command(name="optics")
+@opt_inventory
+@opt_max_concurrency
+@opt_max_per_site
+@opt_retry
+@opt_deadline
+@opt_output
+@opt_output_format
+@opt_trace
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Poll every INTERVAL seconds, until interrupted, and print each alert",
+)
+@click.option(
+    "--cycles",
+    type=click.IntRange(min=1),
+    help="Number of times the devices are polled with --interval",
+)
+@click.option(
+    "--threshold",
+    "thresholds",
+    multiple=True,
+    metavar="METRIC=LOW:HIGH",
+    help="Alert thresholds of rx_power, tx_power or temperature, e.g. rx_power=-12:2",
+)
+@click.option(
+    "--history",
+    "history_size",
+    type=click.IntRange(min=4),
+    help="Readings of each port kept at each resolution  [default: 16]",
+)
+@click.pass_context
+def cli_optics(
+    ctx: click.Context,
+    inventory: str,
+    max_concurrency: Optional[int],
+    max_per_site: Optional[int],
+    deadline: Optional[float],
+    output: Optional[str],
+    output_format: Optional[str],
+    trace_file: Optional[str],
+    interval: Optional[float],
+    cycles: Optional[int],
+    thresholds: List[str],
+    history_size: Optional[int],
+    **retry_opts,
+):
+    """Monitor the transceiver optics readings"""
+    if cycles and not interval:
+        ctx.fail("--cycles requires --interval")
+
+    thresholds = _parse_thresholds(ctx, thresholds)
+
+    from . import optics
+    from .device_pool import run_with_pool
+
+    inventory = _load_inventory(ctx)
+    scheduler = _make_scheduler(max_concurrency, max_per_site, **retry_opts)
+
+    with contextlib.ExitStack() as stack:
+        sink = output and stack.enter_context(
+            sinks.open_sink(output, fields=optics.OPTICS_FIELDS, fmt=output_format)
+        )
+        stack.enter_context(_tracing(trace_file))
+        with contextlib.suppress(KeyboardInterrupt):
+            run_with_pool(
+                optics.main(
+                    inventory,
+                    scheduler=scheduler,
+                    sink=sink or None,
+                    deadline=deadline,
+                    interval=interval,
+                    cycles=cycles,
+                    thresholds=thresholds,
+                    history_size=history_size,
+                )
+            )
+
+    if sink:
+        print(f"{sink.count} records written to {output}")
+
+
+@cli.command(name="serve")
+@opt_inventory
+@opt_max_concurrency
+@opt_max_per_site
+@opt_retry
+@opt_cache
+@opt_socket
+@click.option(
+    "--result-ttl",
+    type=click.FloatRange(min=0),
+    default=60.0,
+    show_default=True,
+    help="Seconds that a result is reused for repeat requests",
+)
+@click.option(
+    "--idle-timeout",
+    type=click.FloatRange(min=0),
+    default=900.0,
+    show_default=True,
+    help="Seconds that an unused device session is kept open",
+)
+@click.pass_context
+def cli_serve(
+    ctx: click.Context,
+    inventory: str,
+    max_concurrency: Optional[int],
+    max_per_site: Optional[int],
+    socket_path: str,
+    result_ttl: float,
+    idle_timeout: float,
+    **retry_opts,
+):
+    """Run the daemon that answers find-host, xcvrs and versions"""
+    from . import daemon
+    from .device_pool import run_with_pool, device_pool
+
+    inventory = _load_inventory(ctx)
+    scheduler = _make_scheduler(max_concurrency, max_per_site, **retry_opts)
+    device_pool.idle_timeout = idle_timeout
+
+    with _cli_caching(ctx):
+        run_with_pool(
+            daemon.serve(
+                daemon.Daemon(inventory, scheduler=scheduler, result_ttl=result_ttl),
+                socket_path=Path(socket_path),
+            )
+        )
+
+
+@cli.command(name="simulate")
+@opt_simulator
+@click.option(
+    "-o",
+    "--inventory-out",
+    type=click.Path(dir_okay=False),
+    default="sim-inventory.text",
+    show_default=True,
+    help="Write the simulated device names to this inventory file",
+)
+def cli_simulate(inventory_out: str, sim_socket: str, **params):
+    """Run the eAPI simulator of a network of devices"""
+    from . import simulator
+
+    config = _simulator_config(**params)
+    Path(inventory_out).write_text("\n".join(config.hostnames()) + "\n")
+    print(f"Inventory written to {inventory_out}")
+    print(f"Use the simulator with: export DEMO_EAPI_UDS={sim_socket}")
+
+    event_loop.run(simulator.serve(simulator.Simulator(config), Path(sim_socket)))
+
+
+@cli.command(name="bench")
+@opt_simulator
+@click.option(
+    "-c",
+    "--command",
+    "commands",
+    type=_LazyChoice(".bench", "BENCH_COMMANDS"),
+    multiple=True,
+    help="Command to measure, repeat for more [default: all]",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[100, 1000],
+    show_default=True,
+    help="Max-concurrency to measure each command at, repeat for more",
+)
+@opt_retry
+@opt_output
+@opt_output_format
+def cli_bench(
+    commands: List[str],
+    concurrency: List[int],
+    output: Optional[str],
+    output_format: Optional[str],
+    sim_socket: str,
+    retries: int,
+    hedge_pct: Optional[float],
+    connect_timeout: float,
+    read_timeout: float,
+    **params,
+):
+    """Measure the commands against the eAPI simulator"""
+    from . import bench
+
+    config = _simulator_config(**params)
+    commands = commands or bench.BENCH_COMMANDS
+
+    # the concurrency of each case is set by the benchmark; the device timeouts
+    # set here are inherited by the case processes.
+
+    retry = _make_scheduler(
+        None, None, retries, hedge_pct, connect_timeout, read_timeout
+    ).retry
+
+    with contextlib.ExitStack() as stack:
+        sink = output and stack.enter_context(
+            sinks.open_sink(output, fields=bench.BENCH_FIELDS, fmt=output_format)
+        )
+        bench.main(
+            config, commands, concurrency, Path(sim_socket), retry=retry, sink=sink
+        )
 
 
 # -----------------------------------------------------------------------------
@@ -108,5 +1351,7 @@ def main():
         cli()
 
     except Exception:
+        from rich.console import Console
+
         Console().print_exception(suppress=os.environ)
         sys.exit(1)
@@ -0,0 +1,222 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the cache of the device command outputs used by
+#    `Device.cli`.  Many of the commands used by the demo commands, for
+#    example "show version" or "show interfaces transceiver hardware", return
+#    data that rarely changes; so the output of each (device, command) is reused for the
+#    TTL (time-to-live) of the command, and a repeated query within that time
+#    does not reach the device at all.  Commands with a TTL of 0, such as the
+#    MAC address table lookups, are never cached.
+#
+#    The outputs are held in memory, the least recently used removed beyond a
+#    size limit, and optionally in a SQLite file so that they are reused
+#    across runs of the CLI.  The outputs are kept in the file as JSON, encoded
+#    and decoded by the fastest JSON codec installed, see jsoncodec.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import time
+import sqlite3
+import contextlib
+from pathlib import Path
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Optional, Dict, Tuple, Any
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .jsoncodec import JsonCodec, get_codec
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["DEFAULT_TTLS", "DEFAULT_MAX_ENTRIES", "CliCache", "cli_cache"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The seconds that the output of each command is reused; commands not listed
+# are not cached.  The interface status, MAC address table and DOM readings
+# change from one poll to the next, so are not cached by default.  The LLDP
+# neighbors are not listed, as their edge-port classification is already
+# reused by the Device, see `Device.lldp_cache_ttl`.
+
+DEFAULT_TTLS: Dict[str, float] = {
+    "show version": 300.0,
+    "show interfaces transceiver hardware": 600.0,
+}
+
+# The default maximum number of outputs held in memory.
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cli_cache (
+    host TEXT NOT NULL,
+    command TEXT NOT NULL,
+    collected_at REAL NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (host, command)
+)
+"""
+
+# a cached output: the time.time() value when collected, and the output.
+
+_Entry = Tuple[float, Any]
+
+
+class CliCache:
+    """
+    The CliCache holds the recent output of each (host, command), see the
+    module description.  The outputs are shared with the callers, so must
+    not be modified.
+
+    Examples
+    --------
+        if (output := cli_cache.get("nyc1-leaf01", "show version")) is None:
+            output = await dev.cli("show version")
+            cli_cache.put("nyc1-leaf01", "show version", output)
+
+        with cli_cache.refreshing():
+            ...  # the commands are sent to the devices
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        """
+        Parameters
+        ----------
+        ttls: Dict[str, float], optional
+            The seconds that the output of each command is reused, key is the
+            command text; by default DEFAULT_TTLS.
+
+        max_entries: int
+            The maximum number of outputs held in memory.
+        """
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.enabled = True
+        self.codec: JsonCodec = get_codec()
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._refresh: ContextVar[bool] = ContextVar("cli_cache_refresh", default=False)
+        self._db: Optional[sqlite3.Connection] = None
+
+    def ttl(self, command: str) -> float:
+        """returns the seconds the output of the command is reused, 0 for never"""
+        return self.ttls.get(command, 0.0) if self.enabled else 0.0
+
+    def get(self, host: str, command: str) -> Optional[Any]:
+        """
+        Returns the cached output of the command for the host, or None when
+        there is no output within the command TTL.
+        """
+        if (ttl := self.ttl(command)) <= 0 or self._refresh.get():
+            return None
+
+        key = (host, command)
+        if (entry := self._entries.get(key)) is None:
+            if (entry := self._load(key)) is None:
+                return None
+
+        collected_at, output = entry
+        if time.time() - collected_at >= ttl:
+            self._entries.pop(key, None)
+            return None
+
+        self._remember(key, entry)
+        return output
+
+    def put(self, host: str, command: str, output: Any):
+        """cache the output of the command for the host, when it has a TTL"""
+        if self.ttl(command) <= 0:
+            return
+
+        key = (host, command)
+        entry = (time.time(), output)
+        self._remember(key, entry)
+
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cli_cache VALUES (?, ?, ?, ?)",
+                (host, command, entry[0], self.codec.dumps(output)),
+            )
+
+    @contextlib.contextmanager
+    def refreshing(self, refresh: bool = True):
+        """
+        Context manager within which, when refresh is True, the cached
+        outputs are not used: the commands are sent to the devices, and their
+        outputs replace the cached outputs.  Applies to the tasks created
+        within the context, so that one daemon request can refresh while
+        others do not.
+        """
+        token = self._refresh.set(refresh)
+        try:
+            yield
+        finally:
+            self._refresh.reset(token)
+
+    def open(self, filepath: Path):
+        """
+        Keep the outputs in the SQLite file, created if it does not exist, as
+        well as in memory.  An output not in memory is looked up in the file,
+        so that the outputs of a previous run are reused.
+        """
+        self.close()
+        self._db = sqlite3.connect(str(filepath))
+        self._db.execute(_SCHEMA)
+
+    def close(self):
+        """remove the expired outputs from the file, commit, and close it"""
+        if self._db is None:
+            return
+
+        max_ttl = max(self.ttls.values(), default=0.0)
+        self._db.execute(
+            "DELETE FROM cli_cache WHERE collected_at < ?", (time.time() - max_ttl,)
+        )
+        self._db.commit()
+        self._db.close()
+        self._db = None
+
+    # -------------------------------------------------------------------------
+    # private methods
+    # -------------------------------------------------------------------------
+
+    def _remember(self, key: Tuple[str, str], entry: _Entry):
+        """hold the entry in memory, as most recently used, within the size limit"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: Tuple[str, str]) -> Optional[_Entry]:
+        """returns the entry from the file, when open and there is one"""
+        if self._db is None:
+            return None
+
+        row = self._db.execute(
+            "SELECT collected_at, data FROM cli_cache WHERE host = ? AND command = ?",
+            key,
+        ).fetchone()
+
+        return (row[0], self.codec.loads(row[1])) if row else None
+
+
+# The per-process cache used by the Device.
+
+cli_cache = CliCache()
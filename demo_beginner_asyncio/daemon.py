@@ -0,0 +1,309 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the "demo serve" daemon.  The daemon keeps the
+#    inventory, the device pool (warm connections) and recent results in
+#    memory, and answers requests over a Unix socket; the requests and replies
+#    are described in daemon_client, which has the client used by the CLI
+#    commands.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import json
+import signal
+import inspect
+import asyncio
+from pathlib import Path
+from dataclasses import asdict
+from collections import OrderedDict
+from timeit import default_timer as timer
+from typing import List, Optional, Dict, Tuple, Any
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from macaddr import MacAddress
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .progressbar import Progress
+from .scheduler import DeviceScheduler
+from .cli_cache import cli_cache
+from . import find_macaddr
+from . import inventory_transceivers
+from . import inventory_versions
+from .daemon_client import DEFAULT_SOCKET, DaemonError, request, inventory_digest
+from .daemon_client import decode_xcvrs, decode_versions, decode_find_host
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "DEFAULT_SOCKET",
+    "DaemonError",
+    "Daemon",
+    "serve",
+    "request",
+    "decode_xcvrs",
+    "decode_versions",
+    "decode_find_host",
+]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class Daemon:
+    """
+    The Daemon answers command requests for the inventory it was started
+    with.  Results are kept for `result_ttl` seconds so that repeat requests
+    are answered from memory, and concurrent requests for the same command
+    share the one collection that is in progress.  At most `max_results`
+    results are kept, the expired and then the least recently collected are
+    removed first, so that for example a find-host of many different MAC
+    addresses does not grow the daemon memory.  A request for a different
+    inventory, see `daemon_client.inventory_digest`, is refused.
+    """
+
+    def __init__(
+        self,
+        inventory: List[str],
+        scheduler: Optional[DeviceScheduler] = None,
+        result_ttl: Optional[float] = 60.0,
+        max_results: int = 1024,
+    ):
+        """
+        Parameters
+        ----------
+        inventory: List[str]
+            The list of network devices served by the daemon.
+
+        scheduler: DeviceScheduler, optional
+            Limits the number of devices worked on at the same time, across
+            all of the requests in progress.
+
+        result_ttl: float
+            The number of seconds that a result is reused for repeat requests.
+
+        max_results: int
+            The maximum number of results kept; also of the MAC addresses
+            whose last location is kept.
+        """
+        self.inventory = inventory
+        self.inventory_digest = inventory_digest(inventory)
+        self.scheduler = scheduler or DeviceScheduler()
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+
+        # the results ordered by when collected, the oldest first.
+
+        self._results: "OrderedDict[Tuple[str, str], Tuple[float, Any]]"
+        self._results = OrderedDict()
+
+        # the device where each MAC address was last found, where the next
+        # search for it starts; the least recently found first.
+
+        self._last_found: "OrderedDict[str, str]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = dict()
+        self._handlers = {
+            "versions": self._versions,
+            "xcvrs": self._xcvrs,
+            "find-host": self._find_host,
+        }
+
+    async def handle(self, req: dict) -> dict:
+        """
+        Returns the reply for the given request.
+
+        Parameters
+        ----------
+        req: dict
+            The decoded request line.
+
+        Returns
+        -------
+        dict - the reply, as described in the module header; an invalid
+        request is replied with an error.
+        """
+        if not isinstance(req, dict):
+            return dict(ok=False, error="Invalid request: expected a JSON object")
+
+        command = req.get("command")
+        params = req.get("params") or {}
+
+        if not isinstance(command, str) or not (handler := self._handlers.get(command)):
+            return dict(ok=False, error=f"Unknown command: {command}")
+
+        if not isinstance(params, dict):
+            return dict(ok=False, error="Invalid request: params is not an object")
+
+        digest = req.get("inventory")
+        if digest is not None and digest != self.inventory_digest:
+            return dict(
+                ok=False,
+                error="the daemon serves a different inventory",
+                inventory_mismatch=True,
+            )
+
+        try:
+            inspect.signature(handler).bind(**params)
+        except TypeError as exc:
+            return dict(ok=False, error=f"Invalid params for {command}: {exc}")
+
+        key = (command, json.dumps(params, sort_keys=True))
+
+        if not req.get("refresh") and (cached := self._results.get(key)):
+            collected_ts, result = cached
+            if (age := timer() - collected_ts) < self.result_ttl:
+                return dict(ok=True, result=result, age=age)
+
+        # if the same command is already being collected, then wait for that
+        # collection rather than starting another.  A refresh request does not
+        # use the cached device command outputs either.
+
+        if not (inflight := self._inflight.get(key)):
+            with cli_cache.refreshing(bool(req.get("refresh"))):
+                inflight = asyncio.ensure_future(handler(**params))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda _f: self._inflight.pop(key, None))
+
+        try:
+            result = await asyncio.shield(inflight)
+        except Exception as exc:
+            return dict(ok=False, error=f"{type(exc).__name__}: {exc}")
+
+        self._add_result(key, result)
+        return dict(ok=True, result=result, age=0.0)
+
+    def _add_result(self, key: Tuple[str, str], result: Any):
+        """keep the result, removing the expired results and the oldest"""
+        now = timer()
+        self._results[key] = (now, result)
+        self._results.move_to_end(key)
+
+        while self._results:
+            old_key, (collected_ts, _) = next(iter(self._results.items()))
+            if (
+                now - collected_ts < self.result_ttl
+                and len(self._results) <= self.max_results
+            ):
+                break
+            del self._results[old_key]
+
+    async def on_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """
+        Serves the requests from one client connection until it is closed.
+        Each request line is given a reply, an error reply when the request
+        is not valid.  A request line longer than the reader limit is
+        replied with an error, and the connection closed.
+        """
+        try:
+            while True:
+                try:
+                    if not (line := await reader.readline()):
+                        break
+                except ValueError as exc:
+                    await self._reply(
+                        writer, dict(ok=False, error=f"Invalid request: {exc}")
+                    )
+                    break
+
+                try:
+                    reply = await self.handle(json.loads(line))
+                except ValueError as exc:
+                    reply = dict(ok=False, error=f"Invalid request: {exc}")
+                except Exception as exc:
+                    reply = dict(ok=False, error=f"{type(exc).__name__}: {exc}")
+
+                await self._reply(writer, reply)
+
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _reply(writer: asyncio.StreamWriter, reply: dict):
+        writer.write(json.dumps(reply).encode() + b"\n")
+        await writer.drain()
+
+    # -------------------------------------------------------------------------
+    # command handlers, each returns a JSON compatible result
+    # -------------------------------------------------------------------------
+
+    async def _versions(self) -> dict:
+        versions, failed = await inventory_versions.inventory_versions(
+            self.inventory, scheduler=self.scheduler, show_progress=False
+        )
+        return dict(versions=versions, failed=failed)
+
+    async def _xcvrs(self) -> dict:
+        types, down, failed = await inventory_transceivers._inventory_summary(
+            self.inventory, Progress(disable=True), scheduler=self.scheduler
+        )
+
+        return dict(types=types, down=down.to_dict(), failed=failed)
+
+    async def _find_host(self, macaddr: str, sites: Optional[List[str]] = None) -> dict:
+        macaddr = MacAddress(macaddr)
+        found, failed = await find_macaddr._search_network(
+            self.inventory,
+            macaddr=macaddr,
+            progressbar=Progress(disable=True),
+            scheduler=self.scheduler,
+            hints=find_macaddr.SearchHints(
+                last_device=self._last_found.get(str(macaddr)), sites=set(sites or ())
+            ),
+        )
+
+        if not found:
+            return dict(found=None, failed=failed)
+
+        self._last_found[str(macaddr)] = found.device
+        self._last_found.move_to_end(str(macaddr))
+        if len(self._last_found) > self.max_results:
+            self._last_found.popitem(last=False)
+        return dict(found=asdict(found), failed=failed)
+
+
+async def serve(daemon: Daemon, socket_path: Path):
+    """
+    Run the daemon, listening on the Unix socket, until SIGINT or SIGTERM.
+
+    Parameters
+    ----------
+    daemon: Daemon
+        The daemon that answers the requests.
+
+    socket_path: Path
+        The Unix socket file; removed when the daemon stops.
+    """
+    socket_path = Path(socket_path)
+    socket_path.unlink(missing_ok=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    server = await asyncio.start_unix_server(daemon.on_client, path=str(socket_path))
+    socket_path.chmod(0o600)
+    print(f"Serving {len(daemon.inventory)} devices on {socket_path}")
+
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        socket_path.unlink(missing_ok=True)
@@ -0,0 +1,207 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the client used by the CLI commands to talk to the
+#    "demo serve" daemon, see daemon.  Each request and reply is a single line
+#    of JSON over the daemon Unix socket.
+#
+#    request:   {"command": "find-host", "params": {"macaddr": "..."},
+#                "refresh": false, "inventory": "<digest>"}
+#    reply:     {"ok": true, "result": ..., "age": 1.2}
+#               {"ok": false, "error": "..."}
+#               {"ok": false, "error": "...", "inventory_mismatch": true}
+#
+#    The "inventory" value is the inventory_digest of the hostnames the
+#    command is for; the daemon refuses a request for an inventory other than
+#    the one it serves, so that the Caller runs that command itself.
+#
+#    The client is kept apart from the daemon so that a command answered by
+#    the daemon does not load the device and network modules.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import os
+import json
+import hashlib
+import socket
+import tempfile
+from pathlib import Path
+from collections import Counter
+from typing import List, Optional, Tuple, Iterable
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .netdefs import XcvrTable
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "DEFAULT_SOCKET",
+    "DEFAULT_TIMEOUT",
+    "DaemonError",
+    "InventoryMismatch",
+    "inventory_digest",
+    "request",
+    "decode_xcvrs",
+    "decode_versions",
+    "decode_find_host",
+]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+DEFAULT_SOCKET = Path(tempfile.gettempdir()) / f"demo-{os.getuid()}.sock"
+
+# The default seconds to wait for the reply of the daemon; a command on a large
+# inventory that is not answered from memory can take minutes.
+
+DEFAULT_TIMEOUT = 600.0
+
+
+class DaemonError(RuntimeError):
+    """The daemon replied with an error for the request"""
+
+
+class InventoryMismatch(DaemonError):
+    """The daemon serves an inventory other than the one of the request"""
+
+
+def inventory_digest(hosts: Iterable[str]) -> str:
+    """
+    Returns the digest of the inventory hostnames, the same for the same set
+    of hostnames regardless of their order or repeats.
+    """
+    return hashlib.sha256("\n".join(sorted(set(hosts))).encode()).hexdigest()
+
+
+def request(
+    command: str,
+    socket_path: Optional[Path] = None,
+    refresh: Optional[bool] = False,
+    timeout: Optional[float] = DEFAULT_TIMEOUT,
+    inventory: Optional[str] = None,
+    **params,
+) -> Optional[dict]:
+    """
+    Send a command request to the daemon and return the reply.  If the daemon
+    is not running then None is returned so that the Caller can run the
+    command itself.
+
+    Parameters
+    ----------
+    command: str
+        The command name, for example "versions"
+
+    socket_path: Path, optional
+        The daemon Unix socket, DEFAULT_SOCKET if not provided.
+
+    refresh: bool
+        When True the daemon collects a new result rather than reusing a
+        recent one.
+
+    timeout: float, optional
+        The seconds to wait for the daemon to reply; None to wait for as long
+        as it takes.
+
+    inventory: str, optional
+        The inventory_digest of the hostnames the command is for; when not
+        provided the daemon answers for the inventory it serves.
+
+    Other Parameters
+    ----------------
+    The command parameters, for example macaddr for "find-host".
+
+    Returns
+    -------
+    dict - the reply, the command result is the "result" value; None if the
+    daemon is not running.
+
+    Raises
+    ------
+    InventoryMismatch
+        When the daemon serves an inventory other than the given one.
+
+    DaemonError
+        When the daemon replies with an error, does not reply within the
+        timeout, or closes the connection without a valid reply.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+
+    try:
+        sock.connect(str(socket_path or DEFAULT_SOCKET))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    except socket.timeout:
+        sock.close()
+        raise DaemonError(f"no connection within {timeout}s") from None
+
+    try:
+        with sock, sock.makefile("rwb") as stream:
+            req = dict(
+                command=command, params=params, refresh=refresh, inventory=inventory
+            )
+            stream.write(json.dumps(req).encode() + b"\n")
+            stream.flush()
+            line = stream.readline()
+
+    except socket.timeout:
+        raise DaemonError(f"no reply within {timeout}s") from None
+
+    except OSError as exc:
+        raise DaemonError(f"connection failed: {exc}") from None
+
+    if not line:
+        raise DaemonError("connection closed without a reply")
+
+    try:
+        reply = json.loads(line)
+    except ValueError:
+        reply = None
+
+    if not isinstance(reply, dict):
+        raise DaemonError(f"invalid reply: {line[:80]!r}")
+
+    if reply.get("inventory_mismatch"):
+        raise InventoryMismatch(reply.get("error", "different inventory"))
+
+    if not reply.get("ok"):
+        raise DaemonError(reply.get("error", "error reply without a message"))
+
+    return reply
+
+
+def decode_xcvrs(result: dict) -> Tuple[Counter, XcvrTable, List[Tuple[str, str]]]:
+    """Returns the `xcvrs` daemon result in the form used by inventory_transceivers"""
+    return (
+        Counter(result["types"]),
+        XcvrTable.from_dict(result["down"]),
+        [tuple(each) for each in result["failed"]],
+    )
+
+
+def decode_versions(result: dict) -> Tuple[Counter, List[Tuple[str, str]]]:
+    """Returns the `versions` daemon result in the form used by inventory_versions"""
+    return Counter(result["versions"]), [tuple(each) for each in result["failed"]]
+
+
+def decode_find_host(result: dict):
+    """Returns the `find-host` daemon result in the form used by find_macaddr"""
+    from .find_macaddr import FindHostSearchResults
+
+    found = result["found"]
+    return (
+        FindHostSearchResults(**found) if found else None,
+        [tuple(each) for each in result["failed"]],
+    )
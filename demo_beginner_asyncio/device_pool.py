@@ -0,0 +1,220 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the per-process registry of open Device sessions.
+#    Rather than each command creating (and closing) a new Device, and so
+#    paying a TCP+TLS handshake per device per command, the commands borrow a
+#    Device from the pool.  The Device keeps its HTTP keep-alive connection
+#    open so that the next command to the same switch reuses it.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import contextlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from contextlib import asynccontextmanager
+from timeit import default_timer as timer
+from typing import List, Awaitable, TypeVar, Optional
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .arista_eos import Device
+from .resources import default_max_concurrency
+from . import event_loop
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["DevicePool", "device_pool", "run_with_pool"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+T = TypeVar("T")
+
+
+@dataclass()
+class _PoolEntry:
+    """A Device held open by the pool"""
+
+    device: Device
+    in_use: int = 0  # number of borrowers currently using the device
+    last_used: float = 0.0  # timer() value when last borrowed or returned
+
+
+class DevicePool:
+    """
+    The DevicePool holds open Device instances, keyed by hostname, so that the
+    HTTP connections to each switch are reused across commands within the
+    same process.  Devices that have not been used for `idle_timeout` seconds
+    are closed, and when a new device would take the pool over `max_size`
+    devices the least recently used idle devices are closed first.  Devices
+    that are in use are never closed, so the size cap can be exceeded while
+    more than `max_size` devices are in use at the same time.
+
+    Each open device holds a socket, so by default the size cap is the same
+    open-files budget as the DeviceScheduler concurrency; the idle devices
+    then give way to the devices in flight rather than taking the process
+    over its open-files limit.
+
+    The pool must be closed from within the same event loop that used it;
+    using the pool as an async context manager does so.
+
+    Examples
+    --------
+        async with device_pool:
+            async with device_pool.device("nyc1-leaf01") as dev:
+                await dev.cli("show version")
+    """
+
+    def __init__(self, max_size: Optional[int] = None, idle_timeout: float = 300.0):
+        """
+        Parameters
+        ----------
+        max_size: int, optional
+            The maximum number of devices held open, in use or idle.  When
+            not provided the value is derived from the process open-files
+            limit, see `default_max_concurrency`.
+
+        idle_timeout: float
+            The number of seconds a device can be idle before it is closed.
+        """
+        self.max_size = max_size or default_max_concurrency()
+        self.idle_timeout = idle_timeout
+        self._entries: "OrderedDict[str, _PoolEntry]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, host: str):
+        return host in self._entries
+
+    @asynccontextmanager
+    async def device(self, host: str):
+        """
+        Async context manager that borrows the open Device for the given host,
+        creating it if needed.  The Device is returned to the pool, not
+        closed, when the context exits.
+
+        Parameters
+        ----------
+        host: str
+            The network device hostname
+
+        Yields
+        ------
+        Device
+        """
+        # a new device makes room for itself within the size cap.  The new
+        # entry is added before the evicted devices are closed, so that the
+        # other borrowers see it while the close is awaited.
+
+        closing = self._evictable(room=int(host not in self._entries))
+
+        if not (entry := self._entries.get(host)):
+            entry = self._entries[host] = _PoolEntry(device=Device(host=host))
+
+        self._entries.move_to_end(host)
+        entry.in_use += 1
+
+        try:
+            for evicted in closing:
+                await self._close(evicted)
+
+            yield entry.device
+        finally:
+            entry.in_use -= 1
+            entry.last_used = timer()
+
+    async def evict(self):
+        """
+        Close the devices that have been idle for longer than the idle timeout,
+        and then the least recently used idle devices while the pool is over
+        the size cap.
+        """
+        for entry in self._evictable():
+            await self._close(entry)
+
+    def _evictable(self, room: int = 0) -> List[_PoolEntry]:
+        """
+        Remove, and return, the entries to close: those idle for longer than
+        the idle timeout, and then the least recently used idle entries while
+        the pool, with room for the given number of new devices, is over the
+        size cap.
+        """
+        expired = timer() - self.idle_timeout
+        over = len(self._entries) + room - self.max_size
+        closing: List[_PoolEntry] = list()
+
+        # the entries are ordered by last borrowed, so once a recently used
+        # entry is found the remaining entries are not considered.
+
+        for host, entry in list(self._entries.items()):
+            if entry.in_use:
+                continue
+
+            if entry.last_used < expired or over > 0:
+                del self._entries[host]
+                closing.append(entry)
+                over -= 1
+                continue
+
+            break
+
+        return closing
+
+    async def aclose(self):
+        """Close all of the devices held by the pool."""
+        entries = list(self._entries.values())
+        self._entries.clear()
+
+        for entry in entries:
+            await self._close(entry)
+
+    @staticmethod
+    async def _close(entry: _PoolEntry):
+        # see SafeAsyncHTTPTransport for why RuntimeError is suppressed.
+        with contextlib.suppress(RuntimeError):
+            await entry.device.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *vargs):
+        await self.aclose()
+
+
+# The per-process device pool used by all of the commands.
+
+device_pool = DevicePool()
+
+
+def run_with_pool(coro: Awaitable[T]) -> T:
+    """
+    Run the command coroutine in a new event loop, see event_loop.run,
+    closing the device pool before the event loop is closed.
+
+    Parameters
+    ----------
+    coro: Awaitable
+        The command coroutine, for example `inventory_versions.main(...)`
+
+    Returns
+    -------
+    The result of the coroutine.
+    """
+
+    async def _run():
+        async with device_pool:
+            return await coro
+
+    return event_loop.run(_run())
@@ -0,0 +1,122 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the selection, and tuning, of the event loop that the
+#    commands run in.  The loop implementations are:
+#
+#       asyncio     - the Python standard library event loop
+#       uvloop      - the optional `uvloop` package, a faster loop built on
+#                     libuv, which lowers the per-connection overhead when
+#                     thousands of TLS sessions are open
+#
+#    The thread pool size sets how many blocking calls, the DNS lookups, can
+#    run at the same time: the loop default executor for asyncio, and the
+#    libuv thread pool for uvloop.  The settings are kept in environment
+#    variables so that they are inherited by worker processes.
+#
+#    The event loop modules are imported by `run`, rather than on import, as
+#    this module is loaded by the CLI before any command runs.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+from importlib.util import find_spec
+from typing import Optional, Awaitable, TypeVar
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["LOOP_CHOICES", "configure", "loop_name", "run"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+T = TypeVar("T")
+
+# "auto" is uvloop when it is installed, else asyncio.
+
+LOOP_CHOICES = ("auto", "asyncio", "uvloop")
+
+
+def configure(loop: str = "auto", executor_workers: Optional[int] = None):
+    """
+    Select the event loop, and the thread pool size, used by `run` in this
+    process and in the worker processes it starts.
+
+    Parameters
+    ----------
+    loop: str
+        One of LOOP_CHOICES.
+
+    executor_workers: int, optional
+        The number of threads for blocking calls.  When not provided, the
+        loop default is used.
+
+    Raises
+    ------
+    ValueError
+        The loop is not known, or uvloop is selected and is not installed.
+    """
+    if loop not in LOOP_CHOICES:
+        raise ValueError(f"Unknown event loop '{loop}'")
+
+    if loop == "uvloop" and not find_spec("uvloop"):
+        raise ValueError("The uvloop event loop requires the 'uvloop' package")
+
+    os.environ["DEMO_EVENT_LOOP"] = loop
+
+    if executor_workers:
+        os.environ["DEMO_EXECUTOR_WORKERS"] = str(executor_workers)
+
+        # libuv reads its thread pool size when the pool is first used.
+
+        os.environ["UV_THREADPOOL_SIZE"] = str(executor_workers)
+
+
+def loop_name() -> str:
+    """returns the name of the event loop used by `run`, "asyncio" or "uvloop" """
+    loop = os.environ.get("DEMO_EVENT_LOOP", "auto")
+
+    if loop == "auto":
+        return "uvloop" if find_spec("uvloop") else "asyncio"
+
+    return loop
+
+
+def run(coro: Awaitable[T]) -> T:
+    """
+    Run the coroutine in a new event loop, as asyncio.run, using the event
+    loop and thread pool size selected by `configure`.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    async def _main():
+        if workers := int(os.environ.get("DEMO_EXECUTOR_WORKERS") or 0):
+            asyncio.get_running_loop().set_default_executor(
+                ThreadPoolExecutor(max_workers=workers)
+            )
+
+        return await coro
+
+    if loop_name() != "uvloop":
+        return asyncio.run(_main())
+
+    # the loop factory is used where supported, since the event loop policies
+    # are deprecated from Python 3.14.
+
+    import uvloop
+
+    if sys.version_info >= (3, 12):
+        return asyncio.run(_main(), loop_factory=uvloop.new_event_loop)
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return asyncio.run(_main())
@@ -9,28 +9,44 @@
 # System Imports
 # -----------------------------------------------------------------------------
 
+import re
 import asyncio
-from typing import List, Optional
-from dataclasses import dataclass
+from pathlib import Path
+from ipaddress import ip_address, ip_network, IPv4Network, IPv6Network
+from typing import List, Optional, Dict, Set, Tuple, Union
+from dataclasses import dataclass, field
 
 # -----------------------------------------------------------------------------
 # Public Imports
 # -----------------------------------------------------------------------------
 
 from macaddr import MacAddress
+from rich.console import Console
 
 # -----------------------------------------------------------------------------
 # Private Imports
 # -----------------------------------------------------------------------------
 
-from .progressbar import Progress
 from .arista_eos import Device
+from .fleet import FleetCommand, run_fleet
+from .progressbar import Progress
+from .scheduler import DeviceScheduler, default_site_of, is_access_layer
+from .macindex import MacIndex, macaddr_to_int
 
 # -----------------------------------------------------------------------------
 # Exports
 # -----------------------------------------------------------------------------
 
-__all__ = ["main"]
+__all__ = [
+    "main",
+    "main_batch",
+    "read_macaddrs",
+    "SearchHints",
+    "SiteHints",
+    "FindHostCommand",
+    "FindHostsCommand",
+    "plan_search",
+]
 
 # -----------------------------------------------------------------------------
 #
@@ -47,13 +63,221 @@ class FindHostSearchResults:
     interface: str  # the interface on the network device
 
 
-async def main(inventory: List[str], macaddr: MacAddress):
+@dataclass()
+class SearchHints:
+    """Where the end-host is likely to be found, used to order the search"""
+
+    last_device: Optional[str] = None  # the device where last found
+    sites: Set[str] = field(default_factory=set)  # the likely sites
+
+
+class SiteHints:
+    """
+    The SiteHints map a MAC address OUI, or an IP subnet, to the sites where
+    the end-hosts are likely found; for example the OUI of the phones
+    deployed in one building.  The hints file has an OUI, or subnet, and a
+    site name per line; blank lines and lines starting with "#" are ignored.
+
+    Examples
+    --------
+        # hints file
+        00:1b:4f       nyc1
+        10.20.0.0/16   nyc1
+    """
+
+    def __init__(self):
+        self.ouis: Dict[int, Set[str]] = dict()
+        self.subnets: List[Tuple[Union[IPv4Network, IPv6Network], str]] = list()
+
+    @classmethod
+    def load(cls, filepath: Path) -> "SiteHints":
+        """
+        Returns the hints read from the file.
+
+        Raises
+        ------
+        ValueError - a line is not an OUI, or subnet, and a site name.
+        """
+        hints = cls()
+
+        with Path(filepath).open() as ifile:
+            for line_no, line in enumerate(ifile, start=1):
+                if not (line := line.strip()) or line.startswith("#"):
+                    continue
+
+                try:
+                    prefix, site = line.split()
+                    if "/" in prefix:
+                        hints.subnets.append((ip_network(prefix, strict=False), site))
+                    else:
+                        oui = macaddr_to_int(f"{prefix}:00:00:00") >> 24
+                        hints.ouis.setdefault(oui, set()).add(site)
+                except ValueError:
+                    raise ValueError(
+                        f"{filepath}:{line_no}: expected an OUI, or subnet, and a site"
+                    ) from None
+
+        return hints
+
+    def sites(self, macaddr: MacAddress, ipaddr: Optional[str] = None) -> Set[str]:
+        """returns the sites of the MAC address OUI, and of the IP address"""
+        sites = set(self.ouis.get(macaddr_to_int(macaddr) >> 24, ()))
+
+        if ipaddr:
+            ipaddr = ip_address(ipaddr)
+            sites.update(site for subnet, site in self.subnets if ipaddr in subnet)
+
+        return sites
+
+
+def plan_search(
+    inventory: List[str], hints: Optional[SearchHints] = None
+) -> List[List[str]]:
+    """
+    Returns the inventory ordered into the waves of the search, most likely
+    devices first; a wave is only searched when the end-host was not found in
+    the waves before it.  The waves are:
+
+        (1) the device where the end-host was last found
+        (2) the access-layer devices of the hinted sites, and of the last
+            found device
+        (3) the other access-layer devices
+        (4) the remaining devices, for example spines
+
+    Empty waves are not included.
+    """
+    hints = hints or SearchHints()
+    sites = set(hints.sites)
+    waves: List[List[str]] = [[], [], [], []]
+
+    if hints.last_device:
+        sites.add(default_site_of(hints.last_device))
+
+    for device in inventory:
+        if device == hints.last_device:
+            waves[0].append(device)
+        elif not is_access_layer(device):
+            waves[3].append(device)
+        elif default_site_of(device) in sites:
+            waves[1].append(device)
+        else:
+            waves[2].append(device)
+
+    return [wave for wave in waves if wave]
+
+
+class FindHostCommand(FleetCommand[Optional[FindHostSearchResults]]):
+    """The search of the devices for the end-host, until found"""
+
+    description = "Locating host"
+
+    def __init__(self, macaddr: MacAddress):
+        self.macaddr = macaddr
+        self.found: Optional[FindHostSearchResults] = None
+
+    async def extract(self, dev: Device) -> Optional[FindHostSearchResults]:
+        """
+        This function examines a specific network device for the end-host MAC
+        address.  If the MAC address is found on a network "edge-port" then
+        return the search results.  Otherwise, return None.
+        """
+
+        # if the MAC address is not on this device, then return None.
+        if not (interface := await dev.find_macaddr(self.macaddr)):
+            return None
+
+        # if the MAC address is found, but not on an edge-port, then return
+        # None.
+        if not await dev.is_edge_port(interface=interface):
+            return None
+
+        # If here, then the MAC address was found on this device on an edge-port.
+        return FindHostSearchResults(device=dev.host, interface=interface)
+
+    def reduce(self, host: str, result: Optional[FindHostSearchResults]):
+        self.found = self.found or result
+
+    @property
+    def done(self) -> bool:
+        return self.found is not None
+
+
+class FindHostsCommand(FleetCommand[List[Tuple[int, FindHostSearchResults]]]):
+    """
+    The search of the devices for any of the wanted end-hosts.  Each end-host
+    is printed, as a CSV line, when first located.
+    """
+
+    description = "Locating hosts"
+
+    def __init__(self, wanted: Dict[int, MacAddress]):
+        self.wanted = wanted  # the MAC addresses, see `macaddr_to_int`
+        self.located: Set[int] = set()
+        self.console: Optional[Console] = None
+
+    async def extract(self, dev: Device) -> List[Tuple[int, FindHostSearchResults]]:
+        """
+        This function examines a specific network device for any of the
+        wanted end-host MAC addresses.  The full MAC address table is
+        collected once and joined against the wanted MAC addresses.  Only the
+        distinct interfaces of the matching entries are checked for being
+        edge-ports.
+
+        Returns
+        -------
+        List - (MAC address integer, search results) for each wanted end-host
+        found on an edge-port of the device; could be empty.
+        """
+        matched = [
+            (mac_int, interface)
+            for macaddr, interface in await dev.mac_address_table()
+            if (mac_int := macaddr_to_int(macaddr)) in self.wanted
+        ]
+
+        if not matched:
+            return []
+
+        interfaces = sorted({interface for _, interface in matched})
+        edge_ports = await asyncio.gather(
+            *(dev.is_edge_port(intf) for intf in interfaces)
+        )
+        edge_ports = {intf for intf, is_edge in zip(interfaces, edge_ports) if is_edge}
+
+        return [
+            (mac_int, FindHostSearchResults(device=dev.host, interface=interface))
+            for mac_int, interface in matched
+            if interface in edge_ports
+        ]
+
+    def reduce(self, host: str, found: List[Tuple[int, FindHostSearchResults]]):
+        for mac_int, result in found:
+            if mac_int in self.located:
+                continue
+
+            self.located.add(mac_int)
+            (self.console or Console()).print(
+                f"{self.wanted[mac_int]},{result.device},{result.interface}",
+                highlight=False,
+            )
+
+
+async def main(
+    inventory: List[str],
+    macaddr: MacAddress,
+    scheduler: Optional[DeviceScheduler] = None,
+    index: Optional[MacIndex] = None,
+    hints: Optional[SearchHints] = None,
+):
     """
     Given an inventory of devices and the MAC address to locate, try to find
     the location of the end-host.  As a result of checking the network, the
     User will see an output of either "found" identifying the network device
     and port, or "Not found".
 
+    If a MAC index is provided and the MAC address is indexed on an edge-port
+    then the network is not searched.  Otherwise the network is searched in
+    waves, most likely devices first, see `plan_search`.
+
     Parameters
     ----------
     inventory: List[str]
@@ -61,19 +285,123 @@ async def main(inventory: List[str], macaddr: MacAddress):
 
     macaddr: MacAddress
         The end-host MAC addresss to locate
+
+    scheduler: DeviceScheduler, optional
+        Limits the number of devices searched at the same time.
+
+    index: MacIndex, optional
+        The MAC address index, checked before searching the network.
+
+    hints: SearchHints, optional
+        Where the end-host is likely to be found.
     """
 
+    if index and (entry := index.lookup(macaddr)) and entry.edge_port:
+        print(f"Using MAC index, {int(index.age)}s old")
+        _report(macaddr, FindHostSearchResults(entry.device, entry.interface))
+        return
+
     with Progress() as progressbar:
 
-        found = await _search_network(
-            inventory, macaddr=macaddr, progressbar=progressbar
+        found, failed = await _search_network(
+            inventory,
+            macaddr=macaddr,
+            progressbar=progressbar,
+            scheduler=scheduler,
+            hints=hints,
         )
 
+    _report(macaddr, found, failed)
+
+
+def _report(
+    macaddr: MacAddress,
+    found: Optional[FindHostSearchResults],
+    failed: Optional[List[Tuple[str, str]]] = None,
+):
     if not found:
         print("Not found.")
-        return
+    else:
+        print(f"Found {macaddr} on device {found.device}, interface {found.interface}")
+
+    for host, error in failed or ():
+        print(f"FAILED: {host}: {error}")
+
+
+async def main_batch(
+    inventory: List[str],
+    macaddrs: List[MacAddress],
+    scheduler: Optional[DeviceScheduler] = None,
+):
+    """
+    Given an inventory of devices and a list of MAC addresses, locate each of
+    the end-hosts with a single pass over the network.  Each end-host found is
+    output as soon as it is located, one CSV line of MAC address, device and
+    interface; the end-hosts not found are listed at the end.
+
+    Parameters
+    ----------
+    inventory: List[str]
+        The list of network devices to check.
+
+    macaddrs: List[MacAddress]
+        The end-host MAC addresses to locate
+
+    scheduler: DeviceScheduler, optional
+        Limits the number of devices searched at the same time.
+    """
+    command = FindHostsCommand({macaddr_to_int(mac): mac for mac in macaddrs})
 
-    print(f"Found {macaddr} on device {found.device}, interface {found.interface}")
+    with Progress() as progressbar:
+        command.console = progressbar.console
+        failed = await run_fleet(
+            inventory, command, scheduler=scheduler, progressbar=progressbar
+        )
+
+    for mac_int in command.wanted.keys() - command.located:
+        print(f"Not found: {command.wanted[mac_int]}")
+
+    for host, error in failed:
+        print(f"FAILED: {host}: {error}")
+
+
+def read_macaddrs(filepath: Path) -> Tuple[List[MacAddress], int]:
+    """
+    Read the MAC addresses from the file.  The first MAC address on each line
+    is used, so that files such as DHCP lease dumps can be used as-is.  Blank
+    lines and lines starting with "#" are ignored.
+
+    Parameters
+    ----------
+    filepath: Path
+        The file of MAC addresses
+
+    Returns
+    -------
+    Tuple:
+        List - the distinct MAC addresses, in file order
+        int - the number of lines that did not contain a MAC address
+    """
+    macaddrs: Dict[int, MacAddress] = dict()
+    skipped = 0
+
+    with Path(filepath).open() as ifile:
+        for line in ifile:
+            if not (line := line.strip()) or line.startswith("#"):
+                continue
+
+            for token in re.split(r"[\s,;]+", line):
+                try:
+                    macaddr = MacAddress(token)
+                except ValueError:
+                    continue
+
+                macaddrs.setdefault(macaddr_to_int(macaddr), macaddr)
+                break
+            else:
+                skipped += 1
+
+    return list(macaddrs.values()), skipped
 
 
 # -----------------------------------------------------------------------------
@@ -84,12 +412,20 @@ async def main(inventory: List[str], macaddr: MacAddress):
 
 
 async def _search_network(
-    inventory: List[str], macaddr: MacAddress, progressbar: Progress
-) -> Optional[FindHostSearchResults]:
+    inventory: List[str],
+    macaddr: MacAddress,
+    progressbar: Progress,
+    scheduler: Optional[DeviceScheduler] = None,
+    hints: Optional[SearchHints] = None,
+) -> Tuple[Optional[FindHostSearchResults], List[Tuple[str, str]]]:
     """
     This function searches the network of the given inventory for the end-host
     with thive MAC address.  If the end-host is found then the results are
     retured in a "search results" dataclass. If not found, then return None.
+    The devices are searched in the waves of `plan_search`, and the search
+    stops at the first wave that finds the end-host.  The devices that failed
+    in the waves searched are returned too, since the end-host could be
+    connected to one of them.
 
     Parameters
     ----------
@@ -102,83 +438,61 @@ async def _search_network(
     progressbar: Progress
         A progress-bar CLI widget to indicate progress to the User.
 
+    scheduler: DeviceScheduler, optional
+        Limits the number of devices searched at the same time.  If not
+        provided, a scheduler with the default limits is used.
+
+    hints: SearchHints, optional
+        Where the end-host is likely to be found.
+
     Returns
     -------
-    Optional[FindHostSearchResults] - as described.
+    Tuple:
+        Optional[FindHostSearchResults] - as described.
+        List - the (hostname, error) of each device that failed.
     """
 
-    check_device_tasks = {
-        asyncio.create_task(_device_find_host_macaddr(device=device, macaddr=macaddr))
-        for device in inventory
-    }
-
-    found = None
-    search_completed = asyncio.Event()
-
+    scheduler = scheduler or DeviceScheduler()
     pb_task = progressbar.add_task(
-        description="Locating host", total=len(check_device_tasks)
+        description="Locating host", total=len(inventory), scheduler=scheduler
     )
+    failed: List[Tuple[str, str]] = list()
 
-    def _on_done(done_task: asyncio.Task):
-        nonlocal found
-        check_device_tasks.remove(done_task)
-
-        if done_task.cancelled():
-            return
-
-        progressbar.update(pb_task, advance=1)
-
-        if _result := done_task.result():  # found macaddr on device edge-port
-            found = _result
-            search_completed.set()
-
-        elif not check_device_tasks:  # done with all device-checks
-            search_completed.set()
-
-    for todo in check_device_tasks:
-        todo.add_done_callback(_on_done)
-
-    # wait for the search to be over, and if found, then cancel any of the
-    # remaining check tasks.
-
-    await search_completed.wait()
-
-    for pending in check_device_tasks:
-        pending.cancel()
+    for wave in plan_search(inventory, hints):
+        found, wave_failed = await _search_wave(
+            wave, macaddr, progressbar, pb_task, scheduler=scheduler
+        )
+        failed.extend(wave_failed)
+        if found:
+            return found, failed
 
-    return found
+    return None, failed
 
 
-async def _device_find_host_macaddr(
-    device: str, macaddr: MacAddress
-) -> Optional[FindHostSearchResults]:
+async def _search_wave(
+    inventory: List[str],
+    macaddr: MacAddress,
+    progressbar: Progress,
+    pb_task,
+    scheduler: DeviceScheduler,
+) -> Tuple[Optional[FindHostSearchResults], List[Tuple[str, str]]]:
     """
-    This function examines a specific network device for the given end-host MAC
-    address.  If the MAC address is found on a network "edge-port" then return
-    the search results.  Otherwise, return None.
-
-    Parameters
-    ----------
-    device: str
-        The network device hostname
-
-    macaddr: MacAddress
-        The end-host MAC address
+    This function searches the devices of one wave at the same time, as
+    limited by the scheduler.  Once the end-host is found the remaining
+    device checks are cancelled.
 
     Returns
     -------
-    Optional[FindHostSearchResults] - as described.
+    Tuple - as _search_network, for the devices of the wave.
     """
+    command = FindHostCommand(macaddr)
+
+    failed = await run_fleet(
+        inventory,
+        command,
+        scheduler=scheduler,
+        progressbar=progressbar,
+        task_id=pb_task,
+    )
 
-    async with Device(host=device) as dev:
-        # if the MAC address is not on this device, then return None.
-        if not (interface := await dev.find_macaddr(macaddr)):
-            return None
-
-        # if the MAC address is found, but not on an edge-port, then return
-        # None.
-        if not await dev.is_edge_port(interface=interface):
-            return None
-
-        # If here, then the MAC address was found on this device on an edge-port.
-        return FindHostSearchResults(device=dev.host, interface=interface)
+    return command.found, failed
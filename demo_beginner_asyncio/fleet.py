@@ -0,0 +1,211 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the fleet command engine that the CLI commands run
+#    on.  A FleetCommand is a query of the network in two parts:
+#
+#       extract     - returns the result of one device, using the device
+#                     session; run for each device of the inventory
+#       reduce      - adds the result of a device to the command aggregate,
+#                     as each device completes, and returns the records of
+#                     the device to write to an output sink
+#
+#    `run_fleet` runs the command on the inventory: within the concurrency
+#    limits, retries, hedging and deadline of the DeviceScheduler, over the
+#    device sessions of the DevicePool, showing the progress bar, and writing
+#    the records to the sink.  A new query provides only the two functions,
+#    and gets the performance features of the engine.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import List, Tuple, Dict, Any, Optional, Iterable, Sequence
+from typing import Callable, Awaitable, TypeVar, Generic
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .arista_eos import Device
+from .device_pool import device_pool
+from .progressbar import Progress
+from .scheduler import DeviceScheduler
+from .sinks import RecordSink
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["FleetCommand", "FleetQuery", "run_fleet"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+T = TypeVar("T")
+
+# the records of a device result, written to an output sink.
+
+Records = Optional[Iterable[Dict[str, Any]]]
+
+
+class FleetCommand(Generic[T]):
+    """
+    The command run on each device by `run_fleet`.  The subclass extracts
+    the result of a device, and reduces the results of the devices into the
+    command aggregate, for example a count of the OS versions.
+    """
+
+    description: str = ""  # shown by the progress bar
+
+    async def extract(self, dev: Device) -> T:
+        """
+        Returns the result of the device.  An exception fails the device;
+        a transient failure is retried by the scheduler.
+        """
+        raise NotImplementedError()
+
+    def reduce(self, host: str, result: T) -> Records:
+        """
+        Add the device result, from `extract`, to the command aggregate.
+        Returns the records of the device for the output sink, or None.
+        """
+        raise NotImplementedError()
+
+    @property
+    def done(self) -> bool:
+        """
+        True once the command has its answer, for example the end-host was
+        found; the devices not yet completed are then cancelled.
+        """
+        return False
+
+
+class FleetQuery(FleetCommand[T]):
+    """
+    The FleetCommand of the extract and reduce functions, for a query that
+    does not need a class of its own.
+
+    Examples
+    --------
+        versions = Counter()
+        query = FleetQuery(
+            "Inventory versions",
+            extract=lambda dev: dev.cli("show version"),
+            reduce=lambda host, ver_info: versions.update([ver_info["version"]]),
+        )
+        failed = await run_fleet(inventory, query)
+    """
+
+    def __init__(
+        self,
+        description: str,
+        extract: Callable[[Device], Awaitable[T]],
+        reduce: Callable[[str, T], Records],
+    ):
+        self.description = description
+        self._extract = extract
+        self._reduce = reduce
+
+    async def extract(self, dev: Device) -> T:
+        return await self._extract(dev)
+
+    def reduce(self, host: str, result: T) -> Records:
+        return self._reduce(host, result)
+
+
+async def run_fleet(
+    inventory: Sequence[str],
+    command: FleetCommand,
+    scheduler: Optional[DeviceScheduler] = None,
+    progressbar: Optional[Progress] = None,
+    task_id=None,
+    sink: Optional[RecordSink] = None,
+    deadline: Optional[float] = None,
+) -> List[Tuple[str, str]]:
+    """
+    Run the command on each device of the inventory, reducing each device
+    result as the device completes.  A device that fails, or does not
+    complete by the deadline, does not stop the others; it is returned in the
+    failed list.
+
+    Parameters
+    ----------
+    inventory: Sequence[str]
+        The network devices to run the command on.
+
+    command: FleetCommand
+        The command.
+
+    scheduler: DeviceScheduler, optional
+        Limits the number of devices worked on at the same time, and retries
+        the failures.  If not provided, a scheduler with the default limits is
+        used.
+
+    progressbar: Progress, optional
+        When provided, the progress of the devices is shown; by a new task
+        with the command description, or by the given task.
+
+    task_id: optional
+        The task of the progress bar advanced, rather than a new task; for
+        example to run a command on the inventory in parts.
+
+    sink: RecordSink, optional
+        When provided, the records returned by `reduce` are written to the
+        sink.
+
+    deadline: float, optional
+        The seconds within which the command must complete.
+
+    Returns
+    -------
+    List - the (hostname, error) of each device that failed.
+    """
+    scheduler = scheduler or DeviceScheduler()
+    failed: List[Tuple[str, str]] = list()
+
+    if progressbar and task_id is None:
+        task_id = progressbar.add_task(
+            description=command.description, total=len(inventory), scheduler=scheduler
+        )
+
+    results = scheduler.map(inventory, _extract, command, deadline=deadline)
+
+    try:
+        async for this_dev in results:
+            if progressbar:
+                progressbar.advance(task_id=task_id, failed=not this_dev.ok)
+
+            if not this_dev.ok:
+                failed.append((this_dev.host, this_dev.error))
+                continue
+
+            records = command.reduce(this_dev.host, this_dev.result)
+            if sink and records:
+                sink.write(records)
+
+            if command.done:
+                break
+
+    finally:
+        # cancels the devices not completed when the command is done.
+        await results.aclose()
+
+    return failed
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 PRIVATE CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+async def _extract(host: str, command: FleetCommand):
+    """returns the command result of the device, see FleetCommand.extract"""
+    async with device_pool.device(host) as dev:
+        return await command.extract(dev)
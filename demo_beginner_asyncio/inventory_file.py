@@ -0,0 +1,171 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the inventory file loader.  The file is read a line,
+#    or row, at a time; blank lines, comments and duplicate devices are
+#    dropped, and the devices can be selected by their site and role.  The
+#    supported formats, by file suffix, are:
+#
+#       text        - a device hostname per line, optionally followed by
+#                     key=value tags, for example "nyc1-leaf01 role=leaf".
+#                     Lines starting with "#" are ignored.
+#       .csv        - CSV with a header line that includes a "host" column;
+#                     the other columns are tags.
+#       .yaml/.yml  - a list of hostnames, or of mappings with a "host" key;
+#                     requires the optional PyYAML package.
+#
+#    A device without a "site" or "role" tag is given the site and role of
+#    its hostname, see `default_site_of` and `default_role_of`.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import csv
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import List, Dict, Iterator, Collection
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .scheduler import default_site_of, default_role_of
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["InventoryDevice", "read_inventory", "load_inventory"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+@dataclass()
+class InventoryDevice:
+    """A device of the inventory file"""
+
+    host: str  # the network device hostname
+    tags: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def site(self) -> str:
+        return self.tags.get("site") or default_site_of(self.host)
+
+    @property
+    def role(self) -> str:
+        return self.tags.get("role") or default_role_of(self.host)
+
+
+def read_inventory(filepath: Path) -> Iterator[InventoryDevice]:
+    """
+    Yields each device of the inventory file, in file order, including any
+    duplicates.
+
+    Raises
+    ------
+    ValueError - the file content is not in the expected format.
+    """
+    filepath = Path(filepath)
+    suffix = filepath.suffix.lower()
+
+    if suffix == ".csv":
+        yield from _read_csv(filepath)
+    elif suffix in (".yaml", ".yml"):
+        yield from _read_yaml(filepath)
+    else:
+        yield from _read_text(filepath)
+
+
+def load_inventory(
+    filepath: Path, sites: Collection[str] = (), roles: Collection[str] = ()
+) -> List[str]:
+    """
+    Returns the distinct device hostnames of the inventory file, in file
+    order, of the given sites and roles.
+
+    Parameters
+    ----------
+    filepath: Path
+        The inventory file
+
+    sites: Collection[str], optional
+        When given, only the devices of these sites.
+
+    roles: Collection[str], optional
+        When given, only the devices of these roles.
+    """
+    hosts: Dict[str, None] = dict()
+
+    for device in read_inventory(filepath):
+        if device.host in hosts:
+            continue
+        if sites and device.site not in sites:
+            continue
+        if roles and device.role not in roles:
+            continue
+        hosts[device.host] = None
+
+    return list(hosts)
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 PRIVATE CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+def _read_text(filepath: Path) -> Iterator[InventoryDevice]:
+    with filepath.open() as ifile:
+        for line_no, line in enumerate(ifile, start=1):
+            if not (line := line.strip()) or line.startswith("#"):
+                continue
+
+            host, *tags = line.split()
+            try:
+                yield InventoryDevice(host, dict(tag.split("=", 1) for tag in tags))
+            except ValueError:
+                raise ValueError(
+                    f"{filepath}:{line_no}: expected key=value tags after the host"
+                ) from None
+
+
+def _read_csv(filepath: Path) -> Iterator[InventoryDevice]:
+    with filepath.open(newline="") as ifile:
+        reader = csv.DictReader(ifile)
+        if "host" not in (reader.fieldnames or ()):
+            raise ValueError(f"{filepath}: expected a 'host' column")
+
+        for row in reader:
+            if not (host := (row.pop("host") or "").strip()):
+                continue
+            tags = {key: value.strip() for key, value in row.items() if key and value}
+            yield InventoryDevice(host, tags)
+
+
+def _read_yaml(filepath: Path) -> Iterator[InventoryDevice]:
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError(f"{filepath}: reading YAML requires the PyYAML package")
+
+    with filepath.open() as ifile:
+        data = yaml.safe_load(ifile) or []
+
+    if not isinstance(data, list):
+        raise ValueError(f"{filepath}: expected a list of devices")
+
+    for item in data:
+        if isinstance(item, str):
+            yield InventoryDevice(item)
+        elif isinstance(item, dict) and "host" in item:
+            tags = {key: str(value) for key, value in item.items() if key != "host"}
+            yield InventoryDevice(str(item["host"]), tags)
+        else:
+            raise ValueError(f"{filepath}: expected a hostname or a 'host' mapping")
@@ -2,9 +2,9 @@
 # System Imports
 # -----------------------------------------------------------------------------
 
-from typing import Tuple, List
-import asyncio
-from collections import Counter
+from typing import Tuple, List, Optional, Sequence, Dict
+from collections import Counter, defaultdict
+from dataclasses import asdict, fields
 from timeit import default_timer as timer
 
 # -----------------------------------------------------------------------------
@@ -19,14 +19,21 @@ from rich.table import Table
 # -----------------------------------------------------------------------------
 
 from .arista_eos import Device
+from .device_pool import device_pool
+from .fleet import FleetCommand, FleetQuery, run_fleet
 from .progressbar import Progress
-from .netdefs import XcvrStatus
+from .netdefs import XcvrStatus, XcvrTable
+from .scheduler import DeviceScheduler
+from .sinks import RecordSink
+from .analytics import GroupBy
+from .store import ResultStore, StoredResult, content_digest, DEFAULT_MAX_AGE
+from . import event_loop
 
 # -----------------------------------------------------------------------------
 # Exports
 # -----------------------------------------------------------------------------
 
-__all__ = ["main"]
+__all__ = ["main", "main_incremental", "XcvrsCommand", "XCVR_FIELDS"]
 
 # -----------------------------------------------------------------------------
 #
@@ -34,8 +41,54 @@ __all__ = ["main"]
 #
 # -----------------------------------------------------------------------------
 
+# The field names of the transceiver records written to an output sink.
 
-async def main(inventory: List[str]):
+XCVR_FIELDS = ["device"] + [field.name for field in fields(XcvrStatus)]
+
+# The result store command name.
+
+STORE_COMMAND = "xcvrs"
+
+
+class XcvrsCommand(FleetCommand[List[XcvrStatus]]):
+    """
+    The transceivers of each device, collected into an XcvrTable, and the
+    count of each media type.  When down_only is set only the transceivers
+    whose interface is down are kept in the table, which with the counts is
+    all that the report needs; the other records are only written to the
+    output sink, if any.
+    """
+
+    description = "Inventory transceivers"
+
+    def __init__(self, down_only: bool = False):
+        self.down_only = down_only
+        self.xcvrs = XcvrTable()
+        self.types: Counter = Counter()
+
+    async def extract(self, dev: Device) -> List[XcvrStatus]:
+        return await dev.inventory_xcvrs()
+
+    def reduce(self, host: str, dev_xcvrs: List[XcvrStatus]):
+        self.types.update(xcvr.media_type for xcvr in dev_xcvrs)
+        kept = dev_xcvrs
+        if self.down_only:
+            kept = [xcvr for xcvr in dev_xcvrs if not xcvr.intf_oper_up]
+        self.xcvrs.extend(host, kept)
+        return (dict(device=host, **asdict(xcvr)) for xcvr in dev_xcvrs)
+
+    def down(self) -> XcvrTable:
+        """returns the table of the transceivers whose interface is down"""
+        return self.xcvrs if self.down_only else self.xcvrs.down()
+
+
+async def main(
+    inventory: List[str],
+    scheduler: Optional[DeviceScheduler] = None,
+    sink: Optional[RecordSink] = None,
+    deadline: Optional[float] = None,
+    group_by: Optional[GroupBy] = None,
+):
     """
     The main entrypoint for gathering information about the transceivers used
     in the network.  As a result of running this function, the User will
@@ -49,19 +102,162 @@ async def main(inventory: List[str]):
     ----------
     inventory: List[str]
         The list of network devices to collect transceiver information.
+
+    scheduler: DeviceScheduler, optional
+        Limits the number of devices inventoried at the same time.
+
+    sink: RecordSink, optional
+        When provided, each transceiver record is written to the sink as soon
+        as the device inventory completes.
+
+    deadline: float, optional
+        The seconds within which the inventory must complete; the devices not
+        completed by then are reported as failed.
+
+    group_by: GroupBy, optional
+        When provided, the group-by report of the transceivers is printed
+        after the other tables; see analytics.
     """
 
     start_ts = timer()
 
+    # only the group-by report needs every transceiver record; otherwise only
+    # the media type counts and the transceivers that are down are kept.
+
+    command = XcvrsCommand(down_only=not group_by)
+
     with Progress() as progressbar:
-        ifx_types, ifs_down = await _inventory_network(inventory, progressbar)
+        failed = await run_fleet(
+            inventory,
+            command,
+            scheduler=scheduler,
+            progressbar=progressbar,
+            sink=sink,
+            deadline=deadline,
+        )
 
     end_ts = timer()
-    _report(ifx_types, ifs_down)
-    print(f"elapsed time: {end_ts - start_ts}")
+    _report(command.types, command.down(), failed)
+    if group_by:
+        group_by.report(command.xcvrs)
+
+    print(f"elapsed time: {end_ts - start_ts} ({event_loop.loop_name()} loop)")
+
+
+async def main_incremental(
+    inventory: List[str],
+    store: ResultStore,
+    scheduler: Optional[DeviceScheduler] = None,
+    max_age: float = DEFAULT_MAX_AGE,
+    deadline: Optional[float] = None,
+    group_by: Optional[GroupBy] = None,
+):
+    """
+    The incremental form of `main`.  The boot marker of each device is checked
+    first, a cheap request; only the devices that rebooted, or whose stored
+    result is stale or missing, are re-polled for their transceivers.  The
+    report covers the whole inventory, using the stored results of the other
+    devices, followed by the transceiver changes since the previous run.
+
+    Parameters
+    ----------
+    inventory: List[str]
+        The list of network devices to collect transceiver information.
+
+    store: ResultStore
+        The store of the previous results; updated with the re-polled results.
+
+    scheduler: DeviceScheduler, optional
+        Limits the number of devices inventoried at the same time.
+
+    max_age: float
+        The seconds after which a stored result is re-polled, see
+        `StoredResult.is_stale`.
+
+    deadline: float, optional
+        The seconds within which the inventory must complete; the devices not
+        completed by then are reported as failed.
+
+    group_by: GroupBy, optional
+        When provided, the group-by report of the transceivers is printed
+        after the other tables; see analytics.
+    """
+    scheduler = scheduler or DeviceScheduler()
+    previous = store.results(STORE_COMMAND)
+    markers: Dict[str, str] = dict()
+    start_ts = timer()
+
+    with Progress() as progressbar:
+        failed = await run_fleet(
+            inventory,
+            FleetQuery(
+                "Checking devices",
+                extract=Device.boot_marker,
+                reduce=markers.__setitem__,
+            ),
+            scheduler=scheduler,
+            progressbar=progressbar,
+            deadline=deadline,
+        )
+
+        to_poll = {
+            host
+            for host in markers
+            if not (prev := previous.get(host))
+            or prev.is_stale(max_age)
+            or prev.marker != markers[host]
+        }
+
+        remaining = deadline and max(deadline - (timer() - start_ts), 0.001)
+        polled, poll_failed = await _inventory_network(
+            list(to_poll), progressbar, scheduler=scheduler, deadline=remaining
+        )
+        failed.extend(poll_failed)
 
+    # store the re-polled results, and build the table of the whole inventory
+    # from the re-polled and the stored results.
 
-def _report(ifx_types, ifs_down):
+    polled_recs: Dict[str, List[dict]] = defaultdict(list)
+    for host, xcvr in polled:
+        polled_recs[host].append(asdict(xcvr))
+
+    poll_failed_hosts = {host for host, _ in poll_failed}
+    changes: List[Tuple[str, str, str, str]] = list()
+    xcvrs = XcvrTable()
+
+    for host in markers:
+        if host in poll_failed_hosts:
+            continue
+
+        if host not in to_poll:
+            xcvrs.extend(host, (XcvrStatus(**rec) for rec in previous[host].data))
+            continue
+
+        data = polled_recs.get(host, [])
+        store.put(STORE_COMMAND, host, data, marker=markers[host])
+
+        if (prev := previous.get(host)) and prev.digest != content_digest(data):
+            changes.extend(_xcvr_changes(prev, data))
+
+    store.commit()
+    xcvrs.merge(polled)
+
+    end_ts = timer()
+    _report(xcvrs.media_type_counts(), xcvrs.down(), failed)
+    if group_by:
+        group_by.report(xcvrs)
+
+    _report_changes(changes)
+    print(
+        f"re-polled {len(to_poll)} of {len(inventory)} devices, "
+        f"{len(markers) - len(to_poll)} reused from the store"
+    )
+    print(f"elapsed time: {end_ts - start_ts} ({event_loop.loop_name()} loop)")
+
+
+def _report(
+    ifx_types: Counter, ifs_down: XcvrTable, failed: Sequence[Tuple[str, str]] = ()
+):
     console = Console()
     console.print(
         "\n",
@@ -70,10 +266,33 @@ def _report(ifx_types, ifs_down):
         ),
     )
 
-    if not ifs_down:
+    if ifs_down:
+        _report_down(console, ifs_down)
+
+    for host, error in failed:
+        print(f"FAILED: {host}: {error}")
+
+
+def _report_changes(changes: List[Tuple[str, str, str, str]]):
+    if not changes:
+        print("No transceiver changes since the previous run")
         return
 
-    cntr_ifs_down = Counter()
+    table = Table(
+        "Device",
+        "Interface",
+        "Previous",
+        "Current",
+        title=f"{len(changes)} Transceiver changes since the previous run",
+        title_justify="left",
+    )
+    for change in sorted(changes):
+        table.add_row(*change)
+
+    Console().print("\n", table)
+
+
+def _report_down(console: Console, ifs_down: XcvrTable):
     ifs_down_table = Table(
         "Device",
         "Interface",
@@ -86,9 +305,9 @@ def _report(ifx_types, ifs_down):
         ifs_down_table.add_row(
             host, xcvr_status.intf_name, xcvr_status.intf_desc, xcvr_status.media_type
         )
-        cntr_ifs_down[xcvr_status.media_type] += 1
 
-    total_ifs_down = sum(cntr_ifs_down.values())
+    cntr_ifs_down = ifs_down.media_type_counts()
+    total_ifs_down = len(ifs_down)
     ifs_down_table.title = (
         f"{total_ifs_down} Interfaces with potentially unused transceivers"
     )
@@ -110,11 +329,17 @@ def _report(ifx_types, ifs_down):
 
 
 async def _inventory_network(
-    inventory: List[str], progressbar: Progress
-) -> Tuple[Counter, List[Tuple[str, XcvrStatus]]]:
+    inventory: List[str],
+    progressbar: Progress,
+    scheduler: Optional[DeviceScheduler] = None,
+    sink: Optional[RecordSink] = None,
+    deadline: Optional[float] = None,
+) -> Tuple[XcvrTable, List[Tuple[str, str]]]:
     """
     This function retrieves the transceivers for each network device in the
-    inventory provided.
+    inventory provided.  A device that fails, or does not complete by the
+    deadline, does not stop the inventory of the others; it is returned in
+    the failed list.
 
     Parameters
     ----------
@@ -124,34 +349,63 @@ async def _inventory_network(
     progressbar: Progress
         A progress bar CLI widget to show progress to the User.
 
+    scheduler: DeviceScheduler, optional
+        Limits the number of devices inventoried at the same time.  If not
+        provided, a scheduler with the default limits is used.
+
+    sink: RecordSink, optional
+        When provided, each device's transceiver records are written to the
+        sink as soon as the device completes; see XCVR_FIELDS.
+
+    deadline: float, optional
+        The seconds within which the inventory must complete.
+
     Returns
     -------
     Tuple:
-        Counter - key is the transceiver media-type, value is the number of this type
-        List - network device interfaces that are operationally down
+        XcvrTable - the transceivers of the network devices that completed.
+        List - the (hostname, error) of each device that failed.
     """
-    tasks = [device_get_transceivers(device) for device in inventory]
-    intfs_down = list()
-    c_xcvr_types = Counter()
-
-    pgt = progressbar.add_task(description="Inventory transceivers", total=len(tasks))
-
-    for this_dev in asyncio.as_completed(tasks):
+    command = XcvrsCommand()
+    failed = await run_fleet(
+        inventory,
+        command,
+        scheduler=scheduler,
+        progressbar=progressbar,
+        sink=sink,
+        deadline=deadline,
+    )
 
-        dev_xcvrs: List[XcvrStatus]
-        dev_name, dev_xcvrs = await this_dev
-        progressbar.advance(task_id=pgt, advance=1)
+    return command.xcvrs, failed
 
-        # inventory each interface transceiver.  If the interfaces is not UP
-        # then mark it as a potential unused transceiver for reclamation.
 
-        for each_xcvr in dev_xcvrs:
-            c_xcvr_types[each_xcvr.media_type] += 1
+async def _inventory_summary(
+    inventory: List[str],
+    progressbar: Progress,
+    scheduler: Optional[DeviceScheduler] = None,
+    deadline: Optional[float] = None,
+) -> Tuple[Counter, XcvrTable, List[Tuple[str, str]]]:
+    """
+    The form of `_inventory_network` that returns only what the report needs,
+    rather than every transceiver record.
 
-            if not each_xcvr.intf_oper_up:
-                intfs_down.append((dev_name, each_xcvr))
+    Returns
+    -------
+    Tuple:
+        Counter - the count of each transceiver media type.
+        XcvrTable - the transceivers whose interface is down.
+        List - the (hostname, error) of each device that failed.
+    """
+    command = XcvrsCommand(down_only=True)
+    failed = await run_fleet(
+        inventory,
+        command,
+        scheduler=scheduler,
+        progressbar=progressbar,
+        deadline=deadline,
+    )
 
-    return c_xcvr_types, intfs_down
+    return command.types, command.xcvrs, failed
 
 
 async def device_get_transceivers(device: str) -> Tuple[str, List[XcvrStatus]]:
@@ -176,12 +430,36 @@ async def device_get_transceivers(device: str) -> Tuple[str, List[XcvrStatus]]:
     as_completed results has the context of the results.
     """
 
-    async with Device(host=device) as dev:
+    async with device_pool.device(device) as dev:
         intfs_xcvrs = await dev.inventory_xcvrs()
 
     return device, intfs_xcvrs
 
 
+def _xcvr_changes(
+    prev: StoredResult, data: List[dict]
+) -> List[Tuple[str, str, str, str]]:
+    """
+    This function returns the (device, interface, previous, current) of each
+    transceiver that was added, removed or changed, between the stored result
+    and the new result of the device.
+    """
+
+    def _state(rec: Optional[dict]) -> str:
+        if not rec:
+            return "-"
+        return f"{rec['media_type']} {'up' if rec['intf_oper_up'] else 'down'}"
+
+    before = {rec["intf_name"]: rec for rec in prev.data}
+    after = {rec["intf_name"]: rec for rec in data}
+
+    return [
+        (prev.device, intf_name, _state(before.get(intf_name)), current)
+        for intf_name in before.keys() | after.keys()
+        if _state(before.get(intf_name)) != (current := _state(after.get(intf_name)))
+    ]
+
+
 def _build_table_ifxcount(ifx_types: Counter, title) -> Table:
     """
     This function returns a rich.Table containing the transceiver media-type
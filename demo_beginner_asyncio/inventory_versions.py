@@ -2,7 +2,7 @@
 # System Imports
 # -----------------------------------------------------------------------------
 
-import asyncio
+from typing import List, Optional, Tuple, Sequence
 from collections import Counter
 
 # -----------------------------------------------------------------------------
@@ -11,19 +11,28 @@ from collections import Counter
 
 from rich.console import Console
 from rich.table import Table
-from rich.progress import Progress
 
 # -----------------------------------------------------------------------------
 # Private Imports
 # -----------------------------------------------------------------------------
 
 from .arista_eos import Device
+from .cli_cache import cli_cache
+from .device_pool import device_pool
+from .fleet import FleetCommand, run_fleet
+from .progressbar import Progress
+from .scheduler import DeviceScheduler
+from .store import ResultStore, StoredResult
 
 # -----------------------------------------------------------------------------
 # Exports
 # -----------------------------------------------------------------------------
 
-__all__ = ["main"]
+__all__ = ["main", "VersionsCommand"]
+
+# The result store command name
+
+STORE_COMMAND = "versions"
 
 
 # -----------------------------------------------------------------------------
@@ -34,29 +43,117 @@ __all__ = ["main"]
 
 
 async def get_version(host: str):
-    async with Device(host=host) as dev:
+    async with device_pool.device(host) as dev:
         return await dev.cli("show version")
 
 
-async def inventory_versions(inventory):
-    tasks = [get_version(host=host) for host in inventory]
-    results = Counter()
+class VersionsCommand(FleetCommand[dict]):
+    """
+    The count of the devices running each OS version, and with a result
+    store, the version and boot marker of each device are stored.
+    """
+
+    description = "Inventory versions"
+
+    def __init__(self, store: Optional[ResultStore] = None):
+        self.versions = Counter()
+        self.store = store
+
+    async def extract(self, dev: Device) -> dict:
+        # the stored boot marker detects a reboot, so is not from the cache.
+
+        with cli_cache.refreshing(self.store is not None):
+            return await dev.cli("show version")
+
+    def reduce(self, host: str, ver_info: dict):
+        self.versions[ver_info["version"]] += 1
+
+        if self.store:
+            self.store.put(
+                STORE_COMMAND,
+                host,
+                dict(version=ver_info["version"]),
+                marker=str(ver_info["bootupTimestamp"]),
+            )
+
+
+async def inventory_versions(
+    inventory: List[str],
+    scheduler: Optional[DeviceScheduler] = None,
+    show_progress: Optional[bool] = True,
+    deadline: Optional[float] = None,
+    store: Optional[ResultStore] = None,
+) -> Tuple[Counter, List[Tuple[str, str]]]:
+    command = VersionsCommand(store=store)
+
+    with Progress(disable=not show_progress) as progress:
+        failed = await run_fleet(
+            inventory,
+            command,
+            scheduler=scheduler,
+            progressbar=progress,
+            deadline=deadline,
+        )
+
+    if store:
+        store.commit()
+
+    return command.versions, failed
+
+
+async def main(
+    inventory: List[str],
+    scheduler: Optional[DeviceScheduler] = None,
+    deadline: Optional[float] = None,
+    store: Optional[ResultStore] = None,
+):
+    # with a result store, the versions are stored and then reported as
+    # changes against the previous run.  The "show version" request is itself
+    # the cheap check, so every device is polled.
+
+    previous = store.results(STORE_COMMAND) if store else {}
+
+    results, failed = await inventory_versions(
+        inventory, scheduler=scheduler, deadline=deadline, store=store
+    )
+    _report(results, failed)
+
+    if store:
+        failed_hosts = {host for host, _ in failed}
+        current = store.results(STORE_COMMAND)
+        _report_changes(
+            [
+                (host, prev, current[host])
+                for host in inventory
+                if host not in failed_hosts and (prev := previous.get(host))
+            ]
+        )
+
+
+def _report(results: Counter, failed: Sequence[Tuple[str, str]] = ()):
+    table = Table("Version", "Count")
+    for version, count in sorted(results.items()):
+        table.add_row(version, str(count))
 
-    with Progress() as progress:
-        pgt = progress.add_task(description="Inventory versions", total=len(tasks))
+    Console().print(table)
 
-        for this_dev in asyncio.as_completed(tasks):
-            ver_info = await this_dev
-            results[ver_info["version"]] += 1
-            progress.advance(task_id=pgt, advance=1)
+    for host, error in failed:
+        print(f"FAILED: {host}: {error}")
 
-    return results
 
+def _report_changes(compared: List[Tuple[str, StoredResult, StoredResult]]):
+    table = Table("Device", "Previous", "Current")
+    rebooted = 0
 
-async def main(inventory):
-    results = await inventory_versions(inventory)
-    table = Table("Version", "Count")
-    for version, count in sorted(results.items()):
-        table.add_row(version, str(count))
+    for host, prev, cur in sorted(compared, key=lambda each: each[0]):
+        rebooted += prev.marker != cur.marker
+        if prev.data["version"] != cur.data["version"]:
+            table.add_row(host, prev.data["version"], cur.data["version"])
 
-    Console().print(table)
+    if table.row_count:
+        table.title = f"{table.row_count} Version changes since the previous run"
+        Console().print(table)
+    else:
+        print("No version changes since the previous run")
+
+    print(f"{rebooted} devices rebooted since the previous run")
@@ -0,0 +1,278 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the JSON codecs used to encode the eAPI requests and
+#    decode the eAPI responses.  Outputs such as "show interfaces transceiver
+#    hardware" and "show mac address-table" on a chassis switch are several
+#    megabytes of JSON, of which the demo commands read a few fields; decoding
+#    them, rather than the network, is the CPU cost of a large run.
+#
+#    The codecs are:
+#
+#       json        - the Python standard library
+#       orjson      - the optional `orjson` package, a faster full decode
+#       msgspec     - the optional `msgspec` package; the outputs of the
+#                     commands in OUTPUT_SHAPES are decoded selectively, only
+#                     the fields the demo commands read are built, and the
+#                     output of each command is decoded on its own.
+#
+#    The codec is chosen by the DEMO_JSON_CODEC environment variable; by
+#    default the fastest installed codec is used.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import os
+import re
+import json
+from typing import List, Dict, Any, Optional, Union, Tuple, Pattern, TypedDict
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "JSON_CODECS",
+    "OUTPUT_SHAPES",
+    "JsonCodec",
+    "StdlibCodec",
+    "OrjsonCodec",
+    "MsgspecCodec",
+    "get_codec",
+    "command_text",
+]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The fields of the command outputs read by the demo commands.  A command
+# whose output is decoded selectively has only these fields; a new use of
+# one of these commands must add the fields it reads.
+
+
+class _XcvrHardware(TypedDict):
+    mediaType: str
+    detectedMediaType: str
+
+
+class _XcvrHardwareOutput(TypedDict):
+    interfaces: Dict[str, _XcvrHardware]
+
+
+class _XcvrDom(TypedDict, total=False):
+    rxPower: float
+    txPower: float
+    temperature: float
+
+
+class _XcvrDomOutput(TypedDict):
+    interfaces: Dict[str, _XcvrDom]
+
+
+class _IntfStatus(TypedDict):
+    description: str
+    lineProtocolStatus: str
+
+
+class _IntfStatusOutput(TypedDict):
+    interfaceStatuses: Dict[str, _IntfStatus]
+
+
+class _MacEntry(TypedDict):
+    macAddress: str
+    interface: str
+
+
+class _MacTable(TypedDict):
+    tableEntries: List[_MacEntry]
+
+
+class _MacTableOutput(TypedDict):
+    unicastTable: _MacTable
+
+
+# the commands, and the shape of the output decoded by a selective codec.
+
+OUTPUT_SHAPES: List[Tuple[Pattern, type]] = [
+    (re.compile(r"show interfaces transceiver hardware$"), _XcvrHardwareOutput),
+    (re.compile(r"show interfaces transceiver$"), _XcvrDomOutput),
+    (re.compile(r"show interfaces status$"), _IntfStatusOutput),
+    (re.compile(r"show mac address-table( address \S+)?$"), _MacTableOutput),
+]
+
+
+def command_text(command: Union[str, dict]) -> str:
+    """returns the command text of an eAPI runCmds command, a string or a dict"""
+    command = command["cmd"] if isinstance(command, dict) else command
+    return " ".join(command.split())
+
+
+class JsonCodec:
+    """
+    The JsonCodec encodes the eAPI JSON-RPC request, and decodes the
+    response.  The subclass of a full decode only needs to provide `dumps`
+    and `loads`.
+    """
+
+    name: str = ""
+
+    def dumps(self, obj: Any) -> bytes:
+        """returns the object encoded as JSON"""
+        raise NotImplementedError()
+
+    def loads(self, data: bytes) -> Any:
+        """returns the decoded JSON"""
+        raise NotImplementedError()
+
+    def decode_response(
+        self, body: bytes, commands: Optional[List[Union[str, dict]]] = None
+    ) -> dict:
+        """
+        Returns the decoded JSON-RPC response of the runCmds request.
+
+        Parameters
+        ----------
+        body: bytes
+            The HTTP response body
+
+        commands: List, optional
+            The commands of the request, used by a selective codec to decode
+            the output of each command.  When not given, for example for a
+            request of "text" output, the response is decoded in full.
+        """
+        return self.loads(body)
+
+
+class StdlibCodec(JsonCodec):
+    """the Python standard library json module"""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """the orjson package"""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecCodec(JsonCodec):
+    """
+    The msgspec package.  The response is decoded with the command outputs
+    left as raw JSON; each output is then decoded on its own, to the shape of
+    OUTPUT_SHAPES when the command has one, and otherwise in full.  Fields
+    not in the shape are skipped by the decoder, rather than built as Python
+    objects and discarded.  The shapes are TypedDicts, so the outputs are
+    plain dicts as with a full decode.
+    """
+
+    name = "msgspec"
+
+    def __init__(self):
+        class _Response(TypedDict, total=False):
+            result: List[msgspec.Raw]
+            error: Any
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._response = msgspec.json.Decoder(_Response)
+        self._shapes = [
+            (pattern, msgspec.json.Decoder(shape)) for pattern, shape in OUTPUT_SHAPES
+        ]
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self._decoder.decode(data)
+
+    def decode_response(
+        self, body: bytes, commands: Optional[List[Union[str, dict]]] = None
+    ) -> dict:
+        if not commands:
+            return self.loads(body)
+
+        res = self._response.decode(body)
+
+        if "result" in res:
+            res["result"] = [
+                self._output_decoder(command).decode(output)
+                for command, output in zip(commands, res["result"])
+            ]
+
+        return res
+
+    def _output_decoder(self, command: Union[str, dict]):
+        """returns the decoder for the output of the command"""
+        text = command_text(command)
+
+        for pattern, decoder in self._shapes:
+            if pattern.match(text):
+                return decoder
+
+        return self._decoder
+
+
+# the codecs by name, fastest first, with whether the package is installed.
+
+JSON_CODECS = {
+    MsgspecCodec.name: (MsgspecCodec, msgspec is not None),
+    OrjsonCodec.name: (OrjsonCodec, orjson is not None),
+    StdlibCodec.name: (StdlibCodec, True),
+}
+
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    """
+    Returns the named codec, from JSON_CODECS.  When no name is given the
+    DEMO_JSON_CODEC environment variable is used, and when that is not set,
+    the fastest codec that is installed.
+
+    Raises
+    ------
+    ValueError
+        The codec is not known, or its package is not installed.
+    """
+    if not (name := name or os.environ.get("DEMO_JSON_CODEC")):
+        name = next(name for name, (_, installed) in JSON_CODECS.items() if installed)
+
+    if name not in JSON_CODECS:
+        raise ValueError(
+            f"Unknown JSON codec '{name}', expected one of: {', '.join(JSON_CODECS)}"
+        )
+
+    codec_cls, installed = JSON_CODECS[name]
+    if not installed:
+        raise ValueError(f"JSON codec '{name}' requires the '{name}' package")
+
+    return codec_cls()
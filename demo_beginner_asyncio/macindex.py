@@ -0,0 +1,321 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the network-wide MAC address index.  The index is
+#    built by collecting the full MAC address table of every device, once,
+#    along with the edge-port classification of each interface.  The
+#    `find-host` command can then locate an end-host from the index rather
+#    than searching the network.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import json
+import time
+import struct
+import asyncio
+from array import array
+from pathlib import Path
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Tuple, Union
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from macaddr import MacAddress
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .arista_eos import Device
+from .fleet import FleetCommand, run_fleet
+from .progressbar import Progress
+from .scheduler import DeviceScheduler
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "main",
+    "MacIndex",
+    "MacIndexEntry",
+    "MacIndexCommand",
+    "macaddr_to_int",
+    "build_index",
+]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# on-disk file header: magic, format version, created timestamp, number of
+# locations JSON bytes, number of MAC addresses.
+
+_FILE_MAGIC = b"DEMOMACX"
+_FILE_HEADER = struct.Struct("<8sHdQQ")
+_FILE_VERSION = 1
+
+
+_MAC_SEPARATORS = str.maketrans("", "", ":.-")
+
+
+def macaddr_to_int(macaddr: Union[str, MacAddress]) -> int:
+    """
+    Returns the 48-bit integer value of the MAC address.  String values are
+    expected in one of the common formats, for example "aa:bb:cc:dd:ee:ff" or
+    "aabb.ccdd.eeff".
+
+    Raises
+    ------
+    ValueError - when the value is not a MAC address.
+    """
+    if isinstance(macaddr, MacAddress):
+        return int("".join(macaddr.chars), 16)
+
+    if len(digits := macaddr.translate(_MAC_SEPARATORS)) != 12:
+        raise ValueError(f"Invalid MAC address: {macaddr}")
+
+    return int(digits, 16)
+
+
+@dataclass()
+class MacIndexEntry:
+    """Identifies where a MAC address was found in the network"""
+
+    device: str  # the network device hostname
+    interface: str  # the interface on the network device
+    edge_port: bool  # True when the interface is an edge-port
+
+
+class MacIndex:
+    """
+    The MacIndex maps a 48-bit integer MAC address to the device and interface
+    where it was learned.  Each distinct (device, interface) location is
+    stored once, and each MAC address maps to a single integer that packs the
+    location number and the edge-port flag.  When a MAC address is learned in
+    more than one location, the edge-port location is kept.
+    """
+
+    def __init__(self, created: Optional[float] = None):
+        """
+        Parameters
+        ----------
+        created: float, optional
+            The time.time() value when the index data was collected; now if
+            not provided.
+        """
+        self.created = created or time.time()
+        self._locations: List[Tuple[str, str]] = list()
+        self._location_ids: Dict[Tuple[str, str], int] = dict()
+        self._macs: Dict[int, int] = dict()
+
+    def __len__(self):
+        return len(self._macs)
+
+    @property
+    def age(self) -> float:
+        """the number of seconds since the index data was collected"""
+        return time.time() - self.created
+
+    def add(self, macaddr: int, device: str, interface: str, edge_port: bool):
+        """
+        Add the MAC address location to the index.
+
+        Parameters
+        ----------
+        macaddr: int
+            The MAC address, see `macaddr_to_int`.
+
+        device: str
+            The network device hostname
+
+        interface: str
+            The interface on the network device
+
+        edge_port: bool
+            True when the interface is an edge-port
+        """
+        location = (device, interface)
+        if (loc_id := self._location_ids.get(location)) is None:
+            loc_id = self._location_ids[location] = len(self._locations)
+            self._locations.append(location)
+
+        # do not replace an edge-port location with a non-edge location
+
+        if not edge_port and (existing := self._macs.get(macaddr)) is not None:
+            if existing & 1:
+                return
+
+        self._macs[macaddr] = loc_id << 1 | edge_port
+
+    def lookup(self, macaddr: Union[int, str, MacAddress]) -> Optional[MacIndexEntry]:
+        """
+        Returns the location of the MAC address, or None if the MAC address is
+        not in the index.
+        """
+        if not isinstance(macaddr, int):
+            macaddr = macaddr_to_int(macaddr)
+
+        if (value := self._macs.get(macaddr)) is None:
+            return None
+
+        device, interface = self._locations[value >> 1]
+        return MacIndexEntry(
+            device=device, interface=interface, edge_port=bool(value & 1)
+        )
+
+    def save(self, filepath: Path):
+        """
+        Save the index to the file.  The MAC addresses and their values are
+        stored as packed 64-bit and 32-bit integer arrays.
+        """
+        locations = json.dumps(self._locations).encode()
+        macs = array("Q", self._macs.keys())
+        values = array("I", self._macs.values())
+
+        with Path(filepath).open("wb") as ofile:
+            ofile.write(
+                _FILE_HEADER.pack(
+                    _FILE_MAGIC, _FILE_VERSION, self.created, len(locations), len(macs)
+                )
+            )
+            ofile.write(locations)
+            ofile.write(macs.tobytes())
+            ofile.write(values.tobytes())
+
+    @classmethod
+    def load(cls, filepath: Path) -> "MacIndex":
+        """
+        Returns the index loaded from the file.
+
+        Raises
+        ------
+        ValueError
+            When the file is not a MAC index file.
+        """
+        data = Path(filepath).read_bytes()
+        magic, version, created, loc_len, n_macs = _FILE_HEADER.unpack_from(data)
+        if magic != _FILE_MAGIC or version != _FILE_VERSION:
+            raise ValueError(f"Not a MAC index file: {filepath}")
+
+        offset = _FILE_HEADER.size
+        locations = json.loads(data[offset : offset + loc_len])
+        offset += loc_len
+
+        macs, values = array("Q"), array("I")
+        macs.frombytes(data[offset : offset + n_macs * macs.itemsize])
+        offset += n_macs * macs.itemsize
+        values.frombytes(data[offset : offset + n_macs * values.itemsize])
+
+        index = cls(created=created)
+        index._locations = [tuple(loc) for loc in locations]
+        index._location_ids = {
+            loc: loc_id for loc_id, loc in enumerate(index._locations)
+        }
+        index._macs = dict(zip(macs, values))
+        return index
+
+
+async def main(
+    inventory: List[str], index_file: Path, scheduler: Optional[DeviceScheduler] = None
+):
+    """
+    Build the MAC address index for the inventory and save it to the file.
+
+    Parameters
+    ----------
+    inventory: List[str]
+        The network devices to collect the MAC address tables from.
+
+    index_file: Path
+        The file to save the index to.
+
+    scheduler: DeviceScheduler, optional
+        Limits the number of devices collected at the same time.
+    """
+    with Progress() as progressbar:
+        index, failed = await build_index(inventory, progressbar, scheduler=scheduler)
+
+    index.save(index_file)
+    print(f"Indexed {len(index):,} MAC addresses to {index_file}")
+
+    for host, error in failed:
+        print(f"FAILED: {host}: {error}")
+
+
+class MacIndexCommand(FleetCommand[List[Tuple[int, str, bool]]]):
+    """The MAC address table of each device, collected into a MacIndex"""
+
+    description = "Indexing MAC addresses"
+
+    def __init__(self):
+        self.index = MacIndex()
+
+    async def extract(self, dev: Device) -> List[Tuple[int, str, bool]]:
+        """
+        This function returns the MAC address table entries of the device,
+        each with the edge-port classification of the interface.  Each
+        distinct interface is classified once.
+
+        Returns
+        -------
+        List - (MAC address integer, interface, edge-port) for each entry
+        """
+        table = await dev.mac_address_table()
+        interfaces = sorted({interface for _, interface in table})
+        edge_ports = dict(
+            zip(
+                interfaces,
+                await asyncio.gather(*(dev.is_edge_port(intf) for intf in interfaces)),
+            )
+        )
+
+        return [
+            (macaddr_to_int(macaddr), interface, edge_ports[interface])
+            for macaddr, interface in table
+        ]
+
+    def reduce(self, host: str, entries: List[Tuple[int, str, bool]]):
+        for macaddr, interface, edge_port in entries:
+            self.index.add(macaddr, host, interface, edge_port)
+
+
+async def build_index(
+    inventory: List[str],
+    progressbar: Progress,
+    scheduler: Optional[DeviceScheduler] = None,
+) -> Tuple[MacIndex, List[Tuple[str, str]]]:
+    """
+    This function builds the MAC address index from the full MAC address table
+    of each network device in the inventory.
+
+    Parameters
+    ----------
+    inventory: List[str]
+        The network devices to collect the MAC address tables from.
+
+    progressbar: Progress
+        A progress bar CLI widget to show progress to the User.
+
+    scheduler: DeviceScheduler, optional
+        Limits the number of devices collected at the same time.
+
+    Returns
+    -------
+    Tuple:
+        MacIndex - the MAC addresses of the network devices that completed.
+        List - the (hostname, error) of each device that failed.
+    """
+    command = MacIndexCommand()
+    failed = await run_fleet(
+        inventory, command, scheduler=scheduler, progressbar=progressbar
+    )
+
+    return command.index, failed
@@ -2,73 +2,309 @@
 # System Imports
 # -----------------------------------------------------------------------------
 
-from typing import List
-from multiprocessing import Pool
-from itertools import islice
+from typing import List, Optional, Deque, Tuple, Dict
+import os
+import queue
 import asyncio
+import multiprocessing
+from math import ceil
+from collections import deque, Counter
+from dataclasses import asdict
 from timeit import default_timer as timer
-from collections import Counter
 
 # -----------------------------------------------------------------------------
 # Private Imports
 # -----------------------------------------------------------------------------
 
 from .progressbar import Progress
+from .netdefs import XcvrTable
+from .scheduler import DeviceScheduler, RetryPolicy, format_error
+from .device_pool import run_with_pool
+from .resources import default_max_concurrency, max_cpu_cores
+from .sinks import RecordSink
+from .analytics import GroupBy
+from .tracing import tracer
+from . import event_loop
 from . import inventory_transceivers as its
 
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["main"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# An additional worker process is not started for fewer than this many
+# devices; the process startup would cost more than it saves.
 
-def chunk(it, size):
+MIN_DEVICES_PER_WORKER = 64
+
+# The seconds between each worker sending its partial results and progress
+# back to the parent process.
+
+REPORT_INTERVAL = 0.2
+
+
+def plan_workers(
+    num_devices: int, max_concurrency: Optional[int] = None
+) -> Tuple[int, int]:
     """
-    https://stackoverflow.com/questions/312443/how-do-you-split-a-list-into-evenly-sized-chunks
+    Returns the number of worker processes, and the per-process concurrency,
+    for the given number of devices.  The number of processes is bounded by
+    the CPU cores, and the per-process concurrency by the open-files limit of
+    each process.  When max_concurrency is given it is the limit for the
+    whole run, and is divided across the worker processes.
+
+    Returns
+    -------
+    Tuple:
+        int - the number of worker processes
+        int - the number of devices each worker process works on at once
     """
-    it = iter(it)
-    return iter(lambda: list(islice(it, size)), [])
+    workers = max(1, min(max_cpu_cores(), num_devices // MIN_DEVICES_PER_WORKER))
+    proc_concurrency = max(1, min(default_max_concurrency(), num_devices))
+
+    if max_concurrency:
+        workers = min(workers, max_concurrency)
+        proc_concurrency = min(proc_concurrency, ceil(max_concurrency / workers))
 
+    return workers, proc_concurrency
 
-def proc_main(inventory: List[str]):
+
+def proc_main(
+    work_q: multiprocessing.Queue,
+    result_q: multiprocessing.Queue,
+    max_concurrency: int,
+    max_per_site: Optional[int] = None,
+    retry: Optional[RetryPolicy] = None,
+    trace: bool = False,
+    down_only: bool = True,
+):
     """
-    Per multiprocessor Process main.  Takes slice of the inventory to
-    process and returns the results
+    Per multiprocessor Process main.  Takes batches of devices from the work
+    queue until there are no more, and sends the partial results back on the
+    result queue: the media type counts, and the transceivers that are down,
+    or every transceiver when down_only is not set.  When trace is set the
+    device spans are sent back with the partial results.
     """
-    with Progress() as progressbar:
-        return asyncio.run(its._inventory_network(inventory, progressbar))
+    tracer.enable(trace)
+    run_with_pool(
+        _worker(work_q, result_q, max_concurrency, max_per_site, retry, down_only)
+    )
 
 
-def main(inventory: List[str]):
+def main(
+    inventory: List[str],
+    max_concurrency: Optional[int] = None,
+    max_per_site: Optional[int] = None,
+    retry: Optional[RetryPolicy] = None,
+    sink: Optional[RecordSink] = None,
+    group_by: Optional[GroupBy] = None,
+):
     """
     Using a multiprocessor approach, perform the inventory of transceivers
-    demonstration.
+    demonstration.  Each worker process runs an asyncio loop that works on
+    many devices at once.  Devices are handed out to the workers in small
+    batches as they have free capacity, so a slow device does not hold up
+    other devices, and the results and progress are streamed back to the
+    parent process as they complete.  The workers send only the media type
+    counts and the transceivers that are down, unless every record is needed
+    by the output sink or the group-by report.
     """
 
-    workers = 4
+    workers, proc_concurrency = plan_workers(len(inventory), max_concurrency)
+    batch_size = max(1, min(proc_concurrency, len(inventory) // (workers * 16)))
+
+    ctx = multiprocessing.get_context()
+    work_q, result_q = ctx.Queue(), ctx.Queue()
 
-    # split the inventory into "workers" chunks so that multiprocessors can
-    # work on each chunk.
+    for i_batch in range(0, len(inventory), batch_size):
+        work_q.put(inventory[i_batch : i_batch + batch_size])
 
-    chunk_c, rem = divmod(len(inventory), workers)
-    pieces: List[List[str]] = list(chunk(inventory, len(inventory) // workers))
-    if rem:
-        rem_p = pieces.pop()
-        pieces[-1].extend(rem_p)
+    for _ in range(workers):
+        work_q.put(None)
 
-    # run the inventory using a multiprocessor Pool constructure
+    site_limit = max_per_site and max(1, max_per_site // workers)
+    down_only = not (sink or group_by)
 
     start_ts = timer()
 
-    with Pool(processes=4) as pool:
-        res = pool.map(proc_main, pieces)
+    procs = [
+        ctx.Process(
+            target=proc_main,
+            args=(work_q, result_q, proc_concurrency, site_limit, retry),
+            kwargs=dict(trace=tracer.enabled, down_only=down_only),
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+
+    for proc in procs:
+        proc.start()
+
+    types: Counter = Counter()
+    xcvrs_down = XcvrTable()
+    xcvrs = XcvrTable()
+    failed: List[Tuple[str, str]] = list()
+    in_flight: Dict[int, int] = dict()
+    running = workers
+
+    with Progress() as progressbar:
+        pgt = progressbar.add_task(
+            description=f"Inventory transceivers ({workers} procs)",
+            total=len(inventory),
+        )
+
+        while running:
+            try:
+                msg, *data = result_q.get(timeout=1.0)
+            except queue.Empty:
+                # guard against a worker process that died without sending
+                # its exit message.
+                if not any(proc.is_alive() for proc in procs):
+                    break
+                continue
+
+            if msg == "exit":
+                running -= 1
+                continue
+
+            (
+                part_types,
+                part_xcvrs,
+                num_done,
+                part_failed,
+                part_spans,
+                worker,
+                worker_flight,
+            ) = data
+
+            types.update(part_types)
+            xcvrs_down.merge(part_xcvrs if down_only else part_xcvrs.down())
+
+            if group_by:
+                xcvrs.merge(part_xcvrs)
+
+            tracer.spans.extend(part_spans)
+            failed.extend(part_failed)
+
+            in_flight[worker] = worker_flight
+            progressbar.update(pgt, in_flight=sum(in_flight.values()))
+            progressbar.advance(pgt, num_done, failed=len(part_failed))
+
+            if sink:
+                sink.write(
+                    dict(device=host, **asdict(xcvr)) for host, xcvr in part_xcvrs
+                )
+
+    for proc in procs:
+        proc.join()
 
     end_ts = timer()
 
-    # Now we need to recombine the results of each of the Process into a single
-    # structure for the reporting
+    its._report(types, xcvrs_down, failed)
+    if group_by:
+        group_by.report(xcvrs)
+
+    print(f"elapsed time: {end_ts - start_ts} ({event_loop.loop_name()} loop)")
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 PRIVATE CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+async def _worker(
+    work_q: multiprocessing.Queue,
+    result_q: multiprocessing.Queue,
+    max_concurrency: int,
+    max_per_site: Optional[int],
+    retry: Optional[RetryPolicy],
+    down_only: bool,
+):
+    """
+    The worker process main coroutine.  There is one runner coroutine per
+    unit of concurrency; each runner takes the next device from the local
+    batch, fetching another batch from the work queue when the local batch is
+    empty.  Work is only taken from the queue when a runner is free, so the
+    remaining work is shared across the worker processes as they go.
+    """
+    loop = asyncio.get_running_loop()
+    scheduler = DeviceScheduler(
+        max_concurrency=max_concurrency, max_per_site=max_per_site, retry=retry
+    )
+
+    todo: Deque[str] = deque()
+    fetch_lock = asyncio.Lock()
+    exhausted = False
+
+    partial = its.XcvrsCommand(down_only=down_only)
+    num_done = 0
+    failed: List[Tuple[str, str]] = list()
+    sent_flight = 0
+
+    async def next_device() -> Optional[str]:
+        nonlocal exhausted
+
+        async with fetch_lock:
+            while not todo and not exhausted:
+                if (batch := await loop.run_in_executor(None, work_q.get)) is None:
+                    exhausted = True
+                else:
+                    todo.extend(batch)
+
+        return todo.popleft() if todo else None
+
+    async def runner():
+        nonlocal num_done
+
+        while device := await next_device():
+            try:
+                with tracer.span("device", device):
+                    _, dev_xcvrs = await scheduler.run(
+                        device, its.device_get_transceivers, device
+                    )
+                partial.reduce(device, dev_xcvrs)
+            except Exception as exc:
+                failed.append((device, format_error(exc)))
+
+            num_done += 1
+
+    def send_partial():
+        nonlocal partial, num_done, failed, sent_flight
+
+        # the progress is sent with the partial results, and when only the
+        # number of devices in-flight changed.
+
+        if num_done or scheduler.in_flight != sent_flight:
+            sent_flight = scheduler.in_flight
+            result_q.put(
+                (
+                    "partial",
+                    partial.types,
+                    partial.xcvrs,
+                    num_done,
+                    failed,
+                    tracer.drain(),
+                    os.getpid(),
+                    sent_flight,
+                )
+            )
+            partial, num_done, failed = its.XcvrsCommand(down_only=down_only), 0, list()
 
-    ifx_types = Counter()
-    ifs_down = list()
+    runners = asyncio.gather(*(runner() for _ in range(max_concurrency)))
 
-    for part_ifx_types, part_ifs_down in res:
-        ifx_types.update(part_ifx_types)
-        ifs_down.extend(part_ifs_down)
+    while not runners.done():
+        await asyncio.wait([runners], timeout=REPORT_INTERVAL)
+        send_partial()
 
-    its._report(ifx_types, ifs_down)
-    print(f"elapsed time: {end_ts - start_ts}")
+    runners.result()
+    send_partial()
+    result_q.put(("exit",))
@@ -1,18 +1,198 @@
 import os
+import sys
+from array import array
+from collections import Counter
 from dataclasses import dataclass
-
-from httpx import BasicAuth
+from typing import List, Dict, Iterable, Iterator, Tuple
 
 VENDORS_IN_NETWORK = ("cisco", "arista", "extreme")
 
-NETUSER_BASICAUTH = BasicAuth(
-    username=os.environ["NETWORK_USERNAME"], password=os.environ["NETWORK_PASSWORD"]
-)
+# The default seconds to wait for a connection to a device, and then for each
+# read of the response; see Device.
+
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 60.0
+
+
+def netuser_basicauth():
+    """
+    Returns the eAPI basic-auth credentials from the NETWORK_USERNAME and
+    NETWORK_PASSWORD environment variables.  The credentials are read when the
+    first device is created, rather than on import, so that commands that do
+    not connect to the devices do not require them.
+    """
+    from httpx import BasicAuth
+
+    return BasicAuth(
+        username=os.environ["NETWORK_USERNAME"],
+        password=os.environ["NETWORK_PASSWORD"],
+    )
+
+
+# The transceiver DOM (digital optical monitoring) readings, in the order of
+# the readings of each interface returned by Device.transceiver_dom: the
+# receive and transmit power in dBm, and the temperature in degrees C.
+
+DOM_METRICS = ("rx_power", "tx_power", "temperature")
 
 
 @dataclass()
 class XcvrStatus:
+    # slotted, rather than a per-instance __dict__, and the repeated string
+    # values are interned so that all ports share one copy of each.
+
+    __slots__ = ("intf_name", "intf_desc", "intf_oper_up", "media_type")
+
     intf_name: str
     intf_desc: str
     intf_oper_up: bool
     media_type: str
+
+    def __post_init__(self):
+        self.intf_name = sys.intern(self.intf_name)
+        self.intf_desc = sys.intern(self.intf_desc)
+        self.media_type = sys.intern(self.media_type)
+
+
+class XcvrTable:
+    """
+    The XcvrTable holds transceiver records, for many devices, as a
+    struct-of-arrays: one column per field.  Device names and media types are
+    stored as small integer codes into a table of the distinct values, and the
+    oper-up flag as a byte.  Aggregations such as counts by media type work on
+    the code columns directly, and the table pickles as a few compact arrays
+    when returned from a worker process.
+    """
+
+    def __init__(self):
+        self.devices: List[str] = list()  # device code -> device name
+        self.media_types: List[str] = list()  # media code -> media type
+        self.device = array("I")  # device code, per record
+        self.media_type = array("H")  # media code, per record
+        self.oper_up = bytearray()  # 1 when the interface is up, per record
+        self.intf_name: List[str] = list()
+        self.intf_desc: List[str] = list()
+        self._device_codes: Dict[str, int] = dict()
+        self._media_codes: Dict[str, int] = dict()
+
+    def __len__(self):
+        return len(self.device)
+
+    def __iter__(self) -> Iterator[Tuple[str, XcvrStatus]]:
+        """yields the (device name, XcvrStatus) of each record"""
+        for i_rec in range(len(self)):
+            yield self.record(i_rec)
+
+    def record(self, i_rec: int) -> Tuple[str, XcvrStatus]:
+        """returns the (device name, XcvrStatus) of the record at the given index"""
+        return (
+            self.devices[self.device[i_rec]],
+            XcvrStatus(
+                intf_name=self.intf_name[i_rec],
+                intf_desc=self.intf_desc[i_rec],
+                intf_oper_up=bool(self.oper_up[i_rec]),
+                media_type=self.media_types[self.media_type[i_rec]],
+            ),
+        )
+
+    def device_code(self, device: str) -> int:
+        """returns the code of the device name, adding it if new"""
+        if (code := self._device_codes.get(device)) is None:
+            code = self._device_codes[device] = len(self.devices)
+            self.devices.append(device)
+        return code
+
+    def media_code(self, media_type: str) -> int:
+        """returns the code of the media type, adding it if new"""
+        if (code := self._media_codes.get(media_type)) is None:
+            code = self._media_codes[media_type] = len(self.media_types)
+            self.media_types.append(sys.intern(media_type))
+        return code
+
+    def extend(self, device: str, xcvrs: Iterable[XcvrStatus]):
+        """add the transceiver records of the device"""
+        dev_code = self.device_code(device)
+
+        for xcvr in xcvrs:
+            self.device.append(dev_code)
+            self.media_type.append(self.media_code(xcvr.media_type))
+            self.oper_up.append(xcvr.intf_oper_up)
+            self.intf_name.append(xcvr.intf_name)
+            self.intf_desc.append(xcvr.intf_desc)
+
+    def merge(self, other: "XcvrTable"):
+        """add all of the records of the other table, for example from a worker process"""
+        dev_map = [self.device_code(name) for name in other.devices]
+        media_map = [self.media_code(name) for name in other.media_types]
+
+        self.device.extend(dev_map[code] for code in other.device)
+        self.media_type.extend(media_map[code] for code in other.media_type)
+        self.oper_up.extend(other.oper_up)
+        self.intf_name.extend(other.intf_name)
+        self.intf_desc.extend(other.intf_desc)
+
+    def down(self) -> "XcvrTable":
+        """returns a new table of the records whose interface is not up"""
+        down = XcvrTable()
+        down.devices, down._device_codes = list(self.devices), dict(self._device_codes)
+        down.media_types = list(self.media_types)
+        down._media_codes = dict(self._media_codes)
+
+        for i_rec, is_up in enumerate(self.oper_up):
+            if is_up:
+                continue
+            down.device.append(self.device[i_rec])
+            down.media_type.append(self.media_type[i_rec])
+            down.oper_up.append(0)
+            down.intf_name.append(self.intf_name[i_rec])
+            down.intf_desc.append(self.intf_desc[i_rec])
+
+        return down
+
+    def media_type_counts(self) -> Counter:
+        """returns the number of records of each media type"""
+        return Counter(
+            {
+                self.media_types[code]: count
+                for code, count in Counter(self.media_type).items()
+            }
+        )
+
+    def __getstate__(self):
+        # the code lookup dicts are rebuilt rather than pickled.
+        state = self.__dict__.copy()
+        del state["_device_codes"], state["_media_codes"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._device_codes = {name: code for code, name in enumerate(self.devices)}
+        self._media_codes = {name: code for code, name in enumerate(self.media_types)}
+
+    def to_dict(self) -> dict:
+        """returns the table as a JSON compatible dict, see `from_dict`"""
+        return dict(
+            devices=self.devices,
+            media_types=self.media_types,
+            device=self.device.tolist(),
+            media_type=self.media_type.tolist(),
+            oper_up=list(self.oper_up),
+            intf_name=self.intf_name,
+            intf_desc=self.intf_desc,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "XcvrTable":
+        """returns the table from the dict created by `to_dict`"""
+        table = cls()
+        for name in data["devices"]:
+            table.device_code(name)
+        for name in data["media_types"]:
+            table.media_code(name)
+
+        table.device.extend(data["device"])
+        table.media_type.extend(data["media_type"])
+        table.oper_up.extend(data["oper_up"])
+        table.intf_name.extend(data["intf_name"])
+        table.intf_desc.extend(data["intf_desc"])
+        return table
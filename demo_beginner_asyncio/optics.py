@@ -0,0 +1,573 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the transceiver optics monitor.  The DOM (digital
+#    optical monitoring) readings of every transceiver, the receive and
+#    transmit power and the temperature, are collected with one request per
+#    device, and each reading is checked for
+#
+#       low, high   - a reading that crossed the low or high threshold of its
+#                     metric, see DOM_THRESHOLDS; "cleared" when it returns
+#                     within the thresholds
+#       outlier     - a reading far from the recent readings of the port
+#
+#    When polled repeatedly the readings of each port are kept in a
+#    DomHistory: a ring of the most recent readings, and rings of the
+#    readings downsampled to coarser periods.  The history is a fixed number
+#    of samples per port, so the memory used depends on the number of ports
+#    and not on how long the monitor runs.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import math
+import time
+import asyncio
+from array import array
+from collections import Counter
+from dataclasses import dataclass, asdict
+from timeit import default_timer as timer
+from typing import List, Dict, Tuple, Sequence, Optional, Iterator
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from rich.console import Console
+from rich.table import Table
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .arista_eos import Device
+from .fleet import FleetCommand, run_fleet
+from .progressbar import Progress
+from .netdefs import DOM_METRICS
+from .scheduler import DeviceScheduler
+from .sinks import RecordSink
+from . import event_loop
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "DOM_THRESHOLDS",
+    "OPTICS_FIELDS",
+    "DomHistory",
+    "OpticsAlert",
+    "OpticsMonitor",
+    "OpticsPoll",
+    "main",
+]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The (low, high) threshold of each of the DOM_METRICS: the power in dBm,
+# and the temperature in degrees C.
+
+DOM_THRESHOLDS: Dict[str, Tuple[float, float]] = dict(
+    rx_power=(-14.0, 2.0),
+    tx_power=(-8.0, 2.0),
+    temperature=(0.0, 70.0),
+)
+
+# A reading is an outlier when it differs from the mean of the recent readings
+# of the port by more than OUTLIER_SIGMAS standard deviations, and by more
+# than the minimum change of its metric.  A port is checked for outliers once
+# it has OUTLIER_MIN_SAMPLES recent readings.
+
+OUTLIER_SIGMAS = 4.0
+OUTLIER_MIN_DELTA = dict(rx_power=2.0, tx_power=2.0, temperature=5.0)
+OUTLIER_MIN_SAMPLES = 4
+
+# The default number of samples kept per port in each tier of the history,
+# the number of tiers, and the number of samples of a tier downsampled to one
+# sample of the next.  By default the history covers 16 polls at full
+# resolution, 64 polls as the mean of each 4, and 256 as the mean of each 16.
+
+DEFAULT_CAPACITY = 16
+DEFAULT_TIERS = 3
+DEFAULT_FACTOR = 4
+
+# The field names of the alert records written to an output sink.
+
+OPTICS_FIELDS = ["time", "device", "interface", "metric", "alert", "value", "limit"]
+
+
+class DomHistory:
+    """
+    The DomHistory holds the recent DOM readings of many ports, as a fixed
+    number of samples per port.  Tier 0 holds the most recent `capacity`
+    readings of each port; each sample of tier N+1 is the mean of `factor`
+    consecutive samples of tier N, so that tier N covers capacity *
+    factor**N polls.
+
+    The samples of all ports are stored in one float array per tier, with
+    `capacity` slots per port that are written in turn as a ring.  The
+    baseline of a port is computed from its tier 0 ring, at most `capacity`
+    readings, rather than kept as running sums that would accumulate rounding
+    error over a long-running monitor.
+
+    Examples
+    --------
+        history = DomHistory()
+        port = history.port("nyc1-leaf01", "Ethernet1")
+        history.append(port, (-2.1, -1.3, 35.0))
+        history.samples(port, tier=0)
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        tiers: int = DEFAULT_TIERS,
+        factor: int = DEFAULT_FACTOR,
+    ):
+        """
+        Parameters
+        ----------
+        capacity: int
+            The number of samples kept per port in each tier.
+
+        tiers: int
+            The number of tiers.
+
+        factor: int
+            The number of samples of a tier that are downsampled to one
+            sample of the next tier; at most the capacity.
+
+        Raises
+        ------
+        ValueError - the factor is not between 2 and the capacity.
+        """
+        if not 2 <= factor <= capacity or tiers < 1:
+            raise ValueError(
+                f"Expected one or more tiers, and a factor from 2 to {capacity}"
+            )
+
+        self.capacity = capacity
+        self.factor = factor
+        self.width = len(DOM_METRICS)
+        self.ports: List[Tuple[str, str]] = list()  # code -> (device, interface)
+        self._port_codes: Dict[Tuple[str, str], int] = dict()
+
+        # per tier, the samples of each port, and the number of samples
+        # written to each port; the latest is at slot (count - 1) % capacity.
+
+        self._samples = [array("f") for _ in range(tiers)]
+        self._count = [array("I") for _ in range(tiers)]
+        self._empty = array("f", [math.nan]) * (capacity * self.width)
+
+    def __len__(self):
+        return len(self.ports)
+
+    @property
+    def tiers(self) -> int:
+        return len(self._samples)
+
+    @property
+    def nbytes(self) -> int:
+        """the number of bytes of the sample arrays"""
+        arrays = [*self._samples, *self._count]
+        return sum(arr.itemsize * len(arr) for arr in arrays)
+
+    def port(self, device: str, interface: str) -> int:
+        """returns the code of the port, adding the port when it is new"""
+        key = (device, interface)
+        if (code := self._port_codes.get(key)) is not None:
+            return code
+
+        code = self._port_codes[key] = len(self.ports)
+        self.ports.append(key)
+
+        for samples, count in zip(self._samples, self._count):
+            samples.extend(self._empty)
+            count.append(0)
+
+        return code
+
+    def append(self, port: int, readings: Sequence[float]):
+        """
+        Add the readings, one per DOM_METRICS and NaN when there is none, as
+        the latest sample of the port; and downsample to the next tiers.
+        """
+        self._write(0, port, readings)
+
+        for tier in range(1, self.tiers):
+            if self._count[tier - 1][port] % self.factor:
+                break
+            recent = self.samples(port, tier - 1)[-self.factor :]
+            self._write(tier, port, [_nanmean(values) for values in zip(*recent)])
+
+    def samples(self, port: int, tier: int = 0) -> List[Tuple[float, ...]]:
+        """returns the samples of the port in the tier, oldest first"""
+        count = self._count[tier][port]
+        values = self._samples[tier]
+        base = port * self.capacity
+        width = self.width
+
+        return [
+            tuple(values[(at := (base + slot % self.capacity) * width) : at + width])
+            for slot in range(max(0, count - self.capacity), count)
+        ]
+
+    def latest(self, port: int) -> Tuple[float, ...]:
+        """returns the latest readings of the port, NaN when there are none"""
+        count = self._count[0][port]
+        at = (port * self.capacity + (count - 1) % self.capacity) * self.width
+        return tuple(self._samples[0][at : at + self.width])
+
+    def baseline(self, port: int) -> List[Tuple[float, float, int]]:
+        """
+        Returns the (mean, standard deviation, number of readings) of the
+        recent readings of the port, the tier 0 samples, for each metric.
+        """
+        results = list()
+        width = self.width
+
+        # the slots of the ring not yet written are NaN, as are the missing
+        # readings, so the order of the slots does not matter.
+
+        at = port * self.capacity * width
+        ring = self._samples[0][at : at + self.capacity * width]
+
+        for i_metric in range(width):
+            values = [value for value in ring[i_metric::width] if value == value]
+            if not (valid := len(values)):
+                results.append((math.nan, math.nan, 0))
+                continue
+
+            # two passes, the mean and then the deviations from it, which
+            # does not lose precision to cancellation as sumsq/n - mean**2.
+
+            mean = math.fsum(values) / valid
+            var = math.fsum((value - mean) ** 2 for value in values) / valid
+            results.append((mean, math.sqrt(var), valid))
+
+        return results
+
+    def _write(self, tier: int, port: int, readings: Sequence[float]):
+        """write the readings as the next sample of the port in the tier"""
+        count = self._count[tier]
+        values = self._samples[tier]
+        at = (port * self.capacity + count[port] % self.capacity) * self.width
+
+        values[at : at + self.width] = array("f", readings)
+        count[port] += 1
+
+
+@dataclass()
+class OpticsAlert:
+    """An optics reading that crossed a threshold, or is an outlier"""
+
+    device: str
+    interface: str
+    metric: str  # from DOM_METRICS
+    alert: str  # "low", "high", "cleared" or "outlier"
+    value: float
+    limit: float  # the threshold crossed; for an outlier the recent mean
+
+
+class OpticsMonitor:
+    """
+    The OpticsMonitor checks the DOM readings of each poll of the devices
+    for threshold crossings and outliers, and keeps their history.
+
+    Examples
+    --------
+        monitor = OpticsMonitor()
+        for alert in monitor.update("nyc1-leaf01", readings):
+            print(alert)
+    """
+
+    def __init__(
+        self,
+        thresholds: Optional[Dict[str, Tuple[float, float]]] = None,
+        history: Optional[DomHistory] = None,
+    ):
+        """
+        Parameters
+        ----------
+        thresholds: Dict[str, Tuple[float, float]], optional
+            The (low, high) thresholds of the metrics that are not the
+            DOM_THRESHOLDS.
+
+        history: DomHistory, optional
+            The history of the readings; by default of the default size.
+        """
+        self.thresholds = {**DOM_THRESHOLDS, **(thresholds or {})}
+        self.history = history if history is not None else DomHistory()
+        self.alert_counts: Counter = Counter()
+
+        # per port and metric, 0 when the reading is within the thresholds,
+        # 1 when below the low threshold and 2 when above the high.
+
+        self._state = bytearray()
+        self._limits = [self.thresholds[metric] for metric in DOM_METRICS]
+
+    def update(
+        self, device: str, readings: Dict[str, Tuple[float, ...]]
+    ) -> List[OpticsAlert]:
+        """
+        Add the readings of the device, from Device.transceiver_dom, and
+        returns the alerts of the readings.  A metric without a reading, NaN,
+        is not checked, and its threshold state is reset.
+        """
+        history = self.history
+        width = history.width
+        alerts: List[OpticsAlert] = list()
+
+        for interface, values in readings.items():
+            port = history.port(device, interface)
+            if len(self._state) < len(history) * width:
+                self._state.extend(bytes(len(history) * width - len(self._state)))
+
+            baseline = history.baseline(port)
+
+            for i_metric, value in enumerate(values):
+                at = port * width + i_metric
+
+                if value != value:
+                    self._state[at] = 0
+                    continue
+
+                metric = DOM_METRICS[i_metric]
+                low, high = self._limits[i_metric]
+                state = 1 if value < low else 2 if value > high else 0
+
+                if state != (prev_state := self._state[at]):
+                    self._state[at] = state
+                    alerts.append(
+                        OpticsAlert(
+                            device,
+                            interface,
+                            metric,
+                            alert=("cleared", "low", "high")[state],
+                            value=round(value, 2),
+                            limit=(low, high)[(state or prev_state) - 1],
+                        )
+                    )
+
+                mean, stdev, num_readings = baseline[i_metric]
+                if num_readings >= OUTLIER_MIN_SAMPLES and abs(value - mean) > max(
+                    OUTLIER_SIGMAS * stdev, OUTLIER_MIN_DELTA[metric]
+                ):
+                    alerts.append(
+                        OpticsAlert(
+                            device,
+                            interface,
+                            metric,
+                            alert="outlier",
+                            value=round(value, 2),
+                            limit=round(mean, 2),
+                        )
+                    )
+
+            history.append(port, values)
+
+        self.alert_counts.update(alert.alert for alert in alerts)
+        return alerts
+
+    def out_of_range(self) -> Iterator[OpticsAlert]:
+        """yields the readings that are currently outside of the thresholds"""
+        width = self.history.width
+
+        for at, state in enumerate(self._state):
+            if not state:
+                continue
+
+            port, i_metric = divmod(at, width)
+            device, interface = self.history.ports[port]
+            yield OpticsAlert(
+                device,
+                interface,
+                DOM_METRICS[i_metric],
+                alert=("low", "high")[state - 1],
+                value=round(self.history.latest(port)[i_metric], 2),
+                limit=self._limits[i_metric][state - 1],
+            )
+
+
+class OpticsPoll(FleetCommand[Dict[str, Tuple[float, ...]]]):
+    """
+    A poll of the optics of the devices, adding the readings of each device
+    to the monitor.  The alerts are the records of the device, and are
+    printed to the console, when given.
+    """
+
+    description = "Polling optics"
+
+    def __init__(self, monitor: OpticsMonitor, console: Optional[Console] = None):
+        self.monitor = monitor
+        self.console = console
+
+    async def extract(self, dev: Device) -> Dict[str, Tuple[float, ...]]:
+        return await dev.transceiver_dom()
+
+    def reduce(self, host: str, readings: Dict[str, Tuple[float, ...]]):
+        if not (alerts := self.monitor.update(host, readings)):
+            return None
+
+        if self.console:
+            for alert in alerts:
+                self.console.print(_format_alert(alert), highlight=False)
+
+        now = round(time.time(), 3)
+        return (dict(time=now, **asdict(alert)) for alert in alerts)
+
+
+async def main(
+    inventory: List[str],
+    scheduler: Optional[DeviceScheduler] = None,
+    sink: Optional[RecordSink] = None,
+    deadline: Optional[float] = None,
+    interval: Optional[float] = None,
+    cycles: Optional[int] = None,
+    thresholds: Optional[Dict[str, Tuple[float, float]]] = None,
+    history_size: Optional[int] = None,
+):
+    """
+    Poll the optics of the inventory, and report the readings that are
+    outside of the thresholds.  When polled repeatedly, each alert is printed
+    as it is found; the report is printed when the polls end, or when
+    interrupted.
+
+    Parameters
+    ----------
+    inventory: List[str]
+        The list of network devices to poll.
+
+    scheduler: DeviceScheduler, optional
+        Limits the number of devices polled at the same time.
+
+    sink: RecordSink, optional
+        When provided, each alert is written to the sink; see OPTICS_FIELDS.
+
+    deadline: float, optional
+        The seconds within which each poll of the inventory must complete;
+        the devices not completed by then are reported as failed.
+
+    interval: float, optional
+        When provided, the inventory is polled every interval seconds, until
+        interrupted; else once.
+
+    cycles: int, optional
+        When provided with the interval, the number of times the inventory
+        is polled.
+
+    thresholds: Dict[str, Tuple[float, float]], optional
+        The (low, high) thresholds of the metrics that are not the
+        DOM_THRESHOLDS.
+
+    history_size: int, optional
+        The number of samples of each port kept in each tier of the history,
+        see DomHistory; by default DEFAULT_CAPACITY.
+    """
+    scheduler = scheduler or DeviceScheduler()
+    monitor = OpticsMonitor(
+        thresholds, DomHistory(capacity=history_size or DEFAULT_CAPACITY)
+    )
+    loop = asyncio.get_running_loop()
+    failed: List[Tuple[str, str]] = list()
+    polls = 0
+    start_ts = timer()
+
+    try:
+        with Progress() as progressbar:
+            pgt = progressbar.add_task(
+                description="Polling optics", total=len(inventory), scheduler=scheduler
+            )
+
+            while True:
+                next_ts = loop.time() + (interval or 0)
+                failed = await run_fleet(
+                    inventory,
+                    OpticsPoll(monitor, console=interval and progressbar.console),
+                    scheduler=scheduler,
+                    progressbar=progressbar,
+                    task_id=pgt,
+                    sink=sink,
+                    deadline=deadline,
+                )
+                polls += 1
+
+                if not interval or (cycles and polls >= cycles):
+                    break
+
+                await asyncio.sleep(max(0.0, next_ts - loop.time()))
+                progressbar.reset(
+                    pgt, description=f"Polling optics ({polls + 1})", failed=0
+                )
+
+    finally:
+        _report(monitor, failed, polls)
+        print(f"elapsed time: {timer() - start_ts} ({event_loop.loop_name()} loop)")
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 PRIVATE CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+def _nanmean(values: Sequence[float]) -> float:
+    """returns the mean of the values that are not NaN, else NaN"""
+    values = [value for value in values if value == value]
+    return sum(values) / len(values) if values else math.nan
+
+
+def _format_alert(alert: OpticsAlert) -> str:
+    limit = "mean" if alert.alert == "outlier" else "threshold"
+    return (
+        f"{alert.device} {alert.interface} {alert.metric} {alert.alert}: "
+        f"{alert.value} ({limit} {alert.limit})"
+    )
+
+
+def _report(monitor: OpticsMonitor, failed: Sequence[Tuple[str, str]], polls: int):
+    out_of_range = sorted(
+        monitor.out_of_range(), key=lambda alert: (alert.device, alert.interface)
+    )
+
+    table = Table(
+        "Device",
+        "Interface",
+        "Metric",
+        "Alert",
+        "Value",
+        "Threshold",
+        title=f"{len(out_of_range)} Optics readings outside of the thresholds",
+        title_justify="left",
+    )
+    for alert in out_of_range:
+        table.add_row(
+            alert.device,
+            alert.interface,
+            alert.metric,
+            alert.alert,
+            str(alert.value),
+            str(alert.limit),
+        )
+
+    Console().print("\n", table)
+
+    history = monitor.history
+    counts = monitor.alert_counts
+    print(
+        f"{polls} polls of {len(history)} optics, alerts: "
+        + ", ".join(
+            f"{counts[name]} {name}" for name in ("low", "high", "cleared", "outlier")
+        )
+    )
+    print(f"history: {history.nbytes / 2**20:.1f} MiB, {history.tiers} tiers")
+
+    for host, error in failed:
+        print(f"FAILED: {host}: {error}")
@@ -0,0 +1,299 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the command planner used by "demo report".  Each
+#    report declares the EOS commands it needs; the planner collects the
+#    distinct commands of all of the requested reports and sends them to each
+#    device in a single eAPI runCmds request, then hands each report the
+#    outputs of its own commands.  Running the versions and xcvrs reports
+#    together costs one request per device rather than one per report.
+#
+#    The find-host report searches every device, in the one request, rather
+#    than in the waves of "demo find-host" that stop once the end-host is
+#    found; it suits a find-host that is run together with the other reports.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import List, Optional, Tuple, Any, Sequence
+from collections import Counter
+from timeit import default_timer as timer
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from macaddr import MacAddress
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .arista_eos import Device
+from .fleet import FleetCommand, run_fleet
+from .progressbar import Progress
+from .netdefs import XcvrTable
+from .scheduler import DeviceScheduler
+from .tracing import tracer
+from . import event_loop
+from . import find_macaddr
+from . import inventory_transceivers
+from . import inventory_versions
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["REPORTS", "Report", "CommandPlanner", "main"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class Report:
+    """
+    A report run by the CommandPlanner.  The subclass declares the commands
+    it needs, parses the outputs of those commands for each device, and
+    reports the results collected from all of the devices.
+    """
+
+    name: str = ""
+    commands: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_params(cls, **params) -> "Report":
+        """
+        Returns the report for the parameters of the "demo report" command,
+        for example the MAC address of the find-host report; the reports
+        without parameters ignore them.
+        """
+        return cls()
+
+    def parse(self, outputs: List[dict]) -> Any:
+        """
+        Returns the device result from the outputs of the report commands, in
+        the order of `commands`.  Called as each device completes; an
+        exception fails the device.
+        """
+        raise NotImplementedError()
+
+    def add(self, host: str, result: Any):
+        """add the device result, from `parse`, to the report"""
+        raise NotImplementedError()
+
+    def report(self):
+        """print the report of the devices added"""
+        raise NotImplementedError()
+
+
+class VersionsReport(Report):
+    """The OS versions report, as "demo versions" """
+
+    name = "versions"
+    commands = ("show version",)
+
+    def __init__(self):
+        self.versions = Counter()
+
+    def parse(self, outputs: List[dict]) -> str:
+        return outputs[0]["version"]
+
+    def add(self, host: str, result: str):
+        self.versions[result] += 1
+
+    def report(self):
+        inventory_versions._report(self.versions)
+
+
+class XcvrsReport(Report):
+    """The transceivers report, as "demo xcvrs" """
+
+    name = "xcvrs"
+    commands = Device.XCVRS_COMMANDS
+
+    def __init__(self):
+        self.xcvrs = XcvrTable()
+
+    def parse(self, outputs: List[dict]):
+        return Device.parse_xcvrs(*outputs)
+
+    def add(self, host: str, result):
+        self.xcvrs.extend(host, result)
+
+    def report(self):
+        inventory_transceivers._report(
+            self.xcvrs.media_type_counts(), self.xcvrs.down()
+        )
+
+
+class FindHostReport(Report):
+    """The search for the end-host of a MAC address, as "demo find-host" """
+
+    name = "find-host"
+
+    def __init__(self, macaddr: MacAddress):
+        # Arista EOS uses the xx:yy:zz:aa:bb:cc format.
+        self.commands = (
+            f"show mac address-table address {macaddr.format(sep=':', size=2)}",
+            "show lldp neighbors detail",
+        )
+        self.macaddr = macaddr
+        self.found: Optional[find_macaddr.FindHostSearchResults] = None
+
+    @classmethod
+    def from_params(cls, macaddr: Optional[MacAddress] = None, **params) -> Report:
+        if not macaddr:
+            raise ValueError("The find-host report requires a MAC address")
+        return cls(macaddr)
+
+    def parse(self, outputs: List[dict]) -> Optional[str]:
+        """
+        Returns the edge-port interface where the MAC address is found, as
+        `Device.find_macaddr` and `Device.is_edge_port`, or None.
+        """
+        mac_table, lldp_neighbors = outputs
+
+        if not (table_entries := mac_table["unicastTable"]["tableEntries"]):
+            return None
+
+        interface = table_entries[0]["interface"]
+        if not interface.startswith("Eth"):
+            return None
+
+        if not Device.parse_lldp_edge_ports(lldp_neighbors).get(interface, True):
+            return None
+
+        return interface
+
+    def add(self, host: str, result: Optional[str]):
+        if result and not self.found:
+            self.found = find_macaddr.FindHostSearchResults(host, result)
+
+    def report(self):
+        find_macaddr._report(self.macaddr, self.found)
+
+
+# the reports by name, in the order they are reported
+
+REPORTS = {each.name: each for each in (VersionsReport, XcvrsReport, FindHostReport)}
+
+
+class CommandPlanner(FleetCommand[List[Any]]):
+    """
+    The CommandPlanner runs the reports on each device with one request.
+    The commands of the reports are sent in the order they are first needed,
+    with each command sent once even when needed by more than one report.
+    The planner is the FleetCommand of the reports, run by `run_fleet`.
+
+    Examples
+    --------
+        planner = CommandPlanner([VersionsReport(), XcvrsReport()])
+        failed = await planner.run(inventory, progressbar)
+        for report in planner.reports:
+            report.report()
+    """
+
+    def __init__(self, reports: Sequence[Report]):
+        self.reports = list(reports)
+        self.commands: List[str] = list()
+
+        # the index into `commands` of each report command
+
+        self._plan: List[List[int]] = list()
+
+        for report in self.reports:
+            for command in report.commands:
+                if command not in self.commands:
+                    self.commands.append(command)
+
+            self._plan.append([self.commands.index(cmd) for cmd in report.commands])
+
+    @property
+    def description(self) -> str:
+        return f"Collect {', '.join(r.name for r in self.reports)}"
+
+    async def extract(self, dev: Device) -> List[Any]:
+        """
+        Returns the result of each report for the device, in the order of
+        `reports`, from a single request.
+        """
+        outputs = await dev.cli(commands=self.commands)
+
+        with tracer.span("parse", dev.host):
+            return [
+                report.parse([outputs[i_cmd] for i_cmd in plan])
+                for report, plan in zip(self.reports, self._plan)
+            ]
+
+    def reduce(self, host: str, results: List[Any]):
+        for report, result in zip(self.reports, results):
+            report.add(host, result)
+
+    async def run(
+        self,
+        inventory: List[str],
+        progressbar: Progress,
+        scheduler: Optional[DeviceScheduler] = None,
+        deadline: Optional[float] = None,
+    ) -> List[Tuple[str, str]]:
+        """
+        Collect the reports from each device in the inventory, adding each
+        device result to its report as the device completes.
+
+        Returns
+        -------
+        List - the (hostname, error) of each device that failed.
+        """
+        return await run_fleet(
+            inventory,
+            self,
+            scheduler=scheduler,
+            progressbar=progressbar,
+            deadline=deadline,
+        )
+
+
+async def main(
+    inventory: List[str],
+    report_names: Sequence[str],
+    scheduler: Optional[DeviceScheduler] = None,
+    deadline: Optional[float] = None,
+    **params,
+):
+    """
+    Run the named reports, from REPORTS, on the inventory with one request
+    per device, and print each report.  The params are those of the reports,
+    see `Report.from_params`.
+    """
+    planner = CommandPlanner(
+        [
+            REPORTS[name].from_params(**params)
+            for name in REPORTS
+            if name in report_names
+        ]
+    )
+
+    start_ts = timer()
+
+    with Progress() as progressbar:
+        failed = await planner.run(
+            inventory, progressbar, scheduler=scheduler, deadline=deadline
+        )
+
+    end_ts = timer()
+
+    for report in planner.reports:
+        report.report()
+
+    for host, error in failed:
+        print(f"FAILED: {host}: {error}")
+
+    print(
+        f"{len(planner.commands)} commands in 1 request per device, "
+        f"elapsed time: {end_ts - start_ts} ({event_loop.loop_name()} loop)"
+    )
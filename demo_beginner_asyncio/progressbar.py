@@ -1,15 +1,172 @@
-from typing import Tuple
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the progress bar of the device commands.  Each task
+#    shows the devices done of the total, the throughput in devices/sec, the
+#    ETA, and the devices in-flight and failed.
+#
+#    With tens of thousands of devices, updating the task on every device
+#    completion is most of the cost of the progress bar, so the advances are
+#    coalesced: they are added to the task at most REFRESH_PER_SECOND times,
+#    which is as often as the bar is redrawn, and before each redraw so that
+#    the counts shown are current.  When stdout is not a terminal the progress
+#    bar is disabled, and advancing a task is a no-op.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Tuple, Dict, List
+from timeit import default_timer as timer
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
 from rich import progress
+from rich.text import Text
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["Progress", "REFRESH_PER_SECOND"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The times per second that the progress bar is redrawn, and that the
+# coalesced advances are added to the tasks.
+
+REFRESH_PER_SECOND = 4
+
+
+class DeviceRateColumn(progress.ProgressColumn):
+    """The throughput of the task, in devices/sec"""
+
+    def render(self, task: progress.Task) -> Text:
+        speed = task.finished_speed or task.speed
+        return Text("-/s" if speed is None else f"{speed:,.0f}/s")
+
+
+class DeviceCountsColumn(progress.ProgressColumn):
+    """The devices in-flight, while the task runs, and failed"""
+
+    def render(self, task: progress.Task) -> Text:
+        text = Text()
+
+        if not task.finished and (scheduler := task.fields.get("scheduler")):
+            text.append(f"{scheduler.in_flight} in-flight ")
+        elif not task.finished and (in_flight := task.fields.get("in_flight")):
+            text.append(f"{in_flight} in-flight ")
+
+        if failed := task.fields.get("failed"):
+            text.append(f"{failed} failed", style="red")
 
-__all__ = ["Progress"]
+        return text
 
 
 class Progress(progress.Progress):
+    """
+    The progress bar of the device commands; see the module description.
+
+    Examples
+    --------
+        with Progress() as progressbar:
+            pgt = progressbar.add_task(
+                "Checking devices", total=len(inventory), scheduler=scheduler
+            )
+            async for this_dev in scheduler.map(inventory, coro_fn):
+                progressbar.advance(pgt, failed=not this_dev.ok)
+    """
+
+    def __init__(self, *columns, **kwargs):
+        kwargs.setdefault("refresh_per_second", REFRESH_PER_SECOND)
+
+        # the advances, and failures, not yet added to each task; set before
+        # the rich Progress is initialized, as that renders the bar.
+
+        self._pending: Dict[progress.TaskID, List[int]] = dict()
+        self._flush_interval = 1 / kwargs["refresh_per_second"]
+        self._flush_ts = timer()
+
+        super().__init__(*columns, **kwargs)
+
+        if not self.console.is_terminal:
+            self.disable = True
+
     @classmethod
     def get_default_columns(cls) -> Tuple[progress.ProgressColumn, ...]:
         return (
             progress.TextColumn("[progress.description]{task.description}"),
             progress.BarColumn(),
             progress.TextColumn("[progress.percentage]{task.completed}/{task.total}"),
+            DeviceRateColumn(),
+            progress.TimeRemainingColumn(),
             progress.TimeElapsedColumn(),
+            DeviceCountsColumn(),
         )
+
+    def add_task(self, description: str, *vargs, **fields) -> progress.TaskID:
+        """
+        Add a task, as rich Progress.add_task.  The `scheduler` field, a
+        DeviceScheduler, is used to show the devices in-flight; or the
+        `in_flight` field when the devices are worked on by other processes.
+        """
+        fields.setdefault("failed", 0)
+        return super().add_task(description, *vargs, **fields)
+
+    def advance(
+        self, task_id: progress.TaskID, advance: float = 1, failed: int = 0
+    ) -> None:
+        """
+        Advance the task by the number of devices done, of which `failed`
+        failed.  The advance is added to the task with the others made within
+        the refresh interval, before the bar is redrawn, or when the task
+        completes.
+        """
+        if self.disable:
+            return
+
+        # the lock is that of the rich Progress, as the bar is redrawn, and
+        # so the pending advances flushed, by the refresh thread.
+
+        with self._lock:
+            if (pending := self._pending.get(task_id)) is None:
+                pending = self._pending[task_id] = [0, 0]
+
+            pending[0] += advance
+            pending[1] += failed
+
+            task = self._tasks[task_id]
+            if (
+                timer() - self._flush_ts >= self._flush_interval
+                or task.completed + pending[0] >= task.total
+            ):
+                self.flush()
+
+    def flush(self):
+        """add the pending advances to their tasks"""
+        with self._lock:
+            pending, self._pending = self._pending, dict()
+            self._flush_ts = timer()
+
+            for task_id, (advance, failed) in pending.items():
+                if failed:
+                    task = self._tasks[task_id]
+                    self.update(task_id, failed=task.fields["failed"] + failed)
+                super().advance(task_id, advance)
+
+    def get_renderables(self):
+        # called for each redraw of the bar, by the refresh thread or by
+        # `refresh`; so the stragglers are shown without a further advance.
+        self.flush()
+        yield from super().get_renderables()
+
+    def stop(self) -> None:
+        self.flush()
+        super().stop()
@@ -0,0 +1,122 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the cached DNS resolver of the device hostnames.  The
+#    inventory is resolved up front, many names at once, so that opening the
+#    connection to a device does not wait on its DNS lookup; the Device uses
+#    the cached address when there is one, see `Device.__init__`.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import socket
+import asyncio
+import ipaddress
+from timeit import default_timer as timer
+from typing import Dict, Tuple, Optional, Iterable
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .tracing import tracer
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["HostResolver", "host_resolver"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class HostResolver:
+    """
+    The HostResolver resolves hostnames to an IP address, and keeps each
+    address for `ttl` seconds.  A name that does not resolve is not cached, so
+    the connection to the device reports the DNS error as usual.
+
+    Examples
+    --------
+        await host_resolver.resolve_all(inventory)
+        host_resolver.address("nyc1-leaf01")
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_concurrency: int = 256):
+        """
+        Parameters
+        ----------
+        ttl: float
+            The seconds that a resolved address is used.
+
+        max_concurrency: int
+            The maximum number of lookups at the same time.
+        """
+        self.ttl = ttl
+        self.max_concurrency = max_concurrency
+        self._cache: Dict[str, Tuple[float, str]] = dict()
+
+    def address(self, host: str) -> Optional[str]:
+        """returns the cached address of the host, or None"""
+        if (cached := self._cache.get(host)) and timer() - cached[0] < self.ttl:
+            return cached[1]
+        return None
+
+    async def resolve(self, host: str) -> Optional[str]:
+        """
+        Returns the address of the host, from the cache or by a DNS lookup.  A
+        host that is already an IP address is returned as-is.  Returns None
+        when the host does not resolve.
+        """
+        if address := self.address(host):
+            return address
+
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+
+        start_ts = timer()
+        try:
+            addrinfo = await asyncio.get_running_loop().getaddrinfo(
+                host, None, type=socket.SOCK_STREAM
+            )
+        except (socket.gaierror, UnicodeError):
+            return None
+
+        tracer.add("dns", host, start_ts, timer())
+
+        # the first address is the one the system would connect to.
+
+        address = addrinfo[0][4][0]
+        self._cache[host] = (timer(), address)
+        return address
+
+    async def resolve_all(self, hosts: Iterable[str]) -> int:
+        """
+        Resolve all of the hosts, up to `max_concurrency` at the same time.
+
+        Returns
+        -------
+        int - the number of hosts that did not resolve.
+        """
+        sem = asyncio.Semaphore(self.max_concurrency)
+
+        async def _resolve(host: str) -> Optional[str]:
+            async with sem:
+                return await self.resolve(host)
+
+        results = await asyncio.gather(*(_resolve(host) for host in hosts))
+        return sum(address is None for address in results)
+
+
+# The per-process resolver used by the Device.
+
+host_resolver = HostResolver()
@@ -1,9 +1,54 @@
 #!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
 import multiprocessing
 import resource
 
-max_cpu_cores = multiprocessing.cpu_count()
-print(f"Max CPU cores for multiprocessing: {max_cpu_cores}")
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["max_cpu_cores", "max_open_files", "default_max_concurrency"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The number of file descriptors held back from the device-concurrency budget
+# for stdio, the inventory file, logging, DNS sockets, etc.
+
+RESERVED_OPEN_FILES = 64
+
+
+def max_cpu_cores() -> int:
+    """returns the number of CPU cores available for multiprocessing"""
+    return multiprocessing.cpu_count()
+
+
+def max_open_files() -> int:
+    """returns the soft limit on open files/sockets (RLIMIT_NOFILE)"""
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def default_max_concurrency() -> int:
+    """
+    This function returns the default number of devices that can be worked on
+    at the same time by a single process.  Each in-flight device holds one
+    socket, so the value is derived from the open-files limit less a reserve
+    for everything else the process has open.
+
+    Returns
+    -------
+    int - always at least 1.
+    """
+    return max(1, max_open_files() - RESERVED_OPEN_FILES)
+
 
-max_open_files = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
-print(f"Max Open Files/Sockets for asyncio IO: {max_open_files:,}")
+if __name__ == "__main__":
+    print(f"Max CPU cores for multiprocessing: {max_cpu_cores()}")
+    print(f"Max Open Files/Sockets for asyncio IO: {max_open_files():,}")
+    print(f"Default max device concurrency: {default_max_concurrency():,}")
@@ -0,0 +1,477 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the device scheduler shared by all of the CLI
+#    commands.  The scheduler bounds the number of devices being worked on at
+#    the same time, globally and optionally per site, so that a large
+#    inventory does not exhaust the process open-files limit or cause a storm
+#    of TLS handshakes.
+#
+#    The scheduler also bounds how long a run takes when some devices are
+#    slow or unreachable: transient failures are retried with a jittered
+#    backoff, an attempt that takes longer than most can be "hedged" with a
+#    duplicate attempt, and `map` returns the failures, and the devices not
+#    completed by the deadline, as results rather than aborting the run.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import random
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from contextlib import asynccontextmanager
+from timeit import default_timer as timer
+from typing import Optional, Dict, Callable, Awaitable, TypeVar, Generic
+from typing import Iterable, AsyncIterator, Deque
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+import httpx
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .resources import default_max_concurrency
+from .tracing import tracer
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "DeviceScheduler",
+    "DeviceResult",
+    "RetryPolicy",
+    "default_site_of",
+    "default_role_of",
+    "is_access_layer",
+    "is_retryable",
+    "format_error",
+]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+T = TypeVar("T")
+
+
+def default_site_of(host: str) -> str:
+    """
+    Returns the site name for the given device hostname.  The demo naming
+    convention is that the site is the first dash-separated token of the
+    short hostname, for example "nyc1-leaf01.corp.com" is in site "nyc1".
+    """
+    return host.split(".", 1)[0].split("-", 1)[0]
+
+
+# the hostname role tokens of the devices above the access layer, such as
+# spines, which end-hosts are not connected to.
+
+CORE_ROLES = ("spine", "core", "border", "super")
+
+
+def default_role_of(host: str) -> str:
+    """
+    Returns the role name for the given device hostname.  The demo naming
+    convention is that the role is the second dash-separated token of the
+    short hostname, without its number; for example "nyc1-leaf01.corp.com"
+    has the role "leaf".  A hostname without a role token returns "".
+    """
+    _, _, role = host.split(".", 1)[0].partition("-")
+    return role.split("-", 1)[0].rstrip("0123456789")
+
+
+def is_access_layer(host: str) -> bool:
+    """returns True when the device role is not one of the CORE_ROLES"""
+    return default_role_of(host) not in CORE_ROLES
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    Returns True if the exception is a transient failure that is worth
+    retrying: a connect or read timeout, a network error, or an HTTP 429 or
+    5xx response.  A command error, for example, is not retried.
+    """
+    if isinstance(exc, httpx.TransportError):
+        return True
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+
+    return False
+
+
+def format_error(exc: BaseException) -> str:
+    """returns the one line "<exception name>: <message>" for reporting the error"""
+    return f"{type(exc).__name__}: {next(iter(str(exc).splitlines()), '')}"
+
+
+@dataclass()
+class RetryPolicy:
+    """How the DeviceScheduler retries, and hedges, the work of each device"""
+
+    retries: int = 2  # the times a failed attempt is retried
+    backoff: float = 0.5  # the seconds of the first backoff, doubled each retry
+    backoff_max: float = 10.0  # the most seconds between attempts
+
+    # when set, a duplicate attempt is started once an attempt takes longer
+    # than this percentile of the attempt latencies observed so far, and the
+    # first to succeed is used.  Hedging starts once `hedge_min_samples`
+    # latencies have been observed.
+
+    hedge_pct: Optional[float] = None
+    hedge_min_samples: int = 20
+
+    retry_on: Callable[[BaseException], bool] = field(default=is_retryable)
+
+    def backoff_delay(self, retry: int) -> float:
+        """returns the seconds to wait before the given retry, 1 is the first"""
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (retry - 1)))
+
+
+@dataclass()
+class DeviceResult(Generic[T]):
+    """The outcome of the work of one device, from `DeviceScheduler.map`"""
+
+    host: str
+    result: Optional[T] = None
+    error: Optional[str] = None  # "<exception name>: <message>" when failed
+    elapsed: float = 0.0  # seconds, including the wait for a slot and retries
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class DeviceScheduler:
+    """
+    The DeviceScheduler limits the number of devices that are being worked on
+    concurrently.  Each device coroutine is run within a "slot"; once the
+    global limit, or the limit of the device site, is reached the coroutine
+    waits for a slot to become available.  Since the coroutines are only
+    waiting on a semaphore, throughput stays flat at the limit rather than
+    every device opening a connection at once.
+
+    Examples
+    --------
+        scheduler = DeviceScheduler(max_concurrency=500, max_per_site=50)
+        tasks = [scheduler.run(host, get_version, host=host) for host in inventory]
+        for this_dev in asyncio.as_completed(tasks):
+            ...
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_per_site: Optional[int] = None,
+        site_limits: Optional[Dict[str, int]] = None,
+        site_of: Optional[Callable[[str], str]] = None,
+        retry: Optional[RetryPolicy] = None,
+    ):
+        """
+        Parameters
+        ----------
+        max_concurrency: int, optional
+            The maximum number of devices worked on at the same time.  When not
+            provided the value is derived from the process open-files limit.
+
+        max_per_site: int, optional
+            The maximum number of devices worked on at the same time within
+            any one site.  When not provided there is no per-site limit.
+
+        site_limits: Dict[str, int], optional
+            Per-site overrides of the `max_per_site` value, key is the site
+            name.
+
+        site_of: Callable, optional
+            The function used to map a device hostname to its site name.  By
+            default the hostname naming convention is used, see
+            `default_site_of`.
+
+        retry: RetryPolicy, optional
+            How failed attempts are retried, and slow attempts hedged.  When
+            not provided the RetryPolicy defaults are used.
+        """
+        self.max_concurrency = max_concurrency or default_max_concurrency()
+        self.max_per_site = max_per_site
+        self.site_limits = dict(site_limits or {})
+        self.site_of = site_of or default_site_of
+        self.retry = retry or RetryPolicy()
+
+        # the semaphores are created on first use so that they are bound to
+        # the running event loop (Python < 3.10 binds at construction).
+
+        self._global_sem: Optional[asyncio.Semaphore] = None
+        self._site_sems: Dict[str, asyncio.Semaphore] = dict()
+
+        # the recent attempt latencies, and the hedge delay derived from them
+
+        self._latencies: Deque[float] = deque(maxlen=1024)
+        self._hedge_after: Optional[float] = None
+        self.hedged = 0
+
+        # the number of devices holding a slot, shown by the progress bar.
+
+        self.in_flight = 0
+
+    def _site_sem(self, host: str) -> Optional[asyncio.Semaphore]:
+        """returns the semaphore for the site of the device, if the site is limited"""
+        site = self.site_of(host)
+
+        if (limit := self.site_limits.get(site, self.max_per_site)) is None:
+            return None
+
+        if not (sem := self._site_sems.get(site)):
+            sem = self._site_sems[site] = asyncio.Semaphore(limit)
+
+        return sem
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        """
+        Async context manager that waits for, and holds, a concurrency slot
+        for the given device.  The site slot is taken before the global slot
+        so that devices waiting on a busy site do not hold global slots that
+        other sites could use.
+
+        Parameters
+        ----------
+        host: str
+            The network device hostname
+        """
+        if self._global_sem is None:
+            self._global_sem = asyncio.Semaphore(self.max_concurrency)
+
+        wait_ts = timer()
+
+        if site_sem := self._site_sem(host):
+            async with site_sem, self._global_sem:
+                tracer.add("wait", host, wait_ts, timer())
+                self.in_flight += 1
+                try:
+                    yield
+                finally:
+                    self.in_flight -= 1
+        else:
+            async with self._global_sem:
+                tracer.add("wait", host, wait_ts, timer())
+                self.in_flight += 1
+                try:
+                    yield
+                finally:
+                    self.in_flight -= 1
+
+    async def run(
+        self, host: str, coro_fn: Callable[..., Awaitable[T]], /, *vargs, **kwargs
+    ) -> T:
+        """
+        Run the coroutine function for the given device once a concurrency slot
+        is available, and return the coroutine result.  A transient failure is
+        retried, after a backoff, as set by the retry policy; the slot is not
+        held during the backoff.
+
+        Parameters
+        ----------
+        host: str
+            The network device hostname, used to determine the site.
+
+        coro_fn: Callable
+            The coroutine function, called with the remaining arguments.
+
+        Returns
+        -------
+        The result of the coroutine.
+
+        Raises
+        ------
+        The exception of the last attempt, when all attempts fail.
+        """
+        retry = 0
+
+        while True:
+            try:
+                return await self._hedged(host, coro_fn, vargs, kwargs)
+            except Exception as exc:
+                if (retry := retry + 1) > self.retry.retries:
+                    raise
+                if not self.retry.retry_on(exc):
+                    raise
+
+            await asyncio.sleep(self.retry.backoff_delay(retry))
+
+    async def map(
+        self,
+        hosts: Iterable[str],
+        coro_fn: Callable[..., Awaitable[T]],
+        /,
+        *vargs,
+        deadline: Optional[float] = None,
+        **kwargs,
+    ) -> AsyncIterator[DeviceResult[T]]:
+        """
+        Run the coroutine function for each device, as `run`, yielding the
+        DeviceResult of each device as it completes.  The coroutine function
+        is called with the device hostname followed by the remaining
+        arguments.  A device that fails does not stop the others; its result
+        holds the error.
+
+        Parameters
+        ----------
+        hosts: Iterable[str]
+            The network device hostnames; a hostname given more than once is
+            run, and yielded, once.
+
+        coro_fn: Callable
+            The coroutine function, called with the hostname and the remaining
+            arguments.
+
+        deadline: float, optional
+            The seconds from now by which all devices must complete.  The
+            devices not completed by then are cancelled, and yielded last
+            with a "DeadlineExceeded" error.
+
+        Yields
+        ------
+        DeviceResult
+        """
+        loop = asyncio.get_running_loop()
+        end_ts = deadline and loop.time() + deadline
+        done_q: "asyncio.Queue[DeviceResult[T]]" = asyncio.Queue()
+
+        async def run_device(host: str):
+            start_ts = timer()
+            try:
+                res = DeviceResult(
+                    host, result=await self.run(host, coro_fn, host, *vargs, **kwargs)
+                )
+            except Exception as exc:
+                res = DeviceResult(host, error=format_error(exc))
+
+            res.elapsed = timer() - start_ts
+            tracer.add("device", host, start_ts, start_ts + res.elapsed)
+            done_q.put_nowait(res)
+
+        pending = {
+            host: asyncio.ensure_future(run_device(host))
+            for host in dict.fromkeys(hosts)
+        }
+
+        try:
+            while pending:
+                if done_q.empty() and end_ts is not None:
+                    try:
+                        await asyncio.wait_for(
+                            _queue_ready(done_q), timeout=end_ts - loop.time()
+                        )
+                    except asyncio.TimeoutError:
+                        break
+
+                res = await done_q.get()
+                del pending[res.host]
+                yield res
+
+        finally:
+            for task in pending.values():
+                task.cancel()
+
+        for host in pending:
+            yield DeviceResult(
+                host,
+                error=f"DeadlineExceeded: not completed within {deadline}s",
+                elapsed=deadline,
+            )
+
+    def observe(self, elapsed: float):
+        """
+        Called with the seconds taken by each successful attempt, from when
+        the attempt was given a slot; used to determine the hedge delay.
+        """
+        self._latencies.append(elapsed)
+
+        if (pct := self.retry.hedge_pct) is None:
+            return
+
+        # the percentile is recomputed every few observations, rather than on
+        # each, since sorting the latencies is not free.
+
+        if len(self._latencies) >= self.retry.hedge_min_samples and (
+            self._hedge_after is None or len(self._latencies) % 32 == 0
+        ):
+            ordered = sorted(self._latencies)
+            self._hedge_after = ordered[
+                min(len(ordered) - 1, int(len(ordered) * pct / 100))
+            ]
+
+    async def _attempt(
+        self, host: str, coro_fn, vargs, kwargs, started: Optional[asyncio.Event] = None
+    ):
+        """one attempt of the coroutine function, within a slot"""
+        async with self.slot(host):
+            if started:
+                started.set()
+
+            start_ts = timer()
+            result = await coro_fn(*vargs, **kwargs)
+            self.observe(timer() - start_ts)
+            return result
+
+    async def _hedged(self, host: str, coro_fn, vargs, kwargs):
+        """
+        An attempt of the coroutine function; if the attempt takes longer than
+        the hedge delay, from when it was given a slot, then a duplicate
+        attempt is started, and the result of the first to succeed is used.
+        """
+        if self.retry.hedge_pct is None:
+            return await self._attempt(host, coro_fn, vargs, kwargs)
+
+        started = asyncio.Event()
+        pending = {
+            asyncio.ensure_future(self._attempt(host, coro_fn, vargs, kwargs, started))
+        }
+
+        try:
+            start_wait = asyncio.ensure_future(started.wait())
+            await asyncio.wait(
+                pending | {start_wait}, return_when=asyncio.FIRST_COMPLETED
+            )
+            start_wait.cancel()
+
+            # there is no hedge delay until enough latencies are observed.
+
+            done, pending = await asyncio.wait(pending, timeout=self._hedge_after)
+
+            if not done:
+                self.hedged += 1
+                pending.add(
+                    asyncio.ensure_future(self._attempt(host, coro_fn, vargs, kwargs))
+                )
+
+            while True:
+                for task in done:
+                    if (error := task.exception()) is None:
+                        return task.result()
+
+                if not pending:
+                    raise error
+
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+async def _queue_ready(queue: asyncio.Queue):
+    """waits until the queue has an item, without removing it"""
+    queue.put_nowait(await queue.get())
@@ -0,0 +1,580 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the eAPI simulator, a local fake of a network of
+#    Arista EOS devices used to measure the CLI commands without real
+#    switches.  All of the simulated devices are served over a single Unix
+#    socket; the device is identified by the HTTP Host header.  Point the
+#    CLI commands at the simulator by setting the DEMO_EAPI_UDS environment
+#    variable to the socket path, see `Device.eapi_uds`.
+#
+#    Each device answers the eAPI "runCmds" requests used by the demo
+#    commands with payloads in the form of EOS output.  The payloads are
+#    generated from the device name and the seed, so that the same network
+#    is simulated on each run.  The response latency follows a log-normal
+#    distribution, and a fraction of the requests can fail with an HTTP 503
+#    error or stall without a response.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import os
+import re
+import json
+import math
+import time
+import random
+import signal
+import asyncio
+import tempfile
+from pathlib import Path
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Tuple, Any
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "DEFAULT_SOCKET",
+    "SimulatorConfig",
+    "SimDevice",
+    "Simulator",
+    "serve",
+    "run_server",
+]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+DEFAULT_SOCKET = Path(tempfile.gettempdir()) / f"demo-eapi-{os.getuid()}.sock"
+
+# the EOS versions of the simulated devices, and the relative number of
+# devices running each.
+
+EOS_VERSIONS = {"4.25.5M": 2, "4.26.4M": 5, "4.27.2F": 3, "4.28.0F": 1}
+
+# the edge-port transceivers, and the relative number of ports with each.
+
+EDGE_MEDIA_TYPES = {"10GBASE-SR": 6, "10GBASE-LR": 2, "10GBASE-CR": 3, "1000BASE-T": 1}
+UPLINK_MEDIA_TYPES = {"100GBASE-SR4": 3, "100GBASE-LR4": 1}
+
+MEDIA_BANDWIDTH = {"1000BASE-T": 10**9, "10GBASE-T": 10**10}
+
+NUM_UPLINKS = 4
+UPLINK_LANES = 4
+
+# the fraction of the optics that are dirty, reporting a low receive power;
+# that are failing, their receive power falling with each poll; and of the
+# DOM readings that are a momentary drop of the receive power.
+
+DOM_DIRTY_RATE = 0.005
+DOM_FAILING_RATE = 0.01
+DOM_GLITCH_RATE = 0.0005
+
+
+@dataclass()
+class SimulatorConfig:
+    """The simulated network, and how the simulated devices respond"""
+
+    devices: int = 1000  # the number of devices
+    devices_per_site: int = 32  # the number of devices in each site
+    edge_ports: int = 48  # the number of edge-ports per device
+    macs_per_port: int = 2  # the MAC addresses learned per active edge-port
+    latency_ms: float = 50.0  # the median response latency
+    latency_sigma: float = 0.5  # the log-normal shape; 0 for a fixed latency
+    failure_rate: float = 0.0  # the fraction of requests failed with HTTP 503
+    stall_rate: float = 0.0  # the fraction of requests that are not answered
+    stall_time: float = 300.0  # the seconds a stalled request is held
+    seed: int = 0
+
+    def hostnames(self) -> List[str]:
+        """returns the hostnames of the simulated devices, the inventory"""
+        return [
+            f"s{i_dev // self.devices_per_site:04d}-leaf{i_dev % self.devices_per_site:03d}"
+            for i_dev in range(self.devices)
+        ]
+
+
+class SimDevice:
+    """
+    A simulated device.  The interfaces, and the end-hosts connected to them,
+    are generated once from the device name; the command payloads are built
+    from them on request.
+    """
+
+    def __init__(self, config: SimulatorConfig, hostname: str, index: int):
+        self.hostname = hostname
+        self.index = index
+
+        rng = random.Random(f"{config.seed}:{hostname}")
+
+        self.version = _choose(rng, EOS_VERSIONS)
+        self.bootup_ts = 1.6e9 + rng.randrange(10**7)
+        self.system_mac = _format_mac(0x001C73000000 | index)
+
+        # the edge-ports, (name, media type or None when empty, detected media
+        # type, oper up, description, MAC addresses)
+
+        self.ports: List[Tuple[str, Optional[str], str, bool, str, List[str]]] = []
+        self.lldp: Dict[str, Optional[dict]] = dict()
+
+        for port in range(1, config.edge_ports + 1):
+            name = f"Ethernet{port}"
+            if rng.random() < 0.1:
+                self.ports.append((name, None, "", False, "", []))
+                self.lldp[name] = None
+                continue
+
+            media = _choose(rng, EDGE_MEDIA_TYPES)
+
+            # a copper port reports a different detected media type, and is
+            # not included in the transceiver inventory.
+
+            detected = "10GBASE-T" if media == "1000BASE-T" else media
+            oper_up = rng.random() < 0.8
+            macs = [
+                _format_mac(0x020000000000 | index << 16 | port << 8 | i_mac)
+                for i_mac in range(config.macs_per_port if oper_up else 0)
+            ]
+            self.ports.append(
+                (name, media, detected, oper_up, f"host-{index}-{port}", macs)
+            )
+            self.lldp[name] = (
+                _lldp_neighbor(f"host-{index}-{port}", "Ubuntu 20.04 Linux 5.4")
+                if oper_up and rng.random() < 0.3
+                else None
+            )
+
+        # the uplinks are multi-lane transceivers, connected to spine devices
+        # that report as Arista in LLDP.  The MAC addresses of the other
+        # devices in the site are learned on the first uplink.
+
+        self.uplinks: List[Tuple[str, str]] = []
+        site_base = index - index % config.devices_per_site
+        self.uplink_macs = [
+            _format_mac(0x020000000000 | peer << 16 | 1 << 8)
+            for peer in range(
+                site_base, min(site_base + config.devices_per_site, config.devices)
+            )
+            if peer != index
+        ]
+
+        for i_up in range(NUM_UPLINKS):
+            name = f"Ethernet{config.edge_ports + 1 + i_up}/1"
+            self.uplinks.append((name, _choose(rng, UPLINK_MEDIA_TYPES)))
+            self.lldp[name] = _lldp_neighbor(
+                f"s{index // config.devices_per_site:04d}-spine{i_up}",
+                f"Arista Networks EOS version {self.version} running on an Arista DCS-7280",
+            )
+
+        # the DOM readings of each optic, (name, rx power, tx power,
+        # temperature, rx power fall per poll); the readings vary about these
+        # on each poll.
+
+        self.optics: List[Tuple[str, float, float, float, float]] = list()
+        self.dom_polls = 0
+        self._dom_rng = random.Random(f"{config.seed}:{hostname}:dom")
+
+        optic_names = [name for name, media, detected, *_ in self.ports if media]
+        optic_names.extend(
+            f"{name[:-2]}/{lane}"
+            for name, _ in self.uplinks
+            for lane in range(1, UPLINK_LANES + 1)
+        )
+        for name in optic_names:
+            rx_power = rng.uniform(-6.0, -1.0)
+            if rng.random() < DOM_DIRTY_RATE:
+                rx_power -= 12.0
+            fall = rng.uniform(0.2, 0.6) if rng.random() < DOM_FAILING_RATE else 0.0
+            self.optics.append(
+                (name, rx_power, rng.uniform(-3.0, 0.0), rng.uniform(28.0, 45.0), fall)
+            )
+
+    # -------------------------------------------------------------------------
+    # command payloads
+    # -------------------------------------------------------------------------
+
+    def show_version(self) -> dict:
+        return dict(
+            modelName="DCS-7050SX3-48YC8",
+            version=self.version,
+            serialNumber=f"SIM{self.index:08d}",
+            systemMacAddress=self.system_mac,
+            bootupTimestamp=self.bootup_ts,
+            hardwareRevision="11.00",
+            architecture="i686",
+            memTotal=8098984,
+            memFree=5112456,
+        )
+
+    def show_interfaces_transceiver_hardware(self) -> dict:
+        interfaces = dict()
+        for name, media, detected, *_ in self.ports:
+            if media:
+                interfaces[name] = dict(mediaType=media, detectedMediaType=detected)
+
+        # each lane of the uplink transceivers is reported
+
+        for name, media in self.uplinks:
+            for lane in range(1, UPLINK_LANES + 1):
+                interfaces[f"{name[:-2]}/{lane}"] = dict(
+                    mediaType=media, detectedMediaType=media
+                )
+
+        return dict(interfaces=interfaces)
+
+    def show_interfaces_transceiver(self) -> dict:
+        rng = self._dom_rng
+        self.dom_polls += 1
+        interfaces = dict()
+
+        for name, rx_power, tx_power, temperature, fall in self.optics:
+            rx_power += rng.gauss(0.0, 0.1) - fall * self.dom_polls
+            if rng.random() < DOM_GLITCH_RATE:
+                rx_power -= 8.0
+
+            # the receiver reports at least -40 dBm, when there is no light.
+
+            rx_power = max(rx_power, -40.0)
+            interfaces[name] = dict(
+                vendorSn=f"SIM{self.index:06d}{name[8:]}",
+                updateTime=time.time(),
+                rxPower=round(rx_power, 2),
+                txPower=round(tx_power + rng.gauss(0.0, 0.05), 2),
+                txBias=6.5,
+                voltage=3.3,
+                temperature=round(temperature + rng.gauss(0.0, 0.3), 1),
+            )
+
+        return dict(interfaces=interfaces)
+
+    def show_interfaces_status(self) -> dict:
+        statuses = dict()
+        for name, media, _, oper_up, desc, _ in self.ports:
+            statuses[name] = _intf_status(
+                desc,
+                "up" if oper_up else "down",
+                "connected" if oper_up else ("notconnect" if media else "notPresent"),
+                MEDIA_BANDWIDTH.get(media or "", 10**10),
+            )
+
+        for name, _ in self.uplinks:
+            statuses[name] = _intf_status("uplink", "up", "connected", 10**11)
+
+        return dict(interfaceStatuses=statuses)
+
+    def show_mac_address_table(self, address: Optional[str] = None) -> dict:
+        address = address and address.lower()
+        entries = [
+            _mac_entry(mac, name)
+            for name, *_, macs in self.ports
+            for mac in macs
+            if address is None or mac == address
+        ]
+        entries.extend(
+            _mac_entry(mac, self.uplinks[0][0])
+            for mac in self.uplink_macs
+            if address is None or mac == address
+        )
+        return dict(
+            unicastTable=dict(tableEntries=entries),
+            multicastTable=dict(tableEntries=[]),
+        )
+
+    def show_lldp_neighbors_detail(self, interface: Optional[str] = None) -> dict:
+        return dict(
+            lldpNeighbors={
+                name: dict(lldpNeighborInfo=[nei] if nei else [])
+                for name, nei in self.lldp.items()
+                if interface is None or name == interface
+            }
+        )
+
+    def edge_macaddr(self) -> Optional[str]:
+        """returns a MAC address learned on an edge-port of this device"""
+        return next((macs[0] for *_, macs in self.ports if macs), None)
+
+
+class Simulator:
+    """
+    The Simulator answers the eAPI requests of all of the simulated devices.
+    The most recently used devices are kept in memory, up to `max_cached`;
+    others are generated again when next used.
+    """
+
+    # the EOS commands, and the SimDevice method that answers each.  The
+    # groups of the pattern are passed to the method.
+
+    COMMANDS = [
+        (re.compile(r"show version$"), "show_version"),
+        (
+            re.compile(r"show interfaces transceiver hardware$"),
+            "show_interfaces_transceiver_hardware",
+        ),
+        (
+            re.compile(r"show interfaces transceiver$"),
+            "show_interfaces_transceiver",
+        ),
+        (re.compile(r"show interfaces status$"), "show_interfaces_status"),
+        (re.compile(r"show mac address-table$"), "show_mac_address_table"),
+        (
+            re.compile(r"show mac address-table address (\S+)$"),
+            "show_mac_address_table",
+        ),
+        (re.compile(r"show lldp neighbors detail$"), "show_lldp_neighbors_detail"),
+        (
+            re.compile(r"show lldp neighbors (\S+) detail$"),
+            "show_lldp_neighbors_detail",
+        ),
+    ]
+
+    def __init__(self, config: SimulatorConfig, max_cached: int = 4096):
+        self.config = config
+        self.max_cached = max_cached
+        self.hostnames = config.hostnames()
+        self._host_index = {host: index for index, host in enumerate(self.hostnames)}
+        self._devices: "OrderedDict[str, SimDevice]" = OrderedDict()
+        self._rng = random.Random(config.seed)
+        self.requests = 0
+
+    def device(self, hostname: str) -> Optional[SimDevice]:
+        """returns the simulated device, or None if there is no such device"""
+        if dev := self._devices.get(hostname):
+            self._devices.move_to_end(hostname)
+            return dev
+
+        if (index := self._host_index.get(hostname)) is None:
+            return None
+
+        dev = self._devices[hostname] = SimDevice(self.config, hostname, index)
+        if len(self._devices) > self.max_cached:
+            self._devices.popitem(last=False)
+
+        return dev
+
+    def latency(self) -> float:
+        """returns the number of seconds to delay the next response"""
+        median = self.config.latency_ms / 1000
+        if not self.config.latency_sigma:
+            return median
+
+        return self._rng.lognormvariate(math.log(median), self.config.latency_sigma)
+
+    def run_cmds(self, dev: SimDevice, jsonrpc: dict) -> dict:
+        """returns the JSON-RPC response for the eAPI runCmds request"""
+        params = jsonrpc.get("params", {})
+        text = params.get("format") == "text"
+        results: List[Any] = list()
+
+        for i_cmd, command in enumerate(params.get("cmds", [])):
+            command = command["cmd"] if isinstance(command, dict) else command
+            command = " ".join(command.split())
+
+            for pattern, method in self.COMMANDS:
+                if found := pattern.match(command):
+                    output = getattr(dev, method)(*found.groups())
+                    results.append(
+                        dict(output=json.dumps(output, indent=2)) if text else output
+                    )
+                    break
+            else:
+                errmsg = f"CLI command {i_cmd + 1} of {len(params['cmds'])} '{command}' failed: invalid command"
+                results.append(dict(errors=["Invalid input (at token 1)"]))
+                return dict(
+                    jsonrpc="2.0",
+                    id=jsonrpc.get("id"),
+                    error=dict(code=1002, message=errmsg, data=results),
+                )
+
+        return dict(jsonrpc="2.0", id=jsonrpc.get("id"), result=results)
+
+    async def respond(self, host: str, path: str, body: bytes) -> Tuple[int, bytes]:
+        """
+        Returns the HTTP status code and body of the response to the request,
+        once the simulated latency has passed.
+        """
+        self.requests += 1
+        hostname = host.rsplit(":", 1)[0]
+
+        if not (dev := self.device(hostname)):
+            return 404, b'{"error": "no such device"}'
+
+        if path != "/command-api":
+            return 404, b'{"error": "not found"}'
+
+        if self.config.stall_rate and self._rng.random() < self.config.stall_rate:
+            await asyncio.sleep(self.config.stall_time)
+
+        await asyncio.sleep(self.latency())
+
+        if self.config.failure_rate and self._rng.random() < self.config.failure_rate:
+            return 503, b'{"error": "service unavailable"}'
+
+        try:
+            jsonrpc = json.loads(body)
+        except ValueError:
+            return 400, b'{"error": "invalid JSON"}'
+
+        return 200, json.dumps(self.run_cmds(dev, jsonrpc)).encode()
+
+    async def on_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """
+        Serves the HTTP/1.1 requests from one client connection until it is
+        closed.  The connection is kept open between requests, as with eAPI.
+        """
+        try:
+            while True:
+                head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+                request_line, *header_lines = head.split("\r\n")
+                _, path, _ = request_line.split(" ", 2)
+                headers = {
+                    name.strip().lower(): value.strip()
+                    for name, _, value in (line.partition(":") for line in header_lines)
+                    if name
+                }
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self.respond(
+                    headers.get("host", ""), path, body
+                )
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+
+        except (
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            ConnectionError,
+        ):
+            pass
+
+        except asyncio.CancelledError:
+            # the simulator is stopping with requests in progress, for example
+            # stalled requests.
+            pass
+
+        finally:
+            writer.close()
+
+
+async def serve(simulator: Simulator, socket_path: Path, ready=None):
+    """
+    Run the simulator, listening on the Unix socket, until SIGINT or SIGTERM.
+
+    Parameters
+    ----------
+    simulator: Simulator
+        The simulator that answers the requests.
+
+    socket_path: Path
+        The Unix socket file; removed when the simulator stops.
+
+    ready: optional
+        An Event, for example multiprocessing.Event, set once the simulator
+        is listening.
+    """
+    socket_path = Path(socket_path)
+    socket_path.unlink(missing_ok=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    server = await asyncio.start_unix_server(
+        simulator.on_client, path=str(socket_path), backlog=4096
+    )
+
+    if ready:
+        ready.set()
+    else:
+        print(f"Simulating {len(simulator.hostnames)} devices on {socket_path}")
+
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        socket_path.unlink(missing_ok=True)
+
+
+def run_server(config: SimulatorConfig, socket_path: Path, ready=None):
+    """
+    Run the simulator in this process, see `serve`; the target of a
+    multiprocessing Process.
+    """
+    asyncio.run(serve(Simulator(config), socket_path, ready=ready))
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 PRIVATE CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    503: "Service Unavailable",
+}
+
+
+def _choose(rng: random.Random, weights: Dict[str, int]) -> str:
+    """returns one of the keys, chosen by its relative weight"""
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _format_mac(value: int) -> str:
+    """returns the 48-bit integer as a MAC address in EOS xx:yy:zz:aa:bb:cc format"""
+    digits = f"{value:012x}"
+    return ":".join(digits[i : i + 2] for i in range(0, 12, 2))
+
+
+def _mac_entry(macaddr: str, interface: str) -> dict:
+    return dict(
+        vlanId=10,
+        macAddress=macaddr,
+        type="dynamic",
+        interface=interface,
+        moves=1,
+        lastMove=1.6e9,
+    )
+
+
+def _intf_status(desc: str, line_status: str, link_status: str, bandwidth: int):
+    return dict(
+        description=desc,
+        lineProtocolStatus=line_status,
+        linkStatus=link_status,
+        bandwidth=bandwidth,
+        duplex="duplexFull",
+        vlanInformation=dict(interfaceMode="bridged", vlanId=10),
+    )
+
+
+def _lldp_neighbor(system_name: str, system_desc: str) -> dict:
+    return dict(
+        chassisIdType="macAddress",
+        chassisId="0000.0000.0000",
+        systemName=system_name,
+        systemDescription=system_desc,
+        ttl=120,
+        neighborInterfaceInfo=dict(
+            interfaceIdType="interfaceName", interfaceId="Ethernet1"
+        ),
+    )
@@ -0,0 +1,227 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the streaming output "sinks" used to write the
+#    per-device records of a command to a file as soon as each device
+#    completes, rather than holding all of the records until the end of the
+#    run.  The supported formats are:
+#
+#       ndjson      - one JSON object per line
+#       csv         - CSV with a header line
+#       columnar    - gzip compressed row-groups of dictionary encoded columns,
+#                     a compact format for later analysis; see `read_columnar`
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import csv
+import gzip
+import json
+from pathlib import Path
+from typing import List, Dict, Iterable, Iterator, Optional, Any
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "SINK_FORMATS",
+    "RecordSink",
+    "NDJSONSink",
+    "CSVSink",
+    "ColumnarSink",
+    "open_sink",
+    "read_columnar",
+]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class RecordSink:
+    """
+    The RecordSink is the base class for writing records, each a dict with
+    the same field names, to a file.  Use as a context manager so that the
+    file is closed, and any buffered records written, at the end of the run.
+    """
+
+    def __init__(self, filepath: Path, fields: List[str]):
+        """
+        Parameters
+        ----------
+        filepath: Path
+            The output file
+
+        fields: List[str]
+            The record field names, in output order.
+        """
+        self.filepath = Path(filepath)
+        self.fields = fields
+        self.count = 0
+
+    def write(self, records: Iterable[Dict[str, Any]]):
+        """write the records to the file"""
+        raise NotImplementedError()
+
+    def close(self):
+        """close the file"""
+        raise NotImplementedError()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *vargs):
+        self.close()
+
+
+class NDJSONSink(RecordSink):
+    """Writes each record as a JSON object on its own line"""
+
+    def __init__(self, filepath: Path, fields: List[str]):
+        super().__init__(filepath, fields)
+        self._ofile = self.filepath.open("w")
+
+    def write(self, records: Iterable[Dict[str, Any]]):
+        for rec in records:
+            self._ofile.write(json.dumps(rec) + "\n")
+            self.count += 1
+
+        # flush per device so that downstream readers see complete records
+        # while the run is in progress.
+
+        self._ofile.flush()
+
+    def close(self):
+        self._ofile.close()
+
+
+class CSVSink(RecordSink):
+    """Writes each record as a CSV line, after a header line of the field names"""
+
+    def __init__(self, filepath: Path, fields: List[str]):
+        super().__init__(filepath, fields)
+        self._ofile = self.filepath.open("w", newline="")
+        self._writer = csv.DictWriter(self._ofile, fieldnames=fields)
+        self._writer.writeheader()
+
+    def write(self, records: Iterable[Dict[str, Any]]):
+        for rec in records:
+            self._writer.writerow(rec)
+            self.count += 1
+
+        self._ofile.flush()
+
+    def close(self):
+        self._ofile.close()
+
+
+class ColumnarSink(RecordSink):
+    """
+    Writes the records in row-groups of `row_group_size` records.  Each
+    row-group is a JSON line holding a list of values per field; string
+    fields are dictionary encoded, that is a list of the distinct values and a
+    list of small integer codes.  The file is gzip compressed.  Only one
+    row-group is held in memory at a time.
+    """
+
+    def __init__(self, filepath: Path, fields: List[str], row_group_size: int = 65536):
+        super().__init__(filepath, fields)
+        self.row_group_size = row_group_size
+        self._ofile = gzip.open(self.filepath, "wt")
+        self._ofile.write(json.dumps(dict(fields=fields)) + "\n")
+        self._columns: Dict[str, List[Any]] = {field: [] for field in fields}
+        self._rows = 0
+
+    def write(self, records: Iterable[Dict[str, Any]]):
+        for rec in records:
+            for field, column in self._columns.items():
+                column.append(rec[field])
+
+            self._rows += 1
+            self.count += 1
+
+        if self._rows >= self.row_group_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        self._ofile.close()
+
+    def _flush(self):
+        if not self._rows:
+            return
+
+        columns = dict()
+        for field, values in self._columns.items():
+            if values and isinstance(values[0], str):
+                codes: Dict[str, int] = dict()
+                columns[field] = dict(
+                    codes=[codes.setdefault(val, len(codes)) for val in values],
+                    values=list(codes),
+                )
+            else:
+                columns[field] = values
+
+        self._ofile.write(json.dumps(dict(rows=self._rows, columns=columns)) + "\n")
+        self._columns = {field: [] for field in self.fields}
+        self._rows = 0
+
+
+SINK_FORMATS = {"ndjson": NDJSONSink, "csv": CSVSink, "columnar": ColumnarSink}
+
+_SUFFIX_FORMATS = {
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".json": "ndjson",
+    ".csv": "csv",
+    ".gz": "columnar",
+    ".cols": "columnar",
+}
+
+
+def open_sink(
+    filepath: Path, fields: List[str], fmt: Optional[str] = None
+) -> RecordSink:
+    """
+    Returns the sink for the output file.
+
+    Parameters
+    ----------
+    filepath: Path
+        The output file
+
+    fields: List[str]
+        The record field names, in output order.
+
+    fmt: str, optional
+        One of SINK_FORMATS; if not provided the format is determined by the
+        file suffix, defaulting to ndjson.
+    """
+    filepath = Path(filepath)
+    fmt = fmt or _SUFFIX_FORMATS.get(filepath.suffix, "ndjson")
+    return SINK_FORMATS[fmt](filepath, fields)
+
+
+def read_columnar(filepath: Path) -> Iterator[Dict[str, List[Any]]]:
+    """
+    Read a file written by the ColumnarSink, yielding each row-group as a
+    dict of field name to the list of column values, decoded.
+    """
+    with gzip.open(filepath, "rt") as ifile:
+        fields = json.loads(ifile.readline())["fields"]
+
+        for line in ifile:
+            row_group = json.loads(line)["columns"]
+            yield {
+                field: (
+                    [col["values"][code] for code in col["codes"]]
+                    if isinstance(col := row_group[field], dict)
+                    else col
+                )
+                for field in fields
+            }
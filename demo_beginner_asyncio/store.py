@@ -0,0 +1,206 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the local result store used by incremental runs.  The
+#    store keeps the most recent result of each command for each device in a
+#    SQLite file, along with when the result was collected, a hash of its
+#    content, and the device "marker" (its boot timestamp) at that time.  An
+#    incremental run re-polls only the devices whose result is stale or whose
+#    marker has changed, and reports what changed since the previous run.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "DEFAULT_STORE",
+    "DEFAULT_MAX_AGE",
+    "ResultStore",
+    "StoredResult",
+    "content_digest",
+]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+DEFAULT_STORE = Path("demo-results.db")
+
+# The default seconds after which a stored result is re-polled by an
+# incremental run even if the device has not rebooted.
+
+DEFAULT_MAX_AGE = 6 * 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    device TEXT NOT NULL,
+    command TEXT NOT NULL,
+    collected_at REAL NOT NULL,
+    digest TEXT NOT NULL,
+    marker TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (device, command)
+)
+"""
+
+
+def content_digest(data: Any) -> str:
+    """returns the hash of the JSON compatible data, independent of key order"""
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+@dataclass()
+class StoredResult:
+    """The most recent result of a command for a device"""
+
+    device: str
+    command: str
+    collected_at: float  # time.time() value when the result was collected
+    digest: str  # see content_digest
+    marker: Optional[str]  # the device boot timestamp when collected
+    data: Any  # the JSON compatible result
+
+    @property
+    def age(self) -> float:
+        """the number of seconds since the result was collected"""
+        return time.time() - self.collected_at
+
+    def is_stale(self, max_age: float) -> bool:
+        """
+        Returns True if the result is older than its share of max_age.  The
+        limit of each device is spread between half and all of max_age, by a
+        hash of the device name, so that the devices collected together in
+        one run are not all re-polled together in a later run.
+        """
+        spread = (zlib.crc32(self.device.encode()) % 1000) / 2000
+        return self.age > max_age * (0.5 + spread)
+
+
+class ResultStore:
+    """
+    The ResultStore holds the most recent result of each (device, command).
+    Writes are committed when the store is closed, or on `commit`; use as a
+    context manager.
+
+    Examples
+    --------
+        with ResultStore("demo-results.db") as store:
+            previous = store.results("xcvrs")
+            store.put("xcvrs", "nyc1-leaf01", data, marker="1644000000.0")
+    """
+
+    def __init__(self, filepath: Path = DEFAULT_STORE):
+        """
+        Parameters
+        ----------
+        filepath: Path
+            The SQLite file, created if it does not exist.
+        """
+        self.filepath = Path(filepath)
+        self._db = sqlite3.connect(str(self.filepath))
+        self._db.execute(_SCHEMA)
+
+    def results(self, command: str) -> Dict[str, StoredResult]:
+        """
+        Returns the stored results of the command.
+
+        Returns
+        -------
+        Dict[str, StoredResult]
+            key is the device hostname
+        """
+        rows = self._db.execute(
+            "SELECT device, collected_at, digest, marker, data FROM results"
+            " WHERE command = ?",
+            (command,),
+        )
+        return {
+            device: StoredResult(
+                device=device,
+                command=command,
+                collected_at=collected_at,
+                digest=digest,
+                marker=marker,
+                data=json.loads(data),
+            )
+            for device, collected_at, digest, marker, data in rows
+        }
+
+    def put(
+        self, command: str, device: str, data: Any, marker: Optional[str] = None
+    ) -> StoredResult:
+        """
+        Store the result of the command for the device, replacing the previous
+        result.
+
+        Parameters
+        ----------
+        command: str
+            The command name, for example "xcvrs"
+
+        device: str
+            The network device hostname
+
+        data: Any
+            The JSON compatible result
+
+        marker: str, optional
+            The device boot timestamp when the result was collected.
+
+        Returns
+        -------
+        StoredResult
+        """
+        stored = StoredResult(
+            device=device,
+            command=command,
+            collected_at=time.time(),
+            digest=content_digest(data),
+            marker=marker,
+            data=data,
+        )
+        self._db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                device,
+                command,
+                stored.collected_at,
+                stored.digest,
+                marker,
+                json.dumps(data),
+            ),
+        )
+        return stored
+
+    def commit(self):
+        """commit the results stored so far to the file"""
+        self._db.commit()
+
+    def close(self):
+        """commit, and close the file"""
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *vargs):
+        self.close()
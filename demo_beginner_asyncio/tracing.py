@@ -0,0 +1,283 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the per-device phase timings.  When tracing is enabled
+#    each phase of the work of a device is recorded as a span:
+#
+#       dns         - the DNS lookup of the hostname, see HostResolver
+#       wait        - waiting for a concurrency slot, see DeviceScheduler
+#       connect     - the TCP, or Unix socket, connect; includes the DNS lookup
+#                     when the hostname was not resolved up front
+#       tls         - the TLS handshake
+#       send        - sending the request
+#       server      - from the request sent until the response headers, the
+#                     time the switch takes to run the commands
+#       receive     - receiving the response body
+#       request     - the whole eAPI request, including the above
+#       decode      - decoding the JSON response, see jsoncodec
+#       parse       - building the results from the command outputs
+#       device      - all of the work of the device, including retries
+#
+#    The connection phases come from the httpcore "trace" extension, so a
+#    request on a kept-alive connection has no connect or tls span.  The
+#    spans are written as a Chrome trace file, which can be opened with
+#    chrome://tracing or https://ui.perfetto.dev, and summarized per phase.
+#    When tracing is not enabled the cost is a flag check per phase.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import os
+import json
+from pathlib import Path
+from contextlib import contextmanager
+from collections import defaultdict
+from timeit import default_timer as timer
+from typing import List, Dict, Iterable, NamedTuple, Callable, Awaitable
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from rich.console import Console
+from rich.table import Table
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["PHASES", "Span", "Tracer", "tracer", "trace_to", "report"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# the phases, in the order they are reported
+
+PHASES = (
+    "dns",
+    "wait",
+    "connect",
+    "tls",
+    "send",
+    "server",
+    "receive",
+    "request",
+    "decode",
+    "parse",
+    "device",
+)
+
+# the httpcore trace event names, without the ".started" or ".complete"
+# suffix, and the phase of each.
+
+HTTP_TRACE_PHASES = {
+    "connection.connect_tcp": "connect",
+    "connection.connect_unix_socket": "connect",
+    "connection.start_tls": "tls",
+    "http11.send_request_headers": "send",
+    "http11.send_request_body": "send",
+    "http11.receive_response_headers": "server",
+    "http11.receive_response_body": "receive",
+    "http2.send_request_headers": "send",
+    "http2.send_request_body": "send",
+    "http2.receive_response_headers": "server",
+    "http2.receive_response_body": "receive",
+}
+
+
+class Span(NamedTuple):
+    """One phase of the work of one device"""
+
+    phase: str
+    host: str
+    start: float  # timer() value, seconds
+    duration: float  # seconds
+    pid: int  # the process that did the work
+
+
+class _SpanTimer:
+    """context manager that records the span of its body"""
+
+    __slots__ = ("tracer", "phase", "host", "start")
+
+    def __init__(self, tracer: "Tracer", phase: str, host: str):
+        self.tracer, self.phase, self.host = tracer, phase, host
+
+    def __enter__(self):
+        self.start = timer()
+
+    def __exit__(self, *vargs):
+        self.tracer.add(self.phase, self.host, self.start, timer())
+
+
+class _NoSpan:
+    """the context manager used when tracing is not enabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *vargs):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    """
+    The Tracer collects the spans of the devices worked on by this process.
+    Spans are only recorded once `enabled` is set.
+
+    Examples
+    --------
+        with tracer.span("parse", dev.host):
+            results = parse(outputs)
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.spans: List[Span] = list()
+        self._pid = os.getpid()
+
+    def enable(self, enabled: bool = True):
+        """start, or stop, recording spans"""
+        self.enabled = enabled
+        self._pid = os.getpid()
+
+    def add(self, phase: str, host: str, start: float, end: float):
+        """record the span of the phase, from the timer() start and end values"""
+        if self.enabled:
+            self.spans.append(Span(phase, host, start, end - start, self._pid))
+
+    def span(self, phase: str, host: str):
+        """returns a context manager that records the span of its body"""
+        if not self.enabled:
+            return _NO_SPAN
+        return _SpanTimer(self, phase, host)
+
+    def http_trace(self, host: str) -> Callable[[str, dict], Awaitable[None]]:
+        """
+        Returns the httpcore "trace" extension callback that records the
+        connection phases of one request, see HTTP_TRACE_PHASES.
+        """
+        started: Dict[str, float] = dict()
+
+        async def trace(event_name: str, info: dict):
+            name, _, state = event_name.rpartition(".")
+            if not (phase := HTTP_TRACE_PHASES.get(name)):
+                return
+
+            if state == "started":
+                started[name] = timer()
+            elif (start := started.pop(name, None)) is not None:
+                self.add(phase, host, start, timer())
+
+        return trace
+
+    def drain(self) -> List[Span]:
+        """returns the recorded spans, and clears them; used by worker processes"""
+        spans, self.spans = self.spans, list()
+        return spans
+
+    def export(self, filepath: Path):
+        """
+        Write the spans as a Chrome trace file: each device is a "thread" of
+        the process that worked on it, and each span a complete event.
+        """
+        tids: Dict[str, int] = dict()
+        events = list()
+
+        for span in self.spans:
+            if (tid := tids.get(span.host)) is None:
+                tid = tids[span.host] = len(tids) + 1
+                events.append(
+                    dict(
+                        name="thread_name",
+                        ph="M",
+                        pid=span.pid,
+                        tid=tid,
+                        args=dict(name=span.host),
+                    )
+                )
+
+            events.append(
+                dict(
+                    name=span.phase,
+                    cat="device",
+                    ph="X",
+                    ts=round(span.start * 1e6, 1),
+                    dur=round(span.duration * 1e6, 1),
+                    pid=span.pid,
+                    tid=tid,
+                    args=dict(host=span.host),
+                )
+            )
+
+        with Path(filepath).open("w") as ofile:
+            json.dump(dict(traceEvents=events, displayTimeUnit="ms"), ofile)
+
+
+# The per-process tracer used by the Device, the scheduler and the commands.
+
+tracer = Tracer()
+
+
+@contextmanager
+def trace_to(filepath: Path):
+    """
+    Context manager that enables the tracer, and on exit writes the spans to
+    the Chrome trace file and prints the summary of each phase.
+    """
+    tracer.enable()
+    try:
+        yield tracer
+    finally:
+        tracer.enable(False)
+        tracer.export(filepath)
+        report(tracer.spans)
+        print(f"{len(tracer.spans)} spans written to {filepath}")
+
+
+def report(spans: Iterable[Span]):
+    """print the count, total and latency percentiles of each phase"""
+    by_phase: Dict[str, List[float]] = defaultdict(list)
+    for span in spans:
+        by_phase[span.phase].append(span.duration)
+
+    table = Table(
+        "Phase",
+        "Count",
+        "Total s",
+        "p50 ms",
+        "p90 ms",
+        "p99 ms",
+        "Max ms",
+        title="Per-device phase timings",
+        title_justify="left",
+    )
+
+    for phase in (name for name in PHASES if name in by_phase):
+        durations = sorted(by_phase[phase])
+
+        def _pct(pct: float) -> str:
+            value = durations[min(len(durations) - 1, int(len(durations) * pct / 100))]
+            return f"{value * 1000:.1f}"
+
+        table.add_row(
+            phase,
+            str(len(durations)),
+            f"{sum(durations):.2f}",
+            _pct(50),
+            _pct(90),
+            _pct(99),
+            f"{durations[-1] * 1000:.1f}",
+        )
+
+    Console().print("\n", table)
@@ -0,0 +1,267 @@
+# =============================================================================
+# Purpose:
+# --------
+#    This file contains the continuous polling mode of the xcvrs and versions
+#    commands.  Each device is polled once per interval, with the polls of the
+#    devices spread evenly across the interval rather than all at once, and
+#    the device sessions are kept open between polls.  The first poll of each
+#    device is the baseline; after that only the changes are output, a record
+#    per change, for example an interface that went down, an optic that was
+#    inserted, or a version that changed.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import sys
+import json
+import time
+import asyncio
+from typing import List, Optional, Dict, Tuple, Any
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .device_pool import device_pool
+from .cli_cache import cli_cache
+from .scheduler import DeviceScheduler, format_error
+from .sinks import RecordSink
+from . import inventory_transceivers
+from . import inventory_versions
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["WATCH_COMMANDS", "WATCH_FIELDS", "WatchCommand", "main"]
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The field names of the change records.
+
+WATCH_FIELDS = ["time", "command", "device", "item", "change", "previous", "current"]
+
+# the state of each item of a device, for example each interface, as a tuple
+# of strings.
+
+DeviceState = Dict[str, Tuple[str, ...]]
+
+
+class WatchCommand:
+    """
+    The command polled by the watch.  The subclass polls a device for its
+    state, and names the change between two states of an item.
+    """
+
+    name: str = ""
+
+    async def poll(self, host: str) -> DeviceState:
+        """returns the state of the device, key is the item name"""
+        raise NotImplementedError()
+
+    def change(
+        self, item: str, previous: Optional[tuple], current: Optional[tuple]
+    ) -> str:
+        """returns the name of the change of the item state, None when absent"""
+        if previous is None:
+            return "added"
+        if current is None:
+            return "removed"
+        return "changed"
+
+
+class XcvrsWatch(WatchCommand):
+    """The state of each transceiver: (media type, "up" or "down")"""
+
+    name = "xcvrs"
+
+    async def poll(self, host: str) -> DeviceState:
+        _, xcvrs = await inventory_transceivers.device_get_transceivers(host)
+        return {
+            xcvr.intf_name: (xcvr.media_type, "up" if xcvr.intf_oper_up else "down")
+            for xcvr in xcvrs
+        }
+
+    def change(
+        self, item: str, previous: Optional[tuple], current: Optional[tuple]
+    ) -> str:
+        if previous is None:
+            return "inserted"
+        if current is None:
+            return "removed"
+        if previous[0] != current[0]:
+            return "replaced"
+        return current[1]
+
+
+class VersionsWatch(WatchCommand):
+    """The state of the device: its version, and boot timestamp"""
+
+    name = "versions"
+
+    async def poll(self, host: str) -> DeviceState:
+        ver_info = await inventory_versions.get_version(host)
+        return dict(
+            version=(ver_info["version"],),
+            boot=(str(ver_info["bootupTimestamp"]),),
+        )
+
+    def change(
+        self, item: str, previous: Optional[tuple], current: Optional[tuple]
+    ) -> str:
+        if item == "boot" and previous and current:
+            return "rebooted"
+        return super().change(item, previous, current)
+
+
+WATCH_COMMANDS = {each.name: each for each in (XcvrsWatch, VersionsWatch)}
+
+
+async def main(
+    inventory: List[str],
+    command: str,
+    interval: float,
+    scheduler: Optional[DeviceScheduler] = None,
+    sink: Optional[RecordSink] = None,
+    cycles: Optional[int] = None,
+):
+    """
+    Poll the inventory every interval seconds, until interrupted, and output
+    a record per change.  Without a sink the records are printed as JSON
+    lines.
+
+    Parameters
+    ----------
+    inventory: List[str]
+        The list of network devices to poll.
+
+    command: str
+        The name of the command polled, from WATCH_COMMANDS.
+
+    interval: float
+        The seconds between polls of each device.
+
+    scheduler: DeviceScheduler, optional
+        Limits the number of devices polled at the same time.
+
+    sink: RecordSink, optional
+        When provided, the change records are written to the sink; see
+        WATCH_FIELDS.
+
+    cycles: int, optional
+        When provided, the number of times each device is polled.
+    """
+    watch_cmd = WATCH_COMMANDS[command]()
+    scheduler = scheduler or DeviceScheduler()
+    loop = asyncio.get_running_loop()
+
+    # the device sessions are kept open between polls.
+
+    device_pool.idle_timeout = max(device_pool.idle_timeout, 2 * interval)
+
+    def emit(records: List[Dict[str, Any]]):
+        if sink:
+            sink.write(records)
+            return
+
+        for rec in records:
+            sys.stdout.write(json.dumps(rec) + "\n")
+
+        sys.stdout.flush()
+
+    states: Dict[str, DeviceState] = dict()
+    errors: Dict[str, str] = dict()
+
+    async def poll_device(host: str):
+        try:
+            state = await scheduler.run(host, watch_cmd.poll, host)
+        except Exception as exc:
+            error = format_error(exc)
+            if host not in errors:
+                emit([_record(command, host, "", "unreachable", "", error)])
+            errors[host] = error
+            return
+
+        if errors.pop(host, None):
+            emit([_record(command, host, "", "reachable", "", "")])
+
+        if (previous := states.get(host)) is not None and (
+            changes := _changes(watch_cmd, host, previous, state)
+        ):
+            emit(changes)
+
+        states[host] = state
+
+    async def watch_device(host: str, offset: float):
+        next_ts = start_ts + offset
+        polls = 0
+
+        while cycles is None or polls < cycles:
+            await asyncio.sleep(max(0.0, next_ts - loop.time()))
+            await poll_device(host)
+            polls += 1
+
+            # a poll that took longer than the interval skips the missed polls
+            # rather than polling again at once.
+
+            next_ts += interval
+            while next_ts < loop.time():
+                next_ts += interval
+
+    start_ts = loop.time()
+    spacing = interval / max(1, len(inventory))
+
+    # each poll is of the current device state, not a cached command output.
+
+    with cli_cache.refreshing():
+        await asyncio.gather(
+            *(
+                watch_device(host, i_dev * spacing)
+                for i_dev, host in enumerate(inventory)
+            )
+        )
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 PRIVATE CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+def _record(
+    command: str, host: str, item: str, change: str, previous: str, current: str
+) -> Dict[str, Any]:
+    return dict(
+        time=round(time.time(), 3),
+        command=command,
+        device=host,
+        item=item,
+        change=change,
+        previous=previous,
+        current=current,
+    )
+
+
+def _changes(
+    watch_cmd: WatchCommand, host: str, previous: DeviceState, current: DeviceState
+) -> List[Dict[str, Any]]:
+    """returns the change records between the previous and current device state"""
+    return [
+        _record(
+            watch_cmd.name,
+            host,
+            item,
+            watch_cmd.change(item, prev, cur),
+            " ".join(prev or ()),
+            " ".join(cur or ()),
+        )
+        for item in sorted(previous.keys() | current.keys())
+        if (prev := previous.get(item)) != (cur := current.get(item))
+    ]
@@ -1,4 +1,4 @@
-from invoke import task
+from invoke import task, Exit
 
 
 @task
@@ -14,3 +14,43 @@ def clean(ctx):
     ctx.run("rm -rf netcfgbu.egg-info")
     ctx.run("rm -rf .pytest_cache .pytest_tmpdir .coverage")
     ctx.run("rm -rf htmlcov")
+
+
+# The packages, and command modules, that the CLI must not import until a
+# command runs; and the time budget of importing the CLI.
+
+STARTUP_DEFERRED = [
+    "rich",
+    "httpx",
+    "aioeapi",
+    "macaddr",
+    "asyncio",
+    "demo_beginner_asyncio.arista_eos",
+    "demo_beginner_asyncio.find_macaddr",
+    "demo_beginner_asyncio.inventory_transceivers",
+    "demo_beginner_asyncio.inventory_versions",
+    "demo_beginner_asyncio.mp_xcvrs",
+]
+
+
+@task
+def startup(ctx, budget_ms=100):
+    """check that the CLI imports without the command modules, within the budget"""
+    res = ctx.run(
+        "python -X importtime -c 'import sys, demo_beginner_asyncio.cli; "
+        "print(*sorted(sys.modules))'",
+        hide=True,
+    )
+
+    if loaded := set(STARTUP_DEFERRED) & set(res.stdout.split()):
+        raise Exit(f"CLI import loads: {', '.join(sorted(loaded))}", code=1)
+
+    # the last importtime line is the CLI module, with the cumulative time
+    # in microseconds.
+
+    cli_line = res.stderr.strip().splitlines()[-1]
+    cli_ms = int(cli_line.split("|")[1]) / 1000
+    print(f"CLI import time: {cli_ms:.1f} ms, budget {budget_ms} ms")
+
+    if cli_ms > budget_ms:
+        raise Exit("CLI import time is over budget", code=1)
@@ -0,0 +1,59 @@
+# =============================================================================
+# Purpose:
+# --------
+#    The pytest fixtures shared by the tests.  The tests that need network
+#    devices run against the eAPI simulator, see simulator, started once per
+#    test session in its own process.
+# =============================================================================
+
+import os
+import multiprocessing
+from typing import Iterator
+
+import pytest
+
+from demo_beginner_asyncio.simulator import SimulatorConfig, run_server
+
+# The simulated network of the tests: small, with a fixed latency, and no
+# failures.
+
+SIM_CONFIG = SimulatorConfig(devices=64, latency_ms=1.0, latency_sigma=0.0)
+
+
+@pytest.fixture(scope="session")
+def simulator(tmp_path_factory) -> Iterator[SimulatorConfig]:
+    """
+    Start the eAPI simulator, and point the Device at it, for the test
+    session.  Yields the simulator config, whose hostnames are the inventory.
+    """
+    from demo_beginner_asyncio.arista_eos import Device
+    from demo_beginner_asyncio.cli_cache import cli_cache
+
+    socket_path = tmp_path_factory.mktemp("simulator") / "eapi.sock"
+
+    ctx = multiprocessing.get_context()
+    ready = ctx.Event()
+    sim_proc = ctx.Process(
+        target=run_server, args=(SIM_CONFIG, socket_path, ready), daemon=True
+    )
+    sim_proc.start()
+
+    if not ready.wait(timeout=30):
+        sim_proc.terminate()
+        raise RuntimeError("The eAPI simulator did not start")
+
+    # every request goes to the simulator, rather than reusing a cached output
+    # of a previous test.
+
+    saved = Device.eapi_uds, Device.auth, cli_cache.enabled
+    os.environ.setdefault("NETWORK_USERNAME", "admin")
+    os.environ.setdefault("NETWORK_PASSWORD", "admin")
+    Device.eapi_uds = str(socket_path)
+    cli_cache.enabled = False
+
+    try:
+        yield SIM_CONFIG
+    finally:
+        Device.eapi_uds, Device.auth, cli_cache.enabled = saved
+        sim_proc.terminate()
+        sim_proc.join()
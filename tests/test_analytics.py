@@ -0,0 +1,133 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests of the transceiver analytics: the group counts with numpy, by
+#    bincount or by sorting the keys, are the same as those counted without
+#    numpy; on a random table, and on the transceivers of the simulator.
+# =============================================================================
+
+import random
+from typing import Dict, Tuple
+
+import pytest
+
+from demo_beginner_asyncio import analytics
+from demo_beginner_asyncio.analytics import XcvrAnalytics, speed_of
+from demo_beginner_asyncio.netdefs import XcvrStatus, XcvrTable
+from demo_beginner_asyncio.progressbar import Progress
+from demo_beginner_asyncio.device_pool import run_with_pool
+from demo_beginner_asyncio import inventory_transceivers
+
+MEDIA_TYPES = ["10GBASE-SR", "10GBASE-LR", "100GBASE-SR4", "1000BASE-T", "Unknown"]
+
+GROUPINGS = [
+    (["media_type"], None),
+    (["site", "speed"], None),
+    (["device", "oper_state"], None),
+    (["speed"], dict(oper_state="down")),
+    (["site", "media_type"], dict(speed="10G", oper_state="up")),
+    (["media_type"], dict(site="no-such-site")),
+]
+
+
+def _random_table(num_devices: int = 40, seed: int = 0) -> XcvrTable:
+    rng = random.Random(seed)
+    xcvrs = XcvrTable()
+    for i_dev in range(num_devices):
+        xcvrs.extend(
+            f"s{i_dev % 7:02d}-leaf{i_dev:03d}",
+            (
+                XcvrStatus(
+                    intf_name=f"Ethernet{i_intf}",
+                    intf_desc="",
+                    intf_oper_up=rng.random() < 0.8,
+                    media_type=rng.choice(MEDIA_TYPES),
+                )
+                for i_intf in range(rng.randint(0, 52))
+            ),
+        )
+    return xcvrs
+
+
+def _counts(xcvrs: XcvrTable, dims, where) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+    groups = XcvrAnalytics(xcvrs).group_by(dims, where=where, top=None)
+    counts = {group.keys: (group.count, group.pct) for group in groups}
+    assert len(counts) == len(groups)
+    return counts
+
+
+@pytest.fixture(params=["bincount", "unique"])
+def with_numpy(request, monkeypatch):
+    """count with numpy, by bincount or by sorting the keys"""
+    pytest.importorskip("numpy")
+    if request.param == "unique":
+        monkeypatch.setattr(analytics, "BINCOUNT_MAX_KEYS", 0)
+
+
+def _counts_py(monkeypatch, xcvrs: XcvrTable, dims, where):
+    """the counts without numpy"""
+    with monkeypatch.context() as patch:
+        patch.setattr(analytics, "np", None)
+        return _counts(xcvrs, dims, where)
+
+
+@pytest.mark.parametrize("dims, where", GROUPINGS)
+def test_numpy_parity(with_numpy, monkeypatch, dims, where):
+    xcvrs = _random_table()
+    assert _counts(xcvrs, dims, where) == _counts_py(monkeypatch, xcvrs, dims, where)
+
+
+def test_numpy_parity_simulator(simulator, with_numpy, monkeypatch):
+    xcvrs, failed = run_with_pool(
+        inventory_transceivers._inventory_network(
+            simulator.hostnames(), Progress(disable=True)
+        )
+    )
+    assert not failed and len(xcvrs)
+
+    for dims, where in GROUPINGS:
+        assert _counts(xcvrs, dims, where) == _counts_py(
+            monkeypatch, xcvrs, dims, where
+        )
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_group_by_top(monkeypatch, use_numpy: bool):
+    if not use_numpy:
+        monkeypatch.setattr(analytics, "np", None)
+
+    xcvrs = _random_table()
+    all_groups = XcvrAnalytics(xcvrs).group_by(["device"], top=None)
+    top_groups = XcvrAnalytics(xcvrs).group_by(["device"], top=5)
+
+    counts = [group.count for group in all_groups]
+    assert counts == sorted(counts, reverse=True)
+    assert [group.count for group in top_groups] == counts[:5]
+    assert sum(counts) == len(xcvrs)
+    assert sum(group.pct for group in all_groups) == pytest.approx(100.0)
+
+
+def test_group_by_errors():
+    xcvrs = _random_table(num_devices=2)
+    with pytest.raises(ValueError, match="Unknown dimension"):
+        XcvrAnalytics(xcvrs).group_by(["rack"])
+    with pytest.raises(ValueError, match="Expected one or more"):
+        XcvrAnalytics(xcvrs).group_by([])
+
+
+def test_empty_table():
+    assert XcvrAnalytics(XcvrTable()).group_by(["media_type"]) == []
+
+
+@pytest.mark.parametrize(
+    "media_type, speed",
+    [
+        ("100GBASE-SR4", "100G"),
+        ("10GBASE-LR", "10G"),
+        ("1000BASE-T", "1G"),
+        ("100BASE-TX", "100M"),
+        ("Unknown", "unknown"),
+    ],
+)
+def test_speed_of(media_type: str, speed: str):
+    assert speed_of(media_type) == speed
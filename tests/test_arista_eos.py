@@ -0,0 +1,86 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests of the Device against the simulator: the command errors raised
+#    by the JSON-RPC request of each installed JSON codec, and the edge-port
+#    classification of the LLDP neighbors.
+# =============================================================================
+
+import pytest
+from aioeapi import EapiCommandError
+
+from demo_beginner_asyncio.arista_eos import Device
+from demo_beginner_asyncio.device_pool import device_pool, run_with_pool
+from demo_beginner_asyncio.jsoncodec import JSON_CODECS, get_codec
+
+INSTALLED = [name for name, (_, installed) in JSON_CODECS.items() if installed]
+
+
+@pytest.fixture(params=INSTALLED)
+def codec(request, monkeypatch):
+    """the Device uses each of the installed JSON codecs"""
+    monkeypatch.setattr(Device, "json_codec", get_codec(request.param))
+
+
+def _run_cli(host: str, **kwargs):
+    async def main():
+        async with device_pool.device(host) as dev:
+            return await dev.cli(**kwargs)
+
+    return run_with_pool(main())
+
+
+def test_command_error(simulator, codec):
+    host = simulator.hostnames()[0]
+    commands = ["show version", "show no-such-thing", "show interfaces status"]
+
+    with pytest.raises(EapiCommandError) as exc_info:
+        _run_cli(host, commands=commands)
+
+    error = exc_info.value
+    assert error.failed == "show no-such-thing"
+    assert "invalid command" in error.errmsg
+    assert len(error.passed) == 1 and "version" in error.passed[0]
+    assert error.not_exec == ["show interfaces status"]
+
+
+def test_command_error_suppressed(simulator, codec):
+    host = simulator.hostnames()[0]
+
+    assert _run_cli(host, command="show no-such-thing", suppress_error=True) is None
+    assert (
+        _run_cli(
+            host,
+            commands=["show version", "show no-such-thing"],
+            suppress_error=True,
+        )
+        is None
+    )
+
+
+@pytest.mark.parametrize(
+    "nei_rec, is_edge",
+    [
+        ({"systemDescription": "Ubuntu 20.04 Linux 5.4"}, True),
+        ({"systemDescription": "Arista Networks EOS version 4.27.2F"}, False),
+        ({"systemDescription": "Cisco IOS Software, C3750E"}, False),
+        ({"neighborInterfaceInfo": {"systemDescription": "EXTREME XOS"}}, False),
+        ({}, True),
+    ],
+)
+def test_is_edge_neighbor(nei_rec: dict, is_edge: bool):
+    assert Device._is_edge_neighbor([nei_rec]) is is_edge
+
+
+def test_lldp_edge_ports(simulator):
+    host = simulator.hostnames()[0]
+
+    async def main():
+        async with device_pool.device(host) as dev:
+            return await dev.lldp_edge_ports()
+
+    edge_ports = run_with_pool(main())
+
+    # the uplinks, to the Arista spines, are not edge-ports.
+
+    assert True in edge_ports.values() and False in edge_ports.values()
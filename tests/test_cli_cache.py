@@ -0,0 +1,152 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests of the command output cache: the per-command TTLs, the least
+#    recently used limit, the refresh context, the SQLite file, and its use
+#    by `Device.cli` against the simulator.
+# =============================================================================
+
+import time
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from demo_beginner_asyncio import arista_eos
+from demo_beginner_asyncio.cli_cache import CliCache
+from demo_beginner_asyncio.device_pool import device_pool, run_with_pool
+
+HOST = "nyc1-leaf01"
+VERSION = {"version": "4.27.2F"}
+
+
+def test_command_without_ttl_not_cached():
+    cache = CliCache(ttls={"show version": 60.0})
+    cache.put(HOST, "show mac address-table", {"unicastTable": {}})
+
+    assert cache.get(HOST, "show mac address-table") is None
+    assert cache.ttl("show mac address-table") == 0.0
+
+
+def test_ttl_expiry():
+    cache = CliCache(ttls={"show version": 0.05})
+    cache.put(HOST, "show version", VERSION)
+
+    assert cache.get(HOST, "show version") == VERSION
+    assert cache.get("nyc1-leaf02", "show version") is None
+
+    time.sleep(0.06)
+    assert cache.get(HOST, "show version") is None
+
+
+def test_disabled():
+    cache = CliCache(ttls={"show version": 60.0})
+    cache.put(HOST, "show version", VERSION)
+    cache.enabled = False
+
+    assert cache.get(HOST, "show version") is None
+
+
+def test_least_recently_used_removed():
+    cache = CliCache(ttls={"show version": 60.0}, max_entries=2)
+    for host in ("a", "b"):
+        cache.put(host, "show version", {"version": host})
+
+    cache.get("a", "show version")
+    cache.put("c", "show version", {"version": "c"})
+
+    assert cache.get("b", "show version") is None
+    assert cache.get("a", "show version") == {"version": "a"}
+    assert cache.get("c", "show version") == {"version": "c"}
+
+
+def test_refreshing():
+    cache = CliCache(ttls={"show version": 60.0})
+    cache.put(HOST, "show version", VERSION)
+
+    with cache.refreshing():
+        assert cache.get(HOST, "show version") is None
+
+    with cache.refreshing(False):
+        assert cache.get(HOST, "show version") == VERSION
+
+
+def test_refreshing_applies_to_tasks_of_the_context():
+    cache = CliCache(ttls={"show version": 60.0})
+    cache.put(HOST, "show version", VERSION)
+
+    async def lookup():
+        return cache.get(HOST, "show version")
+
+    async def main():
+        with cache.refreshing():
+            refreshed = asyncio.ensure_future(lookup())
+        cached = asyncio.ensure_future(lookup())
+        return await refreshed, await cached
+
+    assert asyncio.run(main()) == (None, VERSION)
+
+
+def test_file_reused_across_runs(tmp_path: Path):
+    filepath = tmp_path / "cli_cache.db"
+
+    cache = CliCache(ttls={"show version": 60.0, "show clock": 0.05})
+    cache.open(filepath)
+    cache.put(HOST, "show version", VERSION)
+    cache.put(HOST, "show clock", {"utcTime": 1.0})
+    time.sleep(0.06)
+    cache.close()
+
+    # a new run, in which the expired "show clock" output is not used.
+
+    cache = CliCache(ttls={"show version": 60.0, "show clock": 0.05})
+    cache.open(filepath)
+    try:
+        assert cache.get(HOST, "show version") == VERSION
+        assert cache.get(HOST, "show clock") is None
+    finally:
+        cache.close()
+
+
+@pytest.fixture()
+def sent_commands(simulator, monkeypatch):
+    """
+    Use a cache of the "show version" output in the Device, and return the
+    list of the commands sent to the devices.
+    """
+    sent = list()
+    jsonrpc_exec = arista_eos.Device.jsonrpc_exec
+
+    async def counting_exec(self, jsonrpc: dict):
+        sent.extend(jsonrpc["params"]["cmds"])
+        return await jsonrpc_exec(self, jsonrpc)
+
+    monkeypatch.setattr(arista_eos, "cli_cache", CliCache(ttls={"show version": 60.0}))
+    monkeypatch.setattr(arista_eos.Device, "jsonrpc_exec", counting_exec)
+    return sent
+
+
+def test_device_fetches_only_uncached(simulator, sent_commands: list):
+    host = simulator.hostnames()[0]
+
+    async def main():
+        async with device_pool.device(host) as dev:
+            first = await dev.cli("show version")
+            both = await dev.cli(commands=["show version", "show interfaces status"])
+            with arista_eos.cli_cache.refreshing():
+                await dev.cli("show version")
+            await dev.boot_marker()
+            return first, both
+
+    first, (version, status) = run_with_pool(main())
+
+    assert version == first and "version" in first
+    assert "interfaceStatuses" in status
+    # the refresh, and the reboot check, always reach the device.
+
+    assert sent_commands == [
+        "show version",
+        "show interfaces status",
+        "show version",
+        "show version",
+    ]
@@ -0,0 +1,208 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests of the daemon protocol: the requests of daemon_client answered by
+#    a Daemon serving the simulated network, the error replies, and the
+#    bound on the results kept by the daemon.
+# =============================================================================
+
+import json
+import socket
+import asyncio
+from pathlib import Path
+from functools import partial
+from typing import Callable, Any
+
+import pytest
+from macaddr import MacAddress
+
+from demo_beginner_asyncio import daemon_client, find_macaddr
+from demo_beginner_asyncio.daemon import Daemon
+from demo_beginner_asyncio.device_pool import run_with_pool
+from demo_beginner_asyncio.scheduler import DeviceScheduler
+from demo_beginner_asyncio.simulator import SimDevice
+
+
+def _serve(daemon: Daemon, socket_path: Path, client: Callable[[Path], Any]) -> Any:
+    """
+    Serve the daemon on the socket while the client function is run in a
+    thread, since the client is blocking; returns the client function result.
+    """
+
+    async def _main():
+        server = await asyncio.start_unix_server(
+            daemon.on_client, path=str(socket_path)
+        )
+        async with server:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, client, socket_path)
+
+    return run_with_pool(_main())
+
+
+def _raw_request(line: bytes, socket_path: Path) -> dict:
+    """sends the line to the daemon as-is, returning the decoded reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(10)
+        sock.connect(str(socket_path))
+        with sock.makefile("rwb") as stream:
+            stream.write(line)
+            stream.flush()
+            return json.loads(stream.readline())
+
+
+@pytest.fixture()
+def daemon(simulator) -> Daemon:
+    return Daemon(simulator.hostnames(), scheduler=DeviceScheduler(max_concurrency=16))
+
+
+@pytest.fixture()
+def socket_path(tmp_path: Path) -> Path:
+    return tmp_path / "daemon.sock"
+
+
+def test_inventory_digest():
+    digest = daemon_client.inventory_digest(["b", "a", "a"])
+    assert digest == daemon_client.inventory_digest(["a", "b"])
+    assert digest != daemon_client.inventory_digest(["a", "b", "c"])
+
+
+def test_request_without_daemon(socket_path: Path):
+    assert daemon_client.request("versions", socket_path=socket_path) is None
+
+
+def test_versions_reused_and_refreshed(daemon: Daemon, socket_path: Path):
+    def client(path: Path):
+        return [
+            daemon_client.request("versions", socket_path=path),
+            daemon_client.request("versions", socket_path=path),
+            daemon_client.request("versions", socket_path=path, refresh=True),
+        ]
+
+    first, repeat, refreshed = _serve(daemon, socket_path, client)
+
+    versions, failed = daemon_client.decode_versions(first["result"])
+    assert sum(versions.values()) == len(daemon.inventory)
+    assert not failed
+
+    assert first["age"] == 0.0
+    assert repeat["age"] > 0.0 and repeat["result"] == first["result"]
+    assert refreshed["age"] == 0.0
+
+
+def test_xcvrs(daemon: Daemon, socket_path: Path):
+    reply = _serve(daemon, socket_path, partial(daemon_client.request, "xcvrs"))
+    types, down, failed = daemon_client.decode_xcvrs(reply["result"])
+
+    assert sum(types.values()) > len(down) > 0
+    assert set(down.devices) <= set(daemon.inventory)
+    assert not failed
+
+
+def test_find_host(simulator, daemon: Daemon, socket_path: Path):
+    i_dev = len(daemon.inventory) // 2
+    target = daemon.inventory[i_dev]
+    macaddr = SimDevice(simulator, target, i_dev).edge_macaddr()
+
+    reply = _serve(
+        daemon,
+        socket_path,
+        partial(daemon_client.request, "find-host", macaddr=macaddr),
+    )
+    found, failed = daemon_client.decode_find_host(reply["result"])
+
+    assert found.device == target and not failed
+    assert daemon._last_found[str(MacAddress(macaddr))] == target
+
+
+def test_find_host_failed(simulator, socket_path: Path, capsys):
+    inventory = [*simulator.hostnames()[:8], "s0000-leaf999"]
+    daemon = Daemon(inventory, scheduler=DeviceScheduler(max_concurrency=16))
+
+    reply = _serve(
+        daemon,
+        socket_path,
+        partial(daemon_client.request, "find-host", macaddr="00:00:5e:00:53:01"),
+    )
+    found, failed = daemon_client.decode_find_host(reply["result"])
+
+    assert found is None
+    assert [host for host, _ in failed] == ["s0000-leaf999"]
+
+    find_macaddr._report(MacAddress("00:00:5e:00:53:01"), found, failed)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "Not found."
+    assert lines[1].startswith("FAILED: s0000-leaf999: ")
+
+
+def test_inventory_mismatch(daemon: Daemon, socket_path: Path):
+    def client(path: Path):
+        digest = daemon_client.inventory_digest(daemon.inventory[:8])
+        with pytest.raises(daemon_client.InventoryMismatch):
+            daemon_client.request("versions", socket_path=path, inventory=digest)
+
+        digest = daemon_client.inventory_digest(reversed(daemon.inventory))
+        return daemon_client.request("versions", socket_path=path, inventory=digest)
+
+    assert _serve(daemon, socket_path, client)["ok"]
+
+
+@pytest.mark.parametrize(
+    "command, params, error",
+    [
+        ("no-such-command", {}, "Unknown command"),
+        ("versions", {"macaddr": "00:11:22:33:44:55"}, "Invalid params for versions"),
+        ("find-host", {}, "Invalid params for find-host"),
+    ],
+)
+def test_error_replies(
+    daemon: Daemon, socket_path: Path, command: str, params: dict, error: str
+):
+    def client(path: Path):
+        with pytest.raises(daemon_client.DaemonError, match=error):
+            daemon_client.request(command, socket_path=path, **params)
+
+    _serve(daemon, socket_path, client)
+
+
+@pytest.mark.parametrize(
+    "line, error",
+    [
+        (b"not json\n", "Invalid request"),
+        (b"[1, 2]\n", "Invalid request"),
+        (b'{"command": "versions", "params": [1]}\n', "Invalid request"),
+    ],
+)
+def test_invalid_request_lines(
+    daemon: Daemon, socket_path: Path, line: bytes, error: str
+):
+    reply = _serve(daemon, socket_path, partial(_raw_request, line))
+    assert reply["ok"] is False
+    assert reply["error"].startswith(error)
+
+
+def test_client_timeout(socket_path: Path):
+    async def on_client(reader, writer):
+        await reader.readline()
+        await asyncio.sleep(1.0)
+        writer.close()
+
+    async def _main():
+        server = await asyncio.start_unix_server(on_client, path=str(socket_path))
+        async with server:
+            loop = asyncio.get_running_loop()
+            request = partial(
+                daemon_client.request, "versions", socket_path=socket_path, timeout=0.1
+            )
+            with pytest.raises(daemon_client.DaemonError, match="no reply"):
+                await loop.run_in_executor(None, request)
+
+    asyncio.run(_main())
+
+
+def test_results_bounded():
+    daemon = Daemon(["nyc1-leaf01"], max_results=3)
+    for i_key in range(10):
+        daemon._add_result(("find-host", str(i_key)), None)
+
+    assert [key for _, key in daemon._results] == ["7", "8", "9"]
@@ -0,0 +1,64 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests of the device pool: the least recently used idle devices are closed
+#    to make room for a new device, and by default the pool holds no more
+#    devices than the open-files budget of the scheduler, even when the
+#    inventory is larger than the budget.
+# =============================================================================
+
+from typing import Dict
+
+from demo_beginner_asyncio import resources
+from demo_beginner_asyncio.arista_eos import Device
+from demo_beginner_asyncio.device_pool import DevicePool, run_with_pool
+from demo_beginner_asyncio.scheduler import DeviceScheduler
+
+BUDGET = 4
+
+
+def test_least_recently_used_closed(simulator):
+    hosts = simulator.hostnames()[:3]
+    pool = DevicePool(max_size=2)
+    opened: Dict[str, Device] = dict()
+
+    async def borrow(host: str):
+        async with pool.device(host) as dev:
+            opened[host] = dev
+            await dev.cli("show version")
+
+    async def main():
+        async with pool:
+            for host in (hosts[0], hosts[1], hosts[0], hosts[2]):
+                await borrow(host)
+            return list(pool._entries)
+
+    assert run_with_pool(main()) == [hosts[0], hosts[2]]
+    assert opened[hosts[1]].is_closed
+
+
+def test_inventory_larger_than_budget(simulator, monkeypatch):
+    monkeypatch.setattr(
+        resources, "max_open_files", lambda: resources.RESERVED_OPEN_FILES + BUDGET
+    )
+    hosts = simulator.hostnames()[: BUDGET * 4]
+    pool = DevicePool()
+    scheduler = DeviceScheduler()
+    assert pool.max_size == scheduler.max_concurrency == BUDGET
+
+    sizes = list()
+
+    async def show_version(host: str):
+        async with pool.device(host) as dev:
+            sizes.append(len(pool))
+            return await dev.cli("show version")
+
+    async def main():
+        async with pool:
+            results = [res async for res in scheduler.map(hosts, show_version)]
+            return results, len(pool)
+
+    results, size = run_with_pool(main())
+
+    assert all(res.ok for res in results) and len(results) == len(hosts)
+    assert max(sizes) <= BUDGET and size == BUDGET
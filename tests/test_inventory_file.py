@@ -0,0 +1,138 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests of the inventory file loader: the text, CSV and YAML formats, the
+#    dropping of comments and duplicates, and the site and role selection.
+# =============================================================================
+
+from pathlib import Path
+
+import pytest
+
+from demo_beginner_asyncio.inventory_file import load_inventory, read_inventory
+
+TEXT_INVENTORY = """\
+# the lab devices
+nyc1-leaf01
+nyc1-leaf02   role=border
+
+nyc1-spine01
+sfo1-leaf01 site=lab1
+nyc1-leaf01
+"""
+
+
+@pytest.fixture()
+def text_file(tmp_path: Path) -> Path:
+    filepath = tmp_path / "inventory.text"
+    filepath.write_text(TEXT_INVENTORY)
+    return filepath
+
+
+def test_text_devices(text_file: Path):
+    devices = list(read_inventory(text_file))
+
+    assert [dev.host for dev in devices] == [
+        "nyc1-leaf01",
+        "nyc1-leaf02",
+        "nyc1-spine01",
+        "sfo1-leaf01",
+        "nyc1-leaf01",
+    ]
+    assert devices[1].tags == {"role": "border"}
+    assert (devices[1].site, devices[1].role) == ("nyc1", "border")
+    assert (devices[2].site, devices[2].role) == ("nyc1", "spine")
+    assert devices[3].site == "lab1"
+
+
+def test_load_drops_duplicates(text_file: Path):
+    assert load_inventory(text_file) == [
+        "nyc1-leaf01",
+        "nyc1-leaf02",
+        "nyc1-spine01",
+        "sfo1-leaf01",
+    ]
+
+
+@pytest.mark.parametrize(
+    "sites, roles, expected",
+    [
+        (["nyc1"], [], ["nyc1-leaf01", "nyc1-leaf02", "nyc1-spine01"]),
+        (["lab1"], [], ["sfo1-leaf01"]),
+        ([], ["leaf"], ["nyc1-leaf01", "sfo1-leaf01"]),
+        (["nyc1"], ["leaf", "spine"], ["nyc1-leaf01", "nyc1-spine01"]),
+        (["sfo1"], [], []),
+    ],
+)
+def test_load_selection(text_file: Path, sites, roles, expected):
+    assert load_inventory(text_file, sites=sites, roles=roles) == expected
+
+
+def test_text_bad_tag(tmp_path: Path):
+    filepath = tmp_path / "inventory.text"
+    filepath.write_text("nyc1-leaf01\nnyc1-leaf02 border\n")
+
+    with pytest.raises(ValueError, match=r"inventory.text:2: expected key=value"):
+        load_inventory(filepath)
+
+
+def test_csv(tmp_path: Path):
+    filepath = tmp_path / "inventory.csv"
+    filepath.write_text(
+        "host,site,rack\n"
+        "nyc1-leaf01,,r1\n"
+        " nyc1-leaf02 ,lab1,\n"
+        ",nyc1,r3\n"
+        "nyc1-leaf01,,r1\n"
+    )
+
+    devices = list(read_inventory(filepath))
+    assert [dev.host for dev in devices] == [
+        "nyc1-leaf01",
+        "nyc1-leaf02",
+        "nyc1-leaf01",
+    ]
+    assert devices[0].tags == {"rack": "r1"}
+    assert devices[1].site == "lab1"
+    assert load_inventory(filepath, sites=["nyc1"]) == ["nyc1-leaf01"]
+
+
+def test_csv_without_host_column(tmp_path: Path):
+    filepath = tmp_path / "inventory.csv"
+    filepath.write_text("name,site\nnyc1-leaf01,nyc1\n")
+
+    with pytest.raises(ValueError, match="expected a 'host' column"):
+        load_inventory(filepath)
+
+
+def test_yaml(tmp_path: Path):
+    pytest.importorskip("yaml")
+
+    filepath = tmp_path / "inventory.yaml"
+    filepath.write_text(
+        "- nyc1-leaf01\n"
+        "- host: nyc1-leaf02\n"
+        "  role: border\n"
+        "  rack: 3\n"
+        "- nyc1-leaf01\n"
+    )
+
+    devices = list(read_inventory(filepath))
+    assert [dev.host for dev in devices] == [
+        "nyc1-leaf01",
+        "nyc1-leaf02",
+        "nyc1-leaf01",
+    ]
+    assert devices[1].tags == {"role": "border", "rack": "3"}
+    assert load_inventory(filepath, roles=["border"]) == ["nyc1-leaf02"]
+
+
+@pytest.mark.parametrize("content", ["host: nyc1-leaf01\n", "- [nyc1-leaf01]\n"])
+def test_yaml_bad_content(tmp_path: Path, content: str):
+    pytest.importorskip("yaml")
+
+    filepath = tmp_path / "inventory.yml"
+    filepath.write_text(content)
+
+    with pytest.raises(ValueError, match="expected a"):
+        load_inventory(filepath)
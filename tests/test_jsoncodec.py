@@ -0,0 +1,143 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests of the JSON codecs: each codec decodes the eAPI responses of the
+#    simulator as the standard library does, and the selective decode of the
+#    msgspec codec has exactly the fields of the OUTPUT_SHAPES.
+# =============================================================================
+
+import json
+from typing import Any, Dict, List, get_type_hints, get_origin, get_args
+
+import pytest
+
+from demo_beginner_asyncio.jsoncodec import (
+    JSON_CODECS,
+    OUTPUT_SHAPES,
+    command_text,
+    get_codec,
+)
+from demo_beginner_asyncio.simulator import Simulator, SimulatorConfig
+
+# The commands of the OUTPUT_SHAPES, and one without a shape.
+
+COMMANDS = [
+    "show interfaces transceiver hardware",
+    "show interfaces transceiver",
+    "show interfaces status",
+    "show mac address-table",
+    "show version",
+]
+
+INSTALLED = [name for name, (_, installed) in JSON_CODECS.items() if installed]
+
+
+def _response(commands: List[Any]) -> bytes:
+    """returns the simulator runCmds response body for the commands"""
+    simulator = Simulator(SimulatorConfig(devices=4))
+    device = simulator.device(simulator.hostnames[1])
+    jsonrpc = dict(jsonrpc="2.0", id="1", method="runCmds", params=dict(cmds=commands))
+    return json.dumps(simulator.run_cmds(device, jsonrpc)).encode()
+
+
+def _project(value: Any, shape: Any) -> Any:
+    """returns the value with only the fields of the shape, a TypedDict"""
+    if isinstance(shape, type) and issubclass(shape, dict):
+        hints = get_type_hints(shape)
+        return {
+            key: _project(item, hints[key])
+            for key, item in value.items()
+            if key in hints
+        }
+
+    if get_origin(shape) is dict:
+        return {key: _project(item, get_args(shape)[1]) for key, item in value.items()}
+
+    if get_origin(shape) is list:
+        return [_project(item, get_args(shape)[0]) for item in value]
+
+    return value
+
+
+def _shape_of(command: str) -> Any:
+    return next(
+        (shape for pattern, shape in OUTPUT_SHAPES if pattern.match(command)), None
+    )
+
+
+def test_command_text():
+    assert command_text("show  interfaces   status") == "show interfaces status"
+    assert command_text({"cmd": "enable", "input": "secret"}) == "enable"
+
+
+@pytest.mark.parametrize(
+    "command, has_shape",
+    [
+        ("show interfaces transceiver hardware", True),
+        ("show interfaces transceiver", True),
+        ("show interfaces status", True),
+        ("show mac address-table", True),
+        ("show mac address-table address 0011.2233.4455", True),
+        ("show interfaces transceiver detail", False),
+        ("show version", False),
+    ],
+)
+def test_output_shapes_match(command: str, has_shape: bool):
+    assert (_shape_of(command) is not None) == has_shape
+
+
+def test_get_codec_default_is_fastest(monkeypatch):
+    monkeypatch.delenv("DEMO_JSON_CODEC", raising=False)
+    assert get_codec().name == INSTALLED[0]
+
+    monkeypatch.setenv("DEMO_JSON_CODEC", "json")
+    assert get_codec().name == "json"
+
+
+def test_get_codec_errors():
+    with pytest.raises(ValueError, match="Unknown JSON codec"):
+        get_codec("yaml")
+
+    if missing := [name for name in JSON_CODECS if name not in INSTALLED]:
+        with pytest.raises(ValueError, match="requires the"):
+            get_codec(missing[0])
+
+
+@pytest.mark.parametrize("name", INSTALLED)
+def test_codec_round_trip(name: str):
+    codec = get_codec(name)
+    obj = {"version": "4.27.2F", "uptime": 1.5, "interfaces": [{"up": True}]}
+    assert codec.loads(codec.dumps(obj)) == obj
+
+
+@pytest.mark.parametrize("name", INSTALLED)
+def test_full_decode(name: str):
+    body = _response(COMMANDS)
+    assert get_codec(name).decode_response(body) == json.loads(body)
+
+
+@pytest.mark.parametrize("name", INSTALLED)
+def test_decode_error_response(name: str):
+    body = _response(["show version", "show no-such-thing"])
+    res = get_codec(name).decode_response(body, ["show version", "show no-such-thing"])
+
+    assert "result" not in res
+    assert "invalid command" in res["error"]["message"]
+
+
+def test_selective_decode_shapes():
+    pytest.importorskip("msgspec")
+
+    codec = get_codec("msgspec")
+    commands: List[Any] = [*COMMANDS[:-1], {"cmd": COMMANDS[-1]}]
+    body = _response(commands)
+    full: Dict[str, Any] = json.loads(body)
+
+    res = codec.decode_response(body, commands)
+
+    for command, output, full_output in zip(commands, res["result"], full["result"]):
+        text = command_text(command)
+        if shape := _shape_of(text):
+            assert output == _project(full_output, shape), text
+        else:
+            assert output == full_output, text
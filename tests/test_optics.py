@@ -0,0 +1,126 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests of the DomHistory: the ring of samples of each port, the
+#    downsampling to the next tiers, and the baseline of the recent readings.
+#    The readings are multiples of 0.25, exact as the float32 samples.
+# =============================================================================
+
+import math
+import statistics
+
+import pytest
+
+from demo_beginner_asyncio.netdefs import DOM_METRICS
+from demo_beginner_asyncio.optics import DomHistory
+
+WIDTH = len(DOM_METRICS)
+
+
+def _readings(value: float) -> tuple:
+    """the readings of a poll, each metric offset from the value"""
+    return tuple(value + i_metric for i_metric in range(WIDTH))
+
+
+def test_invalid_factor():
+    with pytest.raises(ValueError):
+        DomHistory(capacity=4, factor=5)
+    with pytest.raises(ValueError):
+        DomHistory(capacity=4, factor=1)
+
+
+def test_ports():
+    history = DomHistory(capacity=4, tiers=2, factor=2)
+    port_a = history.port("nyc1-leaf01", "Ethernet1")
+    port_b = history.port("nyc1-leaf01", "Ethernet2")
+
+    assert history.port("nyc1-leaf01", "Ethernet1") == port_a != port_b
+    assert len(history) == 2
+    assert history.nbytes == 2 * 2 * (4 * WIDTH * 4 + 4)
+    assert history.samples(port_a) == []
+    assert all(math.isnan(value) for value in history.latest(port_a))
+
+
+def test_ring_wraparound():
+    history = DomHistory(capacity=4, tiers=1, factor=2)
+    port = history.port("nyc1-leaf01", "Ethernet1")
+
+    for poll in range(10):
+        history.append(port, _readings(poll * 0.25))
+
+    assert history.samples(port) == [_readings(poll * 0.25) for poll in range(6, 10)]
+    assert history.latest(port) == _readings(9 * 0.25)
+
+
+def test_ports_do_not_overlap():
+    history = DomHistory(capacity=3, tiers=1, factor=2)
+    port_a = history.port("nyc1-leaf01", "Ethernet1")
+    port_b = history.port("nyc1-leaf02", "Ethernet1")
+
+    for poll in range(5):
+        history.append(port_a, _readings(poll))
+        history.append(port_b, _readings(-poll))
+
+    assert history.samples(port_a) == [_readings(poll) for poll in (2, 3, 4)]
+    assert history.samples(port_b) == [_readings(-poll) for poll in (2, 3, 4)]
+
+
+def test_downsampled_tiers():
+    history = DomHistory(capacity=4, tiers=3, factor=2)
+    port = history.port("nyc1-leaf01", "Ethernet1")
+
+    for poll in range(8):
+        history.append(port, _readings(poll))
+
+    # each tier 1 sample is the mean of 2 polls, and each tier 2 sample the
+    # mean of 2 tier 1 samples.
+
+    assert history.samples(port, tier=1) == [
+        _readings(mean) for mean in (0.5, 2.5, 4.5, 6.5)
+    ]
+    assert history.samples(port, tier=2) == [_readings(mean) for mean in (1.5, 5.5)]
+
+
+def test_downsample_skips_missing_readings():
+    history = DomHistory(capacity=4, tiers=2, factor=2)
+    port = history.port("nyc1-leaf01", "Ethernet1")
+
+    history.append(port, (1.0,) + (math.nan,) * (WIDTH - 1))
+    history.append(port, (2.0,) + (math.nan,) * (WIDTH - 1))
+
+    (sample,) = history.samples(port, tier=1)
+    assert sample[0] == 1.5
+    assert all(math.isnan(value) for value in sample[1:])
+
+
+def test_baseline_of_the_ring():
+    history = DomHistory(capacity=8, tiers=2, factor=4)
+    port = history.port("nyc1-leaf01", "Ethernet1")
+    polls = [(poll % 5) * 0.25 - 3.0 for poll in range(1000)]
+
+    for value in polls:
+        history.append(port, _readings(value))
+
+    # only the last capacity readings are in the baseline, over however
+    # many polls.
+
+    recent = polls[-8:]
+    for i_metric, (mean, stdev, count) in enumerate(history.baseline(port)):
+        values = [value + i_metric for value in recent]
+        assert count == 8
+        assert mean == pytest.approx(statistics.fmean(values), abs=1e-12)
+        assert stdev == pytest.approx(statistics.pstdev(values), abs=1e-12)
+
+
+def test_baseline_skips_missing_readings():
+    history = DomHistory(capacity=4, tiers=1, factor=2)
+    port = history.port("nyc1-leaf01", "Ethernet1")
+    empty = history.port("nyc1-leaf01", "Ethernet2")
+
+    history.append(port, (1.0,) + (math.nan,) * (WIDTH - 1))
+    history.append(port, (2.0,) + (math.nan,) * (WIDTH - 1))
+
+    (mean, stdev, count), *others = history.baseline(port)
+    assert (mean, stdev, count) == (1.5, 0.5, 2)
+    assert all(math.isnan(mean) and count == 0 for mean, _, count in others)
+    assert all(count == 0 for _, _, count in history.baseline(empty))
@@ -0,0 +1,53 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests of the command planner: the reports run together with one request
+#    per device, and the find-host report locates the end-host as the
+#    find-host search does.
+# =============================================================================
+
+import pytest
+from macaddr import MacAddress
+
+from demo_beginner_asyncio import arista_eos, find_macaddr
+from demo_beginner_asyncio.device_pool import run_with_pool
+from demo_beginner_asyncio.planner import REPORTS, CommandPlanner, FindHostReport
+from demo_beginner_asyncio.progressbar import Progress
+from demo_beginner_asyncio.simulator import SimDevice
+
+
+def test_find_host_requires_macaddr():
+    with pytest.raises(ValueError, match="requires a MAC address"):
+        FindHostReport.from_params()
+
+    assert REPORTS["versions"].from_params(macaddr=None).name == "versions"
+
+
+def test_find_host_with_versions(simulator, monkeypatch):
+    inventory = simulator.hostnames()[:16]
+    i_dev = len(inventory) // 2
+    macaddr = MacAddress(SimDevice(simulator, inventory[i_dev], i_dev).edge_macaddr())
+
+    requests = list()
+    jsonrpc_exec = arista_eos.Device.jsonrpc_exec
+
+    async def counting_exec(self, jsonrpc: dict):
+        requests.append(self.host)
+        return await jsonrpc_exec(self, jsonrpc)
+
+    monkeypatch.setattr(arista_eos.Device, "jsonrpc_exec", counting_exec)
+
+    planner = CommandPlanner(
+        [REPORTS[name].from_params(macaddr=macaddr) for name in REPORTS]
+    )
+    failed = run_with_pool(planner.run(inventory, Progress(disable=True)))
+    versions, _, find_host = planner.reports
+
+    assert not failed and sorted(requests) == sorted(inventory)
+    assert sum(versions.versions.values()) == len(inventory)
+    assert find_host.found.device == inventory[i_dev]
+
+    found, _ = run_with_pool(
+        find_macaddr._search_network(inventory, macaddr, Progress(disable=True))
+    )
+    assert find_host.found == found
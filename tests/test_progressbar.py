@@ -0,0 +1,52 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests of the progress bar: the coalesced advances, and failures, are
+#    added to the task when the bar is redrawn, and when the task completes.
+# =============================================================================
+
+import io
+
+from rich.console import Console
+
+from demo_beginner_asyncio.progressbar import Progress
+
+
+def _progress() -> Progress:
+    """a progress bar on a terminal, redrawn only by `refresh`"""
+    console = Console(file=io.StringIO(), force_terminal=True)
+    return Progress(console=console, auto_refresh=False)
+
+
+def test_counts_current_after_refresh():
+    with _progress() as progressbar:
+        pgt = progressbar.add_task("Checking devices", total=10)
+        progressbar.advance(pgt)
+        progressbar.advance(pgt, failed=1)
+
+        task = progressbar.tasks[0]
+        assert (task.completed, task.fields["failed"]) == (0, 0)
+
+        # no further advances, the stragglers are shown by the redraw.
+
+        progressbar.refresh()
+        assert (task.completed, task.fields["failed"]) == (2, 1)
+        assert "2/10" in progressbar.console.file.getvalue()
+
+
+def test_counts_at_total():
+    with _progress() as progressbar:
+        pgt = progressbar.add_task("Checking devices", total=3)
+        for failed in (0, 1, 1):
+            progressbar.advance(pgt, failed=failed)
+
+        task = progressbar.tasks[0]
+        assert task.finished and task.fields["failed"] == 2
+
+
+def test_disabled_when_not_a_terminal():
+    progressbar = Progress(console=Console(file=io.StringIO()))
+    pgt = progressbar.add_task("Checking devices", total=3)
+    progressbar.advance(pgt)
+
+    assert progressbar.disable and progressbar.tasks[0].completed == 0
@@ -0,0 +1,195 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests of the DeviceScheduler: the concurrency limits, the retry of
+#    transient failures, the hedging of slow attempts, and the map deadline.
+# =============================================================================
+
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+
+from demo_beginner_asyncio.scheduler import (
+    DeviceScheduler,
+    RetryPolicy,
+    default_site_of,
+    default_role_of,
+    is_retryable,
+)
+
+# no backoff between the retries, so the tests do not wait on it.
+
+NO_BACKOFF = dict(backoff=0.0, backoff_max=0.0)
+
+
+def _status_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://nyc1-leaf01/command-api")
+    response = httpx.Response(status_code, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+class Flaky:
+    """a coroutine function that raises the given errors, in order, then returns"""
+
+    def __init__(self, *errors: BaseException):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self, host: str) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return host
+
+
+async def _collect(scheduler: DeviceScheduler, hosts, coro_fn, **kwargs) -> list:
+    return [res async for res in scheduler.map(hosts, coro_fn, **kwargs)]
+
+
+def test_site_and_role_of():
+    assert default_site_of("nyc1-leaf01.corp.com") == "nyc1"
+    assert default_role_of("nyc1-leaf01.corp.com") == "leaf"
+    assert default_role_of("nyc1") == ""
+
+
+def test_is_retryable():
+    assert is_retryable(httpx.ConnectTimeout("timeout"))
+    assert is_retryable(_status_error(503))
+    assert is_retryable(_status_error(429))
+    assert not is_retryable(_status_error(404))
+    assert not is_retryable(ValueError("bad command"))
+
+
+def test_run_retries_transient_failure():
+    scheduler = DeviceScheduler(max_concurrency=4, retry=RetryPolicy(**NO_BACKOFF))
+    flaky = Flaky(httpx.ConnectError("refused"), _status_error(503))
+
+    assert (
+        asyncio.run(scheduler.run("nyc1-leaf01", flaky, "nyc1-leaf01")) == "nyc1-leaf01"
+    )
+    assert flaky.calls == 3
+
+
+def test_run_raises_when_retries_exhausted():
+    scheduler = DeviceScheduler(
+        max_concurrency=4, retry=RetryPolicy(retries=1, **NO_BACKOFF)
+    )
+    flaky = Flaky(httpx.ConnectError("refused"), httpx.ConnectError("refused"))
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(scheduler.run("nyc1-leaf01", flaky, "nyc1-leaf01"))
+    assert flaky.calls == 2
+
+
+def test_run_does_not_retry_other_errors():
+    scheduler = DeviceScheduler(max_concurrency=4, retry=RetryPolicy(**NO_BACKOFF))
+    flaky = Flaky(ValueError("bad command"))
+
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.run("nyc1-leaf01", flaky, "nyc1-leaf01"))
+    assert flaky.calls == 1
+
+
+def test_concurrency_limits():
+    scheduler = DeviceScheduler(max_concurrency=3, max_per_site=1)
+    active: Counter = Counter()
+    peak: Counter = Counter()
+
+    async def work(host: str):
+        site = default_site_of(host)
+        active["all"] += 1
+        active[site] += 1
+        peak["all"] = max(peak["all"], active["all"])
+        peak[site] = max(peak[site], active[site])
+        await asyncio.sleep(0.01)
+        active["all"] -= 1
+        active[site] -= 1
+
+    hosts = [f"{site}-leaf{num:02}" for site in ("nyc1", "sfo1") for num in range(4)]
+    results = asyncio.run(_collect(scheduler, hosts, work))
+
+    assert all(res.ok for res in results)
+    assert peak["all"] == 2
+    assert peak["nyc1"] == peak["sfo1"] == 1
+    assert scheduler.in_flight == 0
+
+
+def test_hedge_uses_first_to_succeed():
+    scheduler = DeviceScheduler(
+        max_concurrency=4, retry=RetryPolicy(hedge_pct=50, hedge_min_samples=1)
+    )
+    scheduler.observe(0.01)
+    calls = 0
+
+    async def work(host: str) -> int:
+        nonlocal calls
+        calls += 1
+        attempt = calls
+        await asyncio.sleep(10.0 if attempt == 1 else 0.0)
+        return attempt
+
+    result = asyncio.run(asyncio.wait_for(scheduler.run("h", work, "h"), timeout=5))
+
+    assert result == 2
+    assert scheduler.hedged == 1
+
+
+def test_no_hedge_before_min_samples():
+    scheduler = DeviceScheduler(
+        max_concurrency=4, retry=RetryPolicy(hedge_pct=50, hedge_min_samples=5)
+    )
+
+    async def work(host: str) -> str:
+        await asyncio.sleep(0.02)
+        return host
+
+    assert asyncio.run(scheduler.run("h", work, "h")) == "h"
+    assert scheduler.hedged == 0
+
+
+def test_map_deadline():
+    scheduler = DeviceScheduler(max_concurrency=4)
+
+    async def work(host: str) -> str:
+        await asyncio.sleep(10.0 if host == "slow" else 0.0)
+        return host
+
+    results = asyncio.run(_collect(scheduler, ["a", "slow", "b"], work, deadline=0.1))
+
+    # the devices not completed by the deadline are yielded last.
+
+    assert sorted(res.result for res in results[:2]) == ["a", "b"]
+    assert results[-1].host == "slow"
+    assert results[-1].error.startswith("DeadlineExceeded")
+
+
+def test_map_failure_does_not_stop_others():
+    scheduler = DeviceScheduler(max_concurrency=4, retry=RetryPolicy(retries=0))
+
+    async def work(host: str) -> str:
+        if host == "bad":
+            raise ValueError("bad command\nmore detail")
+        return host
+
+    results = {
+        res.host: res for res in asyncio.run(_collect(scheduler, ["a", "bad"], work))
+    }
+
+    assert results["a"].ok
+    assert results["bad"].error == "ValueError: bad command"
+
+
+def test_map_runs_duplicate_host_once():
+    scheduler = DeviceScheduler(max_concurrency=4)
+    calls: Counter = Counter()
+
+    async def work(host: str) -> str:
+        calls[host] += 1
+        return host
+
+    results = asyncio.run(_collect(scheduler, ["a", "b", "a"], work))
+
+    assert sorted(res.host for res in results) == ["a", "b"]
+    assert calls == Counter(a=1, b=1)
@@ -0,0 +1,77 @@
+# =============================================================================
+# Purpose:
+# --------
+#    Tests that the CLI starts quickly: importing the CLI is within the time
+#    budget, and the packages used only by the commands are not loaded to
+#    show the CLI help.  See also the "startup" task of tasks.py.
+# =============================================================================
+
+import sys
+import subprocess
+
+import pytest
+
+# The import time budget of the CLI module, in milliseconds.
+
+BUDGET_MS = 100
+
+# The packages that must not be loaded until a command runs.
+
+DEFERRED = ["rich", "httpx", "aioeapi", "macaddr"]
+
+# The CLI help, printing the loaded modules on exit.
+
+HELP_SCRIPT = """
+import sys
+from demo_beginner_asyncio.cli import main
+
+sys.argv = ["demo", "--help"]
+try:
+    main()
+except SystemExit:
+    pass
+print(*sorted(sys.modules), file=sys.stderr)
+"""
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    """runs the python interpreter in a new process, returning its output"""
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True
+    )
+
+
+def _cli_import_ms() -> float:
+    """
+    Returns the cumulative import time of the CLI module, from the last line
+    of the -X importtime output, which is the CLI module.
+    """
+    res = _python("-X", "importtime", "-c", "import demo_beginner_asyncio.cli")
+    cli_line = res.stderr.strip().splitlines()[-1]
+    assert cli_line.rstrip().endswith("demo_beginner_asyncio.cli")
+    return int(cli_line.split("|")[1]) / 1000
+
+
+def test_cli_import_within_budget():
+    # the best of a few runs, so that a busy machine does not fail the test;
+    # the first run also writes the byte-code caches.
+
+    cli_ms = min(_cli_import_ms() for _ in range(3))
+    assert cli_ms <= BUDGET_MS, f"CLI import {cli_ms:.1f} ms, budget {BUDGET_MS} ms"
+
+
+@pytest.fixture(scope="module")
+def help_modules() -> set:
+    """the modules loaded to show the CLI help"""
+    res = _python("-c", HELP_SCRIPT)
+    assert "Usage: demo" in res.stdout
+    return set(res.stderr.split())
+
+
+def test_help_loads_cli(help_modules: set):
+    assert "demo_beginner_asyncio.cli" in help_modules
+
+
+@pytest.mark.parametrize("package", DEFERRED)
+def test_help_does_not_load(help_modules: set, package: str):
+    assert package not in help_modules